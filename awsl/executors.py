@@ -0,0 +1,87 @@
+"""Executors that bound how a node's step calls run concurrently."""
+
+from __future__ import annotations
+
+import asyncio
+import atexit
+import contextvars
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict
+
+EXECUTOR_TYPES = ("thread", "process")
+
+
+class NodeExecutor:
+    """Lazily created thread or process pool dedicated to one node.
+
+    Process pools suit CPU-heavy steps such as PDF rendering; their step functions,
+    inputs and outputs must be picklable and they cannot use ``interrupt``.
+    """
+
+    def __init__(self, name: str, type: str = "thread", max_workers: int | None = None):
+        if type not in EXECUTOR_TYPES:
+            raise ValueError(f"Unknown executor type '{type}' for node {name}, expected one of {EXECUTOR_TYPES}")
+        self.name = name
+        self.type = type
+        self.max_workers = max_workers
+        self._executor: Executor | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    if self.type == "process":
+                        self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+                    else:
+                        self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                            thread_name_prefix=f"awsl-{self.name}")
+        return self._executor
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
+
+    def _bind(self, func: Callable[..., Any], kwargs: Dict[str, Any]) -> Callable[[], Any]:
+        call = partial(func, **kwargs)
+        if self.type == "thread":
+            # Threads keep the LangGraph context so steps can still interrupt
+            return partial(contextvars.copy_context().run, call)
+        return call
+
+    def call(self, func: Callable[..., Any], kwargs: Dict[str, Any]) -> Any:
+        return self.executor.submit(self._bind(func, kwargs)).result()
+
+    async def acall(self, func: Callable[..., Any], kwargs: Dict[str, Any]) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(self.executor, self._bind(func, kwargs))
+
+
+# One executor per (workflow, node, type, max_workers) for the whole process, so recompiling a workflow
+# (cache eviction, use_cache=False, template reloads) reuses the pool instead of leaking a new one
+_executors: Dict[tuple, NodeExecutor] = {}
+_executors_lock = threading.Lock()
+
+
+def node_executor(workflow: str, name: str, type: str = "thread", max_workers: int | None = None) -> NodeExecutor:
+    """Shared executor of the workflow's node; every graph compiled for it uses the same pool"""
+    key = (workflow, name, type, max_workers)
+    with _executors_lock:
+        executor = _executors.get(key)
+        if executor is None:
+            executor = _executors[key] = NodeExecutor(name, type, max_workers)
+    return executor
+
+
+@atexit.register
+def shutdown_executors(wait: bool = True) -> None:
+    """Stop every node pool, e.g. on exit so process pools don't leave worker processes behind"""
+    with _executors_lock:
+        executors = list(_executors.values())
+        _executors.clear()
+    for executor in executors:
+        executor.shutdown(wait=wait)
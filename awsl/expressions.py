@@ -0,0 +1,164 @@
+"""Compiler for AWSL `when`/guard conditions.
+
+Conditions are parsed once into closures that read values straight from the
+task input dict, e.g. ``(A.questions && B.answer) || !A.questions``.
+Both the C-style (``&&``, ``||``, ``!``) and the Python-style (``and``, ``or``,
+``not``) operators are accepted, together with comparisons and literals.
+"""
+
+from __future__ import annotations
+
+import operator
+import re
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Tuple
+
+Evaluator = Callable[[Dict[str, Any]], Any]
+
+_TOKEN_RE = re.compile(r"""
+    \s*(?:
+        (?P<number>\d+(?:\.\d+)?)
+      | (?P<string>"[^"]*"|'[^']*')
+      | (?P<op>&&|\|\||==|!=|<=|>=|<|>|!|\(|\))
+      | (?P<name>[A-Za-z_][A-Za-z0-9_]*(?:\.[A-Za-z_][A-Za-z0-9_]*)*)
+    )""", re.VERBOSE)
+
+_KEYWORD_OPS = {"and": "&&", "or": "||", "not": "!"}
+_LITERALS = {"True": True, "true": True, "False": False, "false": False, "None": None, "null": None}
+_COMPARISONS = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+}
+
+
+class ConditionSyntaxError(ValueError):
+    pass
+
+
+def _tokenize(expr: str) -> List[Tuple[str, str]]:
+    tokens = []
+    pos = 0
+    expr = expr.rstrip()
+    while pos < len(expr):
+        match = _TOKEN_RE.match(expr, pos)
+        if not match or match.end() == pos:
+            raise ConditionSyntaxError(f"Unexpected character at {pos} in condition: {expr!r}")
+        kind = match.lastgroup
+        value = match.group(kind)
+        if kind == "name" and value in _KEYWORD_OPS:
+            kind, value = "op", _KEYWORD_OPS[value]
+        tokens.append((kind, value))
+        pos = match.end()
+    return tokens
+
+
+class _Parser:
+    """Recursive-descent parser: or -> and -> not -> comparison -> primary"""
+
+    def __init__(self, expr: str):
+        self.expr = expr
+        self.tokens = _tokenize(expr)
+        self.pos = 0
+
+    def parse(self) -> Evaluator:
+        if not self.tokens:
+            raise ConditionSyntaxError("Condition is empty")
+        result = self._or()
+        if self.pos != len(self.tokens):
+            raise ConditionSyntaxError(f"Unexpected token {self.tokens[self.pos][1]!r} in condition: {self.expr!r}")
+        return result
+
+    def _peek(self) -> str | None:
+        return self.tokens[self.pos][1] if self.pos < len(self.tokens) and self.tokens[self.pos][0] == "op" else None
+
+    def _next(self) -> Tuple[str, str]:
+        if self.pos >= len(self.tokens):
+            raise ConditionSyntaxError(f"Unexpected end of condition: {self.expr!r}")
+        token = self.tokens[self.pos]
+        self.pos += 1
+        return token
+
+    def _or(self) -> Evaluator:
+        operands = [self._and()]
+        while self._peek() == "||":
+            self.pos += 1
+            operands.append(self._and())
+        if len(operands) == 1:
+            return operands[0]
+
+        def evaluate_or(state):
+            value = None
+            for operand in operands:
+                value = operand(state)
+                if value:
+                    return value
+            return value
+        return evaluate_or
+
+    def _and(self) -> Evaluator:
+        operands = [self._not()]
+        while self._peek() == "&&":
+            self.pos += 1
+            operands.append(self._not())
+        if len(operands) == 1:
+            return operands[0]
+
+        def evaluate_and(state):
+            value = None
+            for operand in operands:
+                value = operand(state)
+                if not value:
+                    return value
+            return value
+        return evaluate_and
+
+    def _not(self) -> Evaluator:
+        if self._peek() == "!":
+            self.pos += 1
+            operand = self._not()
+            return lambda state: not operand(state)
+        return self._comparison()
+
+    def _comparison(self) -> Evaluator:
+        left = self._primary()
+        op = self._peek()
+        if op not in _COMPARISONS:
+            return left
+        self.pos += 1
+        right = self._primary()
+        compare = _COMPARISONS[op]
+        return lambda state: compare(left(state), right(state))
+
+    def _primary(self) -> Evaluator:
+        kind, value = self._next()
+        if kind == "op" and value == "(":
+            inner = self._or()
+            if self._next() != ("op", ")"):
+                raise ConditionSyntaxError(f"Missing ')' in condition: {self.expr!r}")
+            return inner
+        if kind == "number":
+            constant = float(value) if "." in value else int(value)
+            return lambda state: constant
+        if kind == "string":
+            constant = value[1:-1]
+            return lambda state: constant
+        if kind == "name":
+            if value in _LITERALS:
+                constant = _LITERALS[value]
+                return lambda state: constant
+            # Missing references are falsy, like inputs that were never produced
+            return lambda state: state.get(value, False)
+        raise ConditionSyntaxError(f"Unexpected token {value!r} in condition: {self.expr!r}")
+
+
+@lru_cache(maxsize=1024)
+def compile_condition(expr: str) -> Callable[[Dict[str, Any]], bool]:
+    """Compile a condition into a function of the task input dict returning a bool"""
+    if expr is None:
+        raise ValueError("Condition is None")
+    evaluate = _Parser(str(expr).strip()).parse()
+    return lambda state: bool(evaluate(state))
@@ -2,24 +2,19 @@
 from pathlib import Path
 import sys
 
-from lark import Lark, UnexpectedInput
+from lark import UnexpectedInput
 
-
-def load_grammar() -> str:
-    grammar_path = Path(__file__).with_name("awsl.bnf")
-    return grammar_path.read_text()
+from awsl.grammar.workflow_parser import get_parser
 
 
 def verify(path: Path) -> None:
-    grammar = load_grammar()
-    parser = Lark(grammar, start="workflow")
     text = path.read_text()
-    parser.parse(text)
+    get_parser().parse(text)
 
 
 def main() -> None:
     if len(sys.argv) != 2:
-        print("Usage: python verifier.py <file.awsl>")
+        print("Usage: python -m awsl.grammar.verifier <file.awsl>")
         raise SystemExit(1)
 
     file_path = Path(sys.argv[1])
@@ -1,13 +1,32 @@
 
+import os
 from pathlib import Path
 from typing import Any, Dict, List, Optional
 from dataclasses import dataclass, field
 from enum import Enum
+from functools import lru_cache
 from lark import Lark, Transformer
+from lark.exceptions import VisitError
+
+# Serialized parser tables: unset disables the on-disk cache, "1"/"true" uses the
+# system temp directory, anything else is treated as the cache file path
+PARSER_CACHE = os.getenv("AWSL_PARSER_CACHE")
 
 def load_grammar() -> str:
     return (Path(__file__).with_name("awsl.bnf")).read_text()
 
+def _parser_cache_option(value: str | None) -> bool | str:
+    if not value:
+        return False
+    if value.lower() in ("1", "true", "yes"):
+        return True
+    return value
+
+@lru_cache(maxsize=None)
+def get_parser() -> Lark:
+    """Return the process-wide LALR parser for the AWSL grammar"""
+    return Lark(load_grammar(), start="workflow", parser="lalr", cache=_parser_cache_option(PARSER_CACHE))
+
 class Reducer(Enum):
     LAST = "last"
     APPEND = "append"
@@ -67,6 +86,23 @@ class RetryConfig:
     attempts: int
     backoff: str
     policy: str
+    delay: Optional[str] = None
+    retry_on: Optional[List[str]] = None
+
+
+@dataclass
+class ExecutorConfig:
+    """Represents the executor a node's step function runs in"""
+    type: str = "thread"
+    max_workers: Optional[int] = None
+
+
+@dataclass
+class CacheConfig:
+    """Represents node result memoization"""
+    ttl: str
+    key: Optional[List[str]] = None
+    backend: str = "memory"
 
 
 @dataclass
@@ -80,6 +116,9 @@ class NodeClass:
     hitl: Optional[HitlConfig] = None
     retry: Optional[RetryConfig] = None
     constants: List[Constant] = field(default_factory=list)
+    executor: Optional[ExecutorConfig] = None
+    cache: Optional[CacheConfig] = None
+    timeout: Optional[str] = None
 
 @dataclass
 class GuardClass:
@@ -98,6 +137,17 @@ class CycleClass:
     max_iterations: int = 10
     nodes_outputs: List[str] = field(default_factory=list)
 
+@dataclass
+class MapClass:
+    """Represents a parallel map: the body nodes run once per element of the `over` input"""
+    name: str
+    item: str
+    over: str
+    inputs: List[Input] = field(default_factory=list)
+    outputs: List[Output] = field(default_factory=list)
+    nodes: List[NodeClass] = field(default_factory=list)
+    max_concurrency: int = 4
+
 @dataclass
 class Workflow:
     """Represents the complete workflow"""
@@ -105,7 +155,7 @@ class Workflow:
     metadata: Optional[Metadata] = None
     inputs: List[Input] = field(default_factory=list)
     outputs: List[Output] = field(default_factory=list)
-    nodes: List[NodeClass | CycleClass] = field(default_factory=list)
+    nodes: List[NodeClass | CycleClass | MapClass] = field(default_factory=list)
 
 
 class ASTBuilder(Transformer):
@@ -120,7 +170,7 @@ class ASTBuilder(Transformer):
                 wf.inputs = it
             elif isinstance(it, list) and len(it) > 0 and isinstance(it[0], Output):
                 wf.outputs = it
-            elif isinstance(it, (NodeClass, CycleClass)):
+            elif isinstance(it, (NodeClass, CycleClass, MapClass)):
                 wf.nodes.append(it)
         return wf
 
@@ -189,6 +239,12 @@ class ASTBuilder(Transformer):
             node.retry = body["retry"]
         if "constants" in body:
             node.constants = body["constants"]
+        if "executor" in body:
+            node.executor = body["executor"]
+        if "cache" in body:
+            node.cache = body["cache"]
+        if "timeout" in body:
+            node.timeout = body["timeout"]
             
         return node
 
@@ -221,6 +277,57 @@ class ASTBuilder(Transformer):
         # For now, return basic config - can be enhanced later
         return {"hitl": HitlConfig(correlation="default", timeout="24h")}
 
+    def timeout_clause(self, items):
+        return {"timeout": items[0]}
+
+    def executor_block(self, items):
+        max_workers = items[1] if len(items) > 1 else None
+        return {"executor": ExecutorConfig(type=items[0], max_workers=max_workers)}
+
+    def retry_block(self, items):
+        retry = RetryConfig(attempts=items[0], backoff=items[1], policy=items[2])
+        for kind, value in items[3:]:
+            setattr(retry, kind, value)
+        return {"retry": retry}
+
+    def retry_delay(self, items):
+        return ("delay", items[0])
+
+    def retry_on(self, items):
+        return ("retry_on", list(items))
+
+    def cache_block(self, items):
+        cache = CacheConfig(ttl=items[0])
+        for kind, value in items[1:]:
+            setattr(cache, kind, value)
+        return {"cache": cache}
+
+    def cache_key(self, items):
+        return ("key", list(items))
+
+    def cache_backend(self, items):
+        return ("backend", items[0])
+
+    def map_block(self, items):
+        name = items[0]
+        body = items[1]
+        if body.get("max_concurrency", 1) < 1:
+            raise ValueError(f"Map {name}: max_concurrency must be at least 1, got {body['max_concurrency']}")
+        return MapClass(name=name, **body)
+
+    def map_body(self, items):
+        res = {"inputs": items[0], "outputs": items[2], "nodes": []}
+        res["item"], res["over"] = items[1]
+        for it in items[3:]:
+            if isinstance(it, NodeClass):
+                res["nodes"].append(it)
+            elif isinstance(it, int):
+                res["max_concurrency"] = it
+        return res
+
+    def foreach_clause(self, items):
+        return (items[0], items[1])
+
     def cycle_block(self, items):
         name = items[0]
         body = items[1]
@@ -301,10 +408,19 @@ class ASTBuilder(Transformer):
     def NAME_WITH_DOT(self, token):
         return str(token)
 
+def parse_duration(value: str) -> float:
+    """Convert a DURATION literal such as 500ms, 30s, 15m, 24h or 7d to seconds"""
+    if value.endswith("ms"):
+        return int(value[:-2]) / 1000
+    units = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+    return int(value[:-1]) * units[value[-1]]
+
 def parse_awsl_to_objects(path: str) -> Workflow:
     """Parse AWSL file and return structured object hierarchy"""
-    grammar = load_grammar()
-    parser = Lark(grammar, start="workflow")
-    tree = parser.parse(Path(path).read_text())
+    tree = get_parser().parse(Path(path).read_text())
     transformer = ASTBuilder()
-    return transformer.transform(tree)
+    try:
+        return transformer.transform(tree)
+    except VisitError as exc:
+        # Semantic errors raised while building the objects, e.g. an invalid max_concurrency
+        raise exc.orig_exc from exc
@@ -0,0 +1,207 @@
+"""Memoization of AWSL node results.
+
+A node with a ``cache { ttl: 24h }`` block stores its output update under a key built
+from the call name, the node's inputs (or only those listed in ``key: [...]``) and the
+workflow constants, so reruns with the same inputs skip the step entirely. Results are
+pickled, which keeps cached values isolated from steps that mutate their inputs.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import inspect
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Protocol, Tuple
+
+MEMORY_CACHE_SIZE = int(os.getenv("AWSL_MEMORY_CACHE_SIZE", 1024))
+SQLITE_CACHE_PATH = os.getenv("AWSL_SQLITE_CACHE_PATH", ".awsl_cache.sqlite")
+
+HITS = "cache_hits"
+MISSES = "cache_misses"
+
+
+class CacheBackend(Protocol):
+    def get(self, key: str) -> Optional[bytes]: ...
+
+    def set(self, key: str, value: bytes, ttl: Optional[float]) -> None: ...
+
+    def clear(self) -> None: ...
+
+
+class MemoryCache:
+    """In-process LRU cache with per-entry expiry."""
+
+    def __init__(self, maxsize: int = MEMORY_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[str, Tuple[bytes, Optional[float]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes, ttl: Optional[float]) -> None:
+        expires_at = time.time() + ttl if ttl is not None else None
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SqliteCache:
+    """On-disk cache shared by every process on the host."""
+
+    def __init__(self, path: str = SQLITE_CACHE_PATH):
+        self.path = path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS node_cache "
+                         "(key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[bytes]:
+        row = self._connect().execute("SELECT value, expires_at FROM node_cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        value, expires_at = row
+        if expires_at is not None and expires_at <= time.time():
+            with self._connect() as conn:
+                conn.execute("DELETE FROM node_cache WHERE key = ?", (key,))
+            return None
+        return value
+
+    def set(self, key: str, value: bytes, ttl: Optional[float]) -> None:
+        expires_at = time.time() + ttl if ttl is not None else None
+        with self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO node_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                         (key, value, expires_at))
+
+    def clear(self) -> None:
+        with self._connect() as conn:
+            conn.execute("DELETE FROM node_cache")
+
+
+BACKEND_TYPES: Dict[str, Callable[[], CacheBackend]] = {
+    "memory": MemoryCache,
+    "sqlite": SqliteCache,
+}
+_backends: Dict[str, CacheBackend] = {}
+_backends_lock = threading.Lock()
+
+
+def get_backend(name: str) -> CacheBackend:
+    """Process-wide backend instance for a ``backend:`` name"""
+    if name not in BACKEND_TYPES:
+        raise ValueError(f"Unknown cache backend '{name}', expected one of {tuple(BACKEND_TYPES)}")
+    with _backends_lock:
+        if name not in _backends:
+            _backends[name] = BACKEND_TYPES[name]()
+        return _backends[name]
+
+
+def register_backend(name: str, factory: Callable[[], CacheBackend]) -> None:
+    with _backends_lock:
+        BACKEND_TYPES[name] = factory
+        _backends.pop(name, None)
+
+
+class NodeMemo:
+    """Wraps a node's step call with lookups in its cache backend.
+
+    The wrapped step adds ``cache_hits`` or ``cache_misses`` to its update, which the
+    graph accumulates per run into ``<Node>.cache_hits`` and ``<Node>.cache_misses``.
+    """
+
+    def __init__(self,
+                 call: str,
+                 ttl: Optional[float],
+                 key: Optional[List[str]],
+                 constants: Dict[str, Any],
+                 backend: str = "memory"):
+        if backend not in BACKEND_TYPES:
+            raise ValueError(f"Unknown cache backend '{backend}', expected one of {tuple(BACKEND_TYPES)}")
+        self.call = call
+        self.ttl = ttl
+        self.key_inputs = key
+        self.constants = sorted(constants.items())
+        self.backend_name = backend
+
+    @property
+    def backend(self) -> CacheBackend:
+        # Resolved per call so compiled graphs pick up re-registered backends
+        return get_backend(self.backend_name)
+
+    def key(self, inputs: Dict[str, Any]) -> Optional[str]:
+        names = self.key_inputs if self.key_inputs is not None else sorted(k for k in inputs if k != "config")
+        try:
+            payload = pickle.dumps((self.call, [(name, inputs.get(name)) for name in names], self.constants))
+        except Exception:
+            # Inputs that cannot be pickled are never cached
+            return None
+        return hashlib.sha256(payload).hexdigest()
+
+    def lookup(self, key: Optional[str]) -> Optional[Dict[str, Any]]:
+        if key is None:
+            return None
+        value = self.backend.get(key)
+        return pickle.loads(value) if value is not None else None
+
+    def store(self, key: Optional[str], update: Dict[str, Any]) -> None:
+        if key is None:
+            return
+        try:
+            value = pickle.dumps(update)
+        except Exception:
+            return
+        self.backend.set(key, value, self.ttl)
+
+    def wrap(self, step: Callable[..., Any]) -> Callable[..., Any]:
+        if inspect.iscoroutinefunction(step):
+            async def cached_astep(**kwargs):
+                key = self.key(kwargs)
+                cached = await asyncio.to_thread(self.lookup, key)
+                if cached is not None:
+                    return {**cached, HITS: 1}
+                update = await step(**kwargs) or {}
+                await asyncio.to_thread(self.store, key, update)
+                return {**update, MISSES: 1}
+            return cached_astep
+
+        def cached_step(**kwargs):
+            key = self.key(kwargs)
+            cached = self.lookup(key)
+            if cached is not None:
+                return {**cached, HITS: 1}
+            update = step(**kwargs) or {}
+            self.store(key, update)
+            return {**update, MISSES: 1}
+        return cached_step
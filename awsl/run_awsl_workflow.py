@@ -1,26 +1,132 @@
 # Runner for AWsl workflows
 
 from __future__ import annotations
+import asyncio
+import builtins
+import contextvars
+import inspect
 import json
-import re
-from typing import Any, Dict, List, Set
+import os
+import threading
+import uuid
+import weakref
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Awaitable, Callable, Dict, List, Set
 import argparse
-from langgraph.types import Command
+from langgraph.errors import GraphBubbleUp
+from langgraph.runtime import get_runtime
+from langgraph.types import Command, RetryPolicy, Send, default_retry_on
 from langgraph.channels import LastValue, BinaryOperatorAggregate
 from langgraph.pregel import Pregel
 from awsl.grammar.workflow_parser import (
     parse_awsl_to_objects, 
     NodeClass, 
     CycleClass, 
+    MapClass,
     Workflow,
-    Reducer
+    Input,
+    Output,
+    Reducer,
+    parse_duration
 )
+from awsl.workflow_cache import compiled_workflows
+from awsl.expressions import compile_condition
+from awsl.executors import node_executor
+from awsl.node_cache import HITS, MISSES, NodeMemo
+from langgraph._internal._constants import INTERRUPT, TASKS
+from langgraph._internal._runnable import RunnableCallable
 from langgraph.pregel._read import PregelNode
 from langgraph.pregel._write import ChannelWrite, ChannelWriteTupleEntry
 import operator
 
 START_NODE_NAME = "start"
 
+# backoff name -> (backoff_factor, jitter) of the LangGraph retry policy
+BACKOFF_STRATEGIES = {
+    "exponential": (2.0, False),
+    "jittered": (2.0, True),
+    "fixed": (1.0, False),
+}
+FAIL_POLICIES = ("fail", "skip")
+DEFAULT_RETRY_DELAY = 1.0
+
+# Sync step functions run here when the workflow is executed on an event loop by arun_workflow
+STEP_EXECUTOR = ThreadPoolExecutor(max_workers=int(os.getenv("AWSL_STEP_THREADS", 32)),
+                                   thread_name_prefix="awsl-step")
+
+# Sync steps with a timeout run on their own pool, so threads left behind by overrunning steps
+# can't starve STEP_EXECUTOR
+TIMED_STEP_EXECUTOR = ThreadPoolExecutor(max_workers=int(os.getenv("AWSL_TIMED_STEP_THREADS", 8)),
+                                         thread_name_prefix="awsl-timed-step")
+_overrunning = 0
+_overrunning_lock = threading.Lock()
+
+def overrunning_steps() -> int:
+    """Number of timed-out sync steps whose threads are still running"""
+    return _overrunning
+
+def _track_overrun(name: str, future: Future):
+    global _overrunning
+
+    def finished(_future: Future):
+        global _overrunning
+        with _overrunning_lock:
+            _overrunning -= 1
+
+    with _overrunning_lock:
+        _overrunning += 1
+        overrunning = _overrunning
+    print(f"Node {name} timed out, {overrunning} timed-out step threads still running")
+    future.add_done_callback(finished)
+
+def run_in_executor(fn: Callable[[dict], Any], executor: Executor):
+    """Async adapter that runs a sync task in the executor, keeping the LangGraph context"""
+    async def run(task_input: dict):
+        ctx = contextvars.copy_context()
+        return await asyncio.get_running_loop().run_in_executor(executor, ctx.run, fn, task_input)
+    return run
+
+def with_timeout(name: str, seconds: float, step: Callable[..., Any], astep: Callable[..., Any] | None):
+    """Bound the wall time of a step call. An overrunning sync step keeps its TIMED_STEP_EXECUTOR thread
+    until it returns, but the node fails right away so the run and its worker slot are released."""
+    def expired() -> TimeoutError:
+        return TimeoutError(f"Node {name} timed out after {seconds:g}s")
+
+    def timed_step(**kwargs):
+        future = TIMED_STEP_EXECUTOR.submit(contextvars.copy_context().run, partial(step, **kwargs))
+        try:
+            return future.result(timeout=seconds)
+        except TimeoutError:
+            if future.done():
+                raise
+            if not future.cancel():
+                _track_overrun(name, future)
+            raise expired() from None
+
+    async def timed_astep(**kwargs):
+        future = None
+        try:
+            async with asyncio.timeout(seconds) as deadline:
+                if astep is not None:
+                    return await astep(**kwargs)
+                future = TIMED_STEP_EXECUTOR.submit(contextvars.copy_context().run, partial(step, **kwargs))
+                return await asyncio.wrap_future(future)
+        except TimeoutError:
+            if not deadline.expired():
+                raise
+            if future is not None and not future.cancel():
+                _track_overrun(name, future)
+            raise expired() from None
+
+    return timed_step, timed_astep
+
+def run_inline(fn: Callable[[dict], Any]):
+    """Async adapter for cheap control functions that don't need a thread hop"""
+    async def run(task_input: dict):
+        return fn(task_input)
+    return run
+
 def _eval_value(expr: str, state: Dict[str, Any]):
     if expr is None:
         raise ValueError("Value is None")
@@ -37,21 +143,6 @@ def _eval_value(expr: str, state: Dict[str, Any]):
             pass
     return state.get(expr)
 
-
-def _eval_condition(expr: str, state: Dict[str, Any]) -> bool:
-    if expr is None:
-        raise ValueError("Condition is None")
-    
-    expr = str(expr).strip()
-    # Replace variable names in the expression with their corresponding values from state
-    def repl(match):
-        key = match.group(0)
-        if key in state:
-            return repr(state[key])
-        return "False"
-    expr_py = re.sub(r"([A-Za-z_][A-Za-z0-9_]*)\.([A-Za-z_][A-Za-z0-9_]*)", repl, expr)
-    return bool(eval(expr_py))
-
 def extract_dependencies(inputs: List, workflow_inputs: Set[str]) -> Set[str]:
     """Extract node dependencies from input assignments"""
     dependencies = set()
@@ -85,6 +176,7 @@ def extract_in_cycle_dependencies(inputs: List, cycle_inputs: Set[str], cycle_st
     return dependencies
 
 def make_cycle_guard_pregel_node(cycle: CycleClass, iteration_key: str, all_in_cycle_outputs: set[str]):
+    guard_condition = compile_condition(cycle.guard.when)
     def cycle_guard(task_input: dict) -> dict:
         all_inputs_available = all(task_input.get(inp.default_value) is not None 
                                    for inp in cycle.guard.inputs if inp.default_value is not None and not inp.optional)
@@ -93,7 +185,7 @@ def make_cycle_guard_pregel_node(cycle: CycleClass, iteration_key: str, all_in_c
         
         update = {}
         count = task_input.get(iteration_key, 0)
-        if _eval_condition(cycle.guard.when, task_input) or count >= cycle.max_iterations - 1:
+        if guard_condition(task_input) or count >= cycle.max_iterations - 1:
             # Prepare the output of the cycle block
             for out in cycle.outputs:
                 val = _eval_value(out.default_value, task_input)
@@ -133,38 +225,187 @@ def create_cycle_start_pregel_node(cycle: CycleClass,
                                           channels=triggers + list(all_in_cycle_outputs), 
                                           triggers=triggers)
 
-def make_pregel_task(node: NodeClass, fn_map: Dict[str, Any]):
+def resolve_exception(name: str, fn_map: Dict[str, Any]) -> type[Exception]:
+    """Exception classes in retry_on come from the steps module or builtins"""
+    exc = fn_map.get(name, getattr(builtins, name, None))
+    if not (isinstance(exc, type) and issubclass(exc, Exception)):
+        raise ValueError(f"Unknown exception '{name}' in retry_on")
+    return exc
+
+def referenced_names(nodes: List[NodeClass | CycleClass | MapClass]) -> Set[str]:
+    """Names the nodes look up in the function map: step calls and retry_on exceptions"""
+    names = set()
+    for node in nodes:
+        if isinstance(node, NodeClass):
+            names.add(node.call)
+            if node.retry and node.retry.retry_on:
+                names.update(node.retry.retry_on)
+        else:
+            names |= referenced_names(node.nodes)
+    return names
+
+def resolve_functions(workflow: Workflow, module: Any) -> Dict[str, Any]:
+    """Function map holding only the names the workflow references, taken from the steps module"""
+    fn_map, missing = {}, []
+    for name in sorted(referenced_names(workflow.nodes)):
+        value = getattr(module, name, None)
+        if callable(value):
+            fn_map[name] = value
+        elif not hasattr(builtins, name):
+            missing.append(name)
+    if missing:
+        raise ValueError(f"Workflow {workflow.name}: {', '.join(missing)} not found in {module.__name__}")
+    return fn_map
+
+def make_retry_policy(node: NodeClass, fn_map: Dict[str, Any]) -> RetryPolicy | None:
+    retry = node.retry
+    if retry is None:
+        return None
+    if retry.backoff not in BACKOFF_STRATEGIES:
+        raise ValueError(f"Node {node.name}: unknown backoff '{retry.backoff}', "
+                         f"expected one of {tuple(BACKOFF_STRATEGIES)}")
+    if retry.policy not in FAIL_POLICIES:
+        raise ValueError(f"Node {node.name}: unknown retry policy '{retry.policy}', expected one of {FAIL_POLICIES}")
+    if retry.attempts < 1:
+        raise ValueError(f"Node {node.name}: retry attempts must be at least 1")
+    backoff_factor, jitter = BACKOFF_STRATEGIES[retry.backoff]
+    retry_on = tuple(resolve_exception(name, fn_map) for name in retry.retry_on) if retry.retry_on else default_retry_on
+    return RetryPolicy(initial_interval=parse_duration(retry.delay) if retry.delay else DEFAULT_RETRY_DELAY,
+                       backoff_factor=backoff_factor,
+                       max_attempts=retry.attempts,
+                       jitter=jitter,
+                       retry_on=retry_on)
+
+def is_retried(policy: RetryPolicy, error: Exception) -> bool:
+    if isinstance(policy.retry_on, tuple):
+        return isinstance(error, policy.retry_on)
+    return policy.retry_on(error)
+
+def make_pregel_task(node: NodeClass,
+                     fn_map: Dict[str, Any],
+                     retry_policy: RetryPolicy | None = None,
+                     workflow_name: str = ""):
+    """Return sync and async variants of the node task"""
     func = fn_map.get(node.call)
     if not callable(func):
         raise ValueError(f"Function '{node.call}' not provided")
     metadata = {constant.name: constant.value for constant in node.constants}
-    def task(task_input: dict) -> dict:
+    when_condition = compile_condition(node.when) if node.when else None
+
+    def node_inputs(task_input: dict) -> dict | None:
         all_inputs_available = all(task_input.get(inp.default_value) is not None 
                                    for inp in node.inputs if not inp.optional and inp.default_value is not None)
         if not all_inputs_available:
             return None
     
-        if node.when and not _eval_condition(node.when, task_input):
+        if when_condition and not when_condition(task_input):
             return None
         
-        inputs = {inp.name: task_input.get(inp.default_value, None) for inp in node.inputs}
+        return {inp.name: task_input.get(inp.default_value, None) for inp in node.inputs}
+
+    def with_node_name(update: dict) -> dict:
+        return {node.name + "." + k: v for k, v in update.items()}
+
+    def skip_failure(error: Exception) -> bool:
+        """With `policy: skip` a node that is out of retries produces no outputs instead of failing the run"""
+        if retry_policy is None or node.retry.policy != "skip" or isinstance(error, GraphBubbleUp):
+            return False
+        attempt = get_runtime().execution_info.node_attempt
+        if is_retried(retry_policy, error) and attempt < retry_policy.max_attempts:
+            return False
+        print(f"Skipping {node.name} after {attempt} attempts")
+        return True
+
+    if inspect.iscoroutinefunction(func):
+        if node.executor:
+            raise ValueError(f"Node {node.name}: executor is only supported for sync step functions")
+        astep = func
+
+        def step(**kwargs):
+            # Sync invocation of an async step, e.g. run_workflow from a worker thread
+            return asyncio.run(func(**kwargs))
+    elif node.executor:
+        executor = node_executor(workflow_name, node.name, node.executor.type, node.executor.max_workers)
+
+        def step(**kwargs):
+            return executor.call(func, kwargs)
+
+        async def astep(**kwargs):
+            return await executor.acall(func, kwargs)
+    else:
+        step, astep = func, None
+
+    if node.cache:
+        memo = make_node_memo(node, metadata)
+        step = memo.wrap(step)
+        astep = memo.wrap(astep) if astep else None
+
+    if node.timeout:
+        step, astep = with_timeout(node.name, parse_duration(node.timeout), step, astep)
+
+    def task(task_input: dict) -> dict:
+        inputs = node_inputs(task_input)
+        if inputs is None:
+            return None
         try:
-            update = func(**inputs, config = metadata) or {}
+            update = step(**inputs, config = metadata) or {}
         except Exception as e:
             print(f"Error in {node.call}: {e}")
+            if skip_failure(e):
+                return None
             raise e
-        update_with_node_name = {node.name + "." + k: v for k, v in update.items()}
-        return update_with_node_name
+        return with_node_name(update)
+
+    if astep is None:
+        return task, run_in_executor(task, STEP_EXECUTOR)
 
-    return task
+    async def atask(task_input: dict) -> dict:
+        inputs = node_inputs(task_input)
+        if inputs is None:
+            return None
+        try:
+            update = await astep(**inputs, config = metadata) or {}
+        except Exception as e:
+            print(f"Error in {node.call}: {e}")
+            if skip_failure(e):
+                return None
+            raise e
+        return with_node_name(update)
 
-def create_pregel_node_from_params(fn: callable, channels: List[str], triggers: List[str]):
+    return task, atask
+
+def make_node_memo(node: NodeClass, metadata: Dict[str, Any]) -> NodeMemo:
+    input_names = {inp.name for inp in node.inputs}
+    unknown = [name for name in node.cache.key or [] if name not in input_names]
+    if unknown:
+        raise ValueError(f"Node {node.name}: cache key uses unknown inputs {unknown}")
+    return NodeMemo(call=node.call,
+                    ttl=parse_duration(node.cache.ttl),
+                    key=node.cache.key,
+                    constants=metadata,
+                    backend=node.cache.backend)
+
+def add_cache_counters(node: NodeClass, channels: Dict[str, Any], counter_keys: List[str]):
+    """Per-run hit/miss counters of a cached node, returned with the workflow outputs"""
+    if node.cache:
+        for counter in (HITS, MISSES):
+            channels[node.name + "." + counter] = BinaryOperatorAggregate(int, operator.add)
+            counter_keys.append(node.name + "." + counter)
+
+def create_pregel_node_from_params(fn: callable,
+                                   channels: List[str],
+                                   triggers: List[str],
+                                   afn: callable = None,
+                                   retry_policy: RetryPolicy | None = None):
     def update_mapper(x):
         if x is None:
             return None
         updates: list[tuple[str, Any]] = []
         for k, v in x.items():
-            updates.append((k, v))
+            if k == TASKS:
+                updates.extend((TASKS, send) for send in v)
+            else:
+                updates.append((k, v))
         return updates
     
     return PregelNode(
@@ -173,18 +414,206 @@ def create_pregel_node_from_params(fn: callable, channels: List[str], triggers:
             tags=[],
             metadata={},
             writers=[ChannelWrite([ChannelWriteTupleEntry(mapper=update_mapper)])],
-            bound=fn,
-            retry_policy=[],
+            bound=RunnableCallable(fn, afn or run_inline(fn), name=fn.__name__),
+            retry_policy=[retry_policy] if retry_policy else [],
             cache_policy=None,
         )
 
-def create_pregel_node(node: NodeClass, fn_map: Dict[str, Any]):
+def create_pregel_node(node: NodeClass, fn_map: Dict[str, Any], workflow_name: str = ""):
     channels = [inp.default_value for inp in node.inputs if inp.default_value is not None]
-    return create_pregel_node_from_params(make_pregel_task(node, fn_map), channels, channels)
+    retry_policy = make_retry_policy(node, fn_map)
+    task, atask = make_pregel_task(node, fn_map, retry_policy, workflow_name)
+    return create_pregel_node_from_params(task, channels, channels, afn=atask, retry_policy=retry_policy)
+
+class MapItems:
+    """Shared by the item tasks of one map run: bounds how many bodies run at once and, when an item
+    fails, holds its error back until the bodies already running have finished. LangGraph cancels the
+    other tasks of a superstep on the first error, which would drop the results of items that were
+    about to complete and run them (and their side effects) again on resume.
+    """
+
+    def __init__(self, max_concurrency: int):
+        self.max_concurrency = max_concurrency
+        self.slots = threading.BoundedSemaphore(max_concurrency)
+        self.idle = threading.Condition()
+        self.tasks = 0
+        self.running = 0
+        self.error: Exception | None = None
+        self._aslots: asyncio.Semaphore | None = None
+        self._aidle: asyncio.Condition | None = None
+
+    def _enter(self):
+        with self.idle:
+            self.tasks += 1
+
+    def _leave(self):
+        # The last item task of a failed run clears the error, so a resumed run starts clean
+        with self.idle:
+            self.tasks -= 1
+            if not self.tasks:
+                self.error = None
+
+    def _start(self) -> bool:
+        with self.idle:
+            if self.error is None:
+                self.running += 1
+            return self.error is None
+
+    def _finish(self, error: Exception | None):
+        with self.idle:
+            self.running -= 1
+            if error is not None and self.error is None:
+                self.error = error
+            self.idle.notify_all()
+
+    def run(self, body: Callable[[], Any]) -> Any:
+        self._enter()
+        try:
+            error = None
+            with self.slots:
+                if self._start():
+                    try:
+                        return body()
+                    except Exception as e:
+                        error = e
+                    finally:
+                        self._finish(error)
+            with self.idle:
+                self.idle.wait_for(lambda: self.running == 0)
+                error = error or self.error
+            raise error
+        finally:
+            self._leave()
+
+    async def arun(self, body: Callable[[], Awaitable[Any]]) -> Any:
+        if self._aslots is None:
+            self._aslots = asyncio.Semaphore(self.max_concurrency)
+            self._aidle = asyncio.Condition()
+        self._enter()
+        try:
+            error = None
+            async with self._aslots:
+                if self._start():
+                    try:
+                        return await body()
+                    except Exception as e:
+                        error = e
+                    finally:
+                        self._finish(error)
+                        async with self._aidle:
+                            self._aidle.notify_all()
+            async with self._aidle:
+                await self._aidle.wait_for(lambda: self.running == 0)
+                error = error or self.error
+            raise error
+        finally:
+            self._leave()
+
+def make_map_pregel_nodes(map_node: MapClass,
+                          fn_map: Dict[str, Any],
+                          channels: Dict[str, Any],
+                          workflow_name: str = "") -> Dict[str, PregelNode]:
+    """Compile the map body into a sub-graph and fan its items out as separate Pregel tasks.
+
+    The map node sends one `{map}_map_item` task per element of the `over` input, so the items of a
+    failed superstep that did finish are checkpointed and not re-run on resume. `{map}_map_gather`
+    writes the map outputs, in item order, once every item result is in.
+    """
+    if map_node.over not in {inp.name for inp in map_node.inputs}:
+        raise ValueError(f"Map {map_node.name} iterates over unknown input '{map_node.over}'")
+    item_key = map_node.name + "." + map_node.item
+    over_key = map_node.name + "." + map_node.over
+    count_key = map_node.name + ".item_count"
+    results_key = map_node.name + ".item_results"
+    item_name = f"{map_node.name}_map_item"
+    gather_name = f"{map_node.name}_map_gather"
+    channels[count_key] = LastValue(int)
+    channels[results_key] = BinaryOperatorAggregate(list, operator.add)
+    body = build_workflow_graph(
+        Workflow(
+            # Qualified so body nodes get executor pools of their own workflow
+            name=f"{workflow_name}.{map_node.name}",
+            inputs=[Input(type=inp.type, name=map_node.name + "." + inp.name)
+                    for inp in map_node.inputs if inp.name != map_node.over] + [Input(type="Any", name=item_key)],
+            outputs=[Output(type=out.type, name=out.name, default_value=out.default_value)
+                     for out in map_node.outputs],
+            nodes=map_node.nodes,
+        ),
+        fn_map,
+    )
+    body_config = {"recursion_limit": 100}
+    inputs_dict = {inp.name: inp.default_value for inp in map_node.inputs if inp.default_value is not None}
+
+    # Memo hits and misses of the body nodes, summed over the items and passed up to the parent run
+    counter_keys = []
+    for body_node in map_node.nodes:
+        add_cache_counters(body_node, {}, counter_keys)
+
+    def gather(results: list[dict]) -> dict:
+        update = {map_node.name + "." + out.name: [result.get(out.default_value) for result in results]
+                  for out in map_node.outputs}
+        for key in counter_keys:
+            update[key] = sum(result.get(key, 0) for result in results)
+        return update
+
+    def map_task(task_input: dict) -> dict:
+        all_inputs_available = all(task_input.get(inp.default_value) is not None
+                                   for inp in map_node.inputs if not inp.optional and inp.default_value is not None)
+        if not all_inputs_available:
+            return None
+        shared = {map_node.name + "." + k: _eval_value(expr, task_input) for k, expr in inputs_dict.items()}
+        items = shared.pop(over_key) or []
+        if not items:
+            return gather([])
+        token = uuid.uuid4().hex
+        return {count_key: len(items),
+                TASKS: [Send(item_name, {"index": index, "token": token, "params": dict(shared, **{item_key: item})})
+                        for index, item in enumerate(items)]}
+
+    # Item tasks of one map run find their MapItems by the token the map node sent them with
+    map_runs = weakref.WeakValueDictionary()
+    map_runs_lock = threading.Lock()
+
+    def map_items(token: str) -> MapItems:
+        with map_runs_lock:
+            items = map_runs.get(token)
+            if items is None:
+                items = map_runs[token] = MapItems(map_node.max_concurrency)
+            return items
+
+    # Item runs are isolated from the parent run's context so they don't share its checkpoint namespace
+    def item_task(task_input: dict) -> dict:
+        items = map_items(task_input["token"])
+        result = items.run(lambda: contextvars.Context().run(body.invoke, task_input["params"], body_config))
+        return {results_key: [(task_input["index"], result)]}
+
+    async def aitem_task(task_input: dict) -> dict:
+        items = map_items(task_input["token"])
+        result = await items.arun(lambda: asyncio.create_task(body.ainvoke(task_input["params"], body_config),
+                                                              context=contextvars.Context()))
+        return {results_key: [(task_input["index"], result)]}
+
+    def gather_task(task_input: dict) -> dict:
+        results = task_input.get(results_key) or []
+        if len(results) < task_input.get(count_key, 0):
+            return None
+        return gather([result for _, result in sorted(results, key=lambda entry: entry[0])])
+
+    map_channels = [inp.default_value for inp in map_node.inputs if inp.default_value is not None]
+    return {
+        map_node.name: create_pregel_node_from_params(map_task, map_channels, map_channels),
+        item_name: create_pregel_node_from_params(item_task, [], [], afn=aitem_task),
+        gather_name: create_pregel_node_from_params(gather_task, [results_key, count_key], [results_key]),
+    }
 
 def build_pregel_graph(path: str, functions: Dict[str, Any], checkpointer: Any | None = None, debug: bool = False):
     workflow: Workflow = parse_awsl_to_objects(path)
-    
+    return build_workflow_graph(workflow, functions, checkpointer=checkpointer, debug=debug)
+
+def build_workflow_graph(workflow: Workflow,
+                         functions: Dict[str, Any],
+                         checkpointer: Any | None = None,
+                         debug: bool = False):
     # Dynamically build fields from workflow inputs, outputs, and all node inputs/outputs
     field_names = {}
     
@@ -205,15 +634,28 @@ def build_pregel_graph(path: str, functions: Dict[str, Any], checkpointer: Any |
     number_of_cycles = 0
     nodes = {}
     cycle_iteration_keys = []
+    cache_counter_keys = []
     for node in workflow.nodes:
         if isinstance(node, NodeClass):
             for out in node.outputs:
                 field_names[node.name + "." + out.name] = LastValue(Any)
+            add_cache_counters(node, field_names, cache_counter_keys)
             deps = extract_dependencies(node.inputs, workflow_inputs)
             node_dependencies[node.name] = deps
             
             # Add node to graph
-            nodes[node.name] = create_pregel_node(node, fn_map)
+            nodes[node.name] = create_pregel_node(node, fn_map, workflow.name)
+
+        elif isinstance(node, MapClass):
+            for out in node.outputs:
+                if out.reducer == Reducer.APPEND:
+                    field_names[node.name + "." + out.name] = BinaryOperatorAggregate(list[Any], operator.add)
+                else:
+                    field_names[node.name + "." + out.name] = LastValue(Any)
+            for body_node in node.nodes:
+                add_cache_counters(body_node, field_names, cache_counter_keys)
+            node_dependencies[node.name] = extract_dependencies(node.inputs, workflow_inputs)
+            nodes.update(make_map_pregel_nodes(node, fn_map, field_names, workflow.name))
                 
         elif isinstance(node, CycleClass):
             number_of_cycles += 1
@@ -228,6 +670,7 @@ def build_pregel_graph(path: str, functions: Dict[str, Any], checkpointer: Any |
             for inp in node.inputs:
                 field_names[node.name + "." + inp.name] = LastValue(Any)
             for in_cycle_node in node.nodes:
+                add_cache_counters(in_cycle_node, field_names, cache_counter_keys)
                 for out in in_cycle_node.outputs:
                     in_cycle_node_output_names.add(in_cycle_node.name + "." + out.name)
                     if out.reducer == Reducer.APPEND:
@@ -258,7 +701,7 @@ def build_pregel_graph(path: str, functions: Dict[str, Any], checkpointer: Any |
             for cycle_node in node.nodes:
                 deps = extract_in_cycle_dependencies(cycle_node.inputs, cycle_inputs_and_outputs, cycle_start_name)
                 node_dependencies[cycle_node.name] = deps
-                nodes[cycle_node.name] = create_pregel_node(cycle_node, fn_map)
+                nodes[cycle_node.name] = create_pregel_node(cycle_node, fn_map, workflow.name)
                 nodes_outputs.extend([cycle_node.name + "." + out.name for out in cycle_node.outputs])
 
             #node.nodes_outputs = nodes_outputs
@@ -278,31 +721,94 @@ def build_pregel_graph(path: str, functions: Dict[str, Any], checkpointer: Any |
     if len(output_nodes) == 0:
         raise ValueError(f"There is no output node detected in {workflow.name}")
 
+    # Bounds how many nodes of one superstep run at the same time
+    max_parallelism = workflow.metadata.entries.get("max_parallelism") if workflow.metadata else None
+
     app = Pregel(
         nodes=nodes,
         channels=field_names,
         input_channels=workflow_inputs,
-        output_channels=[out.default_value for out in workflow.outputs]+cycle_iteration_keys,
+        output_channels=[out.default_value for out in workflow.outputs]+cycle_iteration_keys+cache_counter_keys,
+        checkpointer=checkpointer,
+        debug=debug,
+        config={"max_concurrency": int(max_parallelism)} if max_parallelism else None,
     )
 
     return app
 
+def get_compiled_workflow(path: str, functions: Dict[str, Any]):
+    """Return the compiled graph for a workflow file, building it only on a cache miss"""
+    return compiled_workflows.get_or_build(path, functions, lambda: build_pregel_graph(path, functions=functions))
+
+def _workflow_app(workflow_path: str, fn_map, checkpointer: Any | None, debug: bool, use_cache: bool):
+    if not use_cache:
+        return build_pregel_graph(workflow_path, functions=fn_map, checkpointer=checkpointer, debug=debug)
+    app = get_compiled_workflow(workflow_path, fn_map)
+    if checkpointer is not None or debug:
+        # The cached graph is shared, so per-run settings are bound to a shallow copy
+        app = app.copy({"checkpointer": checkpointer, "debug": debug})
+    return app
+
+def _workflow_input(params: Dict[str, Any] | None, resume: str | None, has_checkpoint: bool = False):
+    if resume:
+        return Command(resume=json.loads(resume))
+    if has_checkpoint:
+        # Continue after the last completed superstep; only unfinished nodes run again
+        return None
+    return params or {}
+
 def run_workflow(workflow_path: str,
                  fn_map=None,
                  params: Dict[str, Any] | None = None,
                  thread_id: str | None = None,
                  resume: str | None = None,
                  checkpointer: Any | None = None,
-                 debug: bool = False):
-    app = build_pregel_graph(workflow_path, functions=fn_map, checkpointer=checkpointer, debug=debug)
+                 debug: bool = False,
+                 use_cache: bool = True,
+                 resume_existing: bool = False):
+    """With resume_existing a thread that already has a checkpoint continues from it instead of
+    starting over with params"""
+    app = _workflow_app(workflow_path, fn_map, checkpointer, debug, use_cache)
     config: Dict[str, Any] = {"configurable": {"thread_id": thread_id}, "recursion_limit": 100}
-    if resume:
-        resume_val = json.loads(resume)
-        result = app.invoke(Command(resume=resume_val), config)
-    else:
-        result = app.invoke(params or {}, config)
-    return result
+    has_checkpoint = resume_existing and checkpointer is not None and checkpointer.get_tuple(config) is not None
+    return app.invoke(_workflow_input(params, resume, has_checkpoint), config)
+
+async def arun_workflow(workflow_path: str,
+                        fn_map=None,
+                        params: Dict[str, Any] | None = None,
+                        thread_id: str | None = None,
+                        resume: str | None = None,
+                        checkpointer: Any | None = None,
+                        debug: bool = False,
+                        use_cache: bool = True,
+                        resume_existing: bool = False,
+                        on_node: Callable[[str], Awaitable[None]] | None = None):
+    """Run the workflow on the event loop: async steps are awaited, sync steps run in STEP_EXECUTOR.
+
+    on_node is awaited with the name of every node as soon as it completes with an update.
+    """
+    app = _workflow_app(workflow_path, fn_map, checkpointer, debug, use_cache)
+    config: Dict[str, Any] = {"configurable": {"thread_id": thread_id}, "recursion_limit": 100}
+    has_checkpoint = (resume_existing and checkpointer is not None
+                      and await checkpointer.aget_tuple(config) is not None)
+    workflow_input = _workflow_input(params, resume, has_checkpoint)
+    if on_node is None:
+        return await app.ainvoke(workflow_input, config)
 
+    # Same result as ainvoke, which streams updates and values internally
+    latest, interrupts = None, []
+    async for mode, chunk in app.astream(workflow_input, config, stream_mode=["updates", "tasks", "values"],
+                                         output_keys=app.output_channels):
+        if mode == "values":
+            latest = chunk
+        elif mode == "updates":
+            interrupts.extend(chunk.get(INTERRUPT, ()))
+        elif chunk.get("result"):
+            # Nodes triggered before all their inputs are available finish without writes
+            await on_node(chunk["name"])
+    if interrupts:
+        return {**(latest or {}), INTERRUPT: interrupts}
+    return latest
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Run an AWsl workflow.")
@@ -318,7 +824,7 @@ if __name__ == "__main__":
     args = parser.parse_args()
 
     mod = __import__(args.functions, fromlist=["*"])
-    fn_map = {k: getattr(mod, k) for k in dir(mod) if not k.startswith("_")}
+    fn_map = resolve_functions(parse_awsl_to_objects(args.workflow_path), mod)
 
     def parse_params(param_list: List[str]):
         out = {}
@@ -0,0 +1,104 @@
+"""Process-wide cache of compiled AWSL workflows."""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Tuple
+
+DEFAULT_CACHE_SIZE = int(os.getenv("AWSL_WORKFLOW_CACHE_SIZE", 32))
+
+
+def file_content_hash(path: str | Path) -> str:
+    return hashlib.sha256(Path(path).read_bytes()).hexdigest()
+
+
+def functions_identity(functions: Dict[str, Any] | None) -> Tuple[Tuple[str, int], ...]:
+    """Identity of a function map: the same callables bound to the same names."""
+    return tuple(sorted((name, id(fn)) for name, fn in (functions or {}).items()))
+
+
+@dataclass
+class CacheEntry:
+    key: Tuple[str, str, Tuple[Tuple[str, int], ...]]
+    mtime_ns: int
+    size: int
+    value: Any
+    # Keeps the callables alive so their ids stay unique while the entry exists
+    functions: Dict[str, Any]
+
+
+class CompiledWorkflowCache:
+    """LRU cache of compiled workflows keyed by file path, content hash and function map identity.
+
+    The file is only re-read and re-hashed when its mtime or size changes, so a warm lookup
+    costs a single ``stat`` call.
+    """
+
+    def __init__(self, maxsize: int = DEFAULT_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[tuple, CacheEntry]" = OrderedDict()
+        # (path, functions identity) -> key of the latest entry, used to skip hashing on unchanged files
+        self._latest: Dict[tuple, tuple] = {}
+        self._lock = threading.Lock()
+
+    def get_or_build(self, path: str, functions: Dict[str, Any] | None, builder: Callable[[], Any]) -> Any:
+        path = os.path.abspath(path)
+        fn_identity = functions_identity(functions)
+        stat = os.stat(path)
+
+        with self._lock:
+            latest_key = self._latest.get((path, fn_identity))
+            entry = self._entries.get(latest_key) if latest_key else None
+            if entry and entry.mtime_ns == stat.st_mtime_ns and entry.size == stat.st_size:
+                self._entries.move_to_end(entry.key)
+                self.hits += 1
+                return entry.value
+
+        key = (path, file_content_hash(path), fn_identity)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry:
+                # Touched but unchanged file: refresh the stat snapshot
+                entry.mtime_ns, entry.size = stat.st_mtime_ns, stat.st_size
+                self._latest[(path, fn_identity)] = key
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry.value
+            self.misses += 1
+
+        value = builder()
+
+        with self._lock:
+            self._entries[key] = CacheEntry(key=key,
+                                            mtime_ns=stat.st_mtime_ns,
+                                            size=stat.st_size,
+                                            value=value,
+                                            functions=dict(functions or {}))
+            self._entries.move_to_end(key)
+            self._latest[(path, fn_identity)] = key
+            while len(self._entries) > self.maxsize:
+                evicted_key, _ = self._entries.popitem(last=False)
+                latest_id = (evicted_key[0], evicted_key[2])
+                if self._latest.get(latest_id) == evicted_key:
+                    del self._latest[latest_id]
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._latest.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+compiled_workflows = CompiledWorkflowCache()
@@ -1,14 +1,70 @@
 import os
-from sqlalchemy import create_engine
+from typing import AsyncIterator
+
+from sqlalchemy import Engine, create_engine, inspect
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base, Session
 
 Base = declarative_base()
 
+# Async drivers for the request path; the sync engine is kept for DDL, scripts and tests
+ASYNC_DRIVERS = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+# Connections per backend process; each in-flight request holds one only while it awaits the database
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 10))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 20))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))
+
+
+def async_database_url(url: str) -> str:
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for database '{backend}'")
+    return parsed.set(drivername=ASYNC_DRIVERS[backend]).render_as_string(hide_password=False)
+
+
+def _async_engine_options(url: str) -> dict:
+    if make_url(url).get_backend_name() != "postgresql":
+        return {}
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_pre_ping": True,
+    }
+
+
 engine = create_engine(os.getenv("DATABASE_URL"), echo=False, future=True)
 SessionLocal = sessionmaker(bind=engine)
 
-def init_db() -> None:
-    Base.metadata.create_all(engine)
+async_engine = create_async_engine(async_database_url(os.getenv("DATABASE_URL")),
+                                   echo=False,
+                                   **_async_engine_options(os.getenv("DATABASE_URL")))
+AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False)
+
+# Columns added to tables after their first release, with the DDL that adds them to an existing,
+# possibly non-empty table. NOT NULL columns need a DEFAULT here so existing rows get a value.
+ADDED_COLUMNS = {
+    ("workflow_runs", "priority"): "INTEGER NOT NULL DEFAULT 0",
+}
+
+def _add_missing_columns(bind: Engine) -> None:
+    inspector = inspect(bind)
+    with bind.begin() as conn:
+        for (table, column), ddl in ADDED_COLUMNS.items():
+            if column not in {existing["name"] for existing in inspector.get_columns(table)}:
+                conn.exec_driver_sql(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}")
+
+def init_db(bind: Engine | None = None) -> None:
+    """Create the tables in DATABASE_URL, or in the database of `bind`"""
+    bind = bind or engine
+    Base.metadata.create_all(bind)
+    # create_all skips tables that already exist, so columns and indexes added later are created here
+    _add_missing_columns(bind)
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind, checkfirst=True)
 
 def get_session() -> Session:
     db = SessionLocal()
@@ -16,3 +72,7 @@ def get_session() -> Session:
         yield db
     finally:
         db.close()
+
+async def get_async_session() -> AsyncIterator[AsyncSession]:
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,76 @@
+"""Relay of run events from Postgres NOTIFY to the /workflows/{id}/events streams.
+
+A single LISTEN connection per backend process receives everything published on
+EVENTS_CHANNEL and hands each event to the queues of the streams following that run,
+so an open stream costs no database work until its run actually changes. A dropped
+connection is re-established with backoff and bumps `generation`; streams catch up on
+what they missed by re-reading their run on the next keepalive after it changed.
+"""
+
+import asyncio
+import json
+import logging
+from collections import defaultdict
+
+from sqlalchemy.engine import make_url
+
+from backend.notifications import EVENTS_CHANNEL, listen
+
+logger = logging.getLogger(__name__)
+
+class RunEvents:
+    def __init__(self) -> None:
+        self._streams: dict[str, set[asyncio.Queue]] = defaultdict(set)
+        self._task: asyncio.Task | None = None
+        # Counts LISTEN (re)connects; notifications may have been missed whenever it changes
+        self.generation = 0
+
+    async def start(self, database_url: str | None) -> None:
+        """LISTEN for run events in the background; other databases have no NOTIFY, their streams
+        only see transitions when they re-read the run on keepalive"""
+        if not database_url or make_url(database_url).get_backend_name() != "postgresql":
+            return
+        dsn = make_url(database_url).set(drivername="postgresql").render_as_string(hide_password=False)
+        self._task = asyncio.create_task(listen(dsn, {EVENTS_CHANNEL: self.on_notify}, on_connect=self._on_connect))
+
+    @property
+    def listening(self) -> bool:
+        """Whether streams are told about transitions; False on databases without NOTIFY"""
+        return self._task is not None
+
+    def _on_connect(self) -> None:
+        self.generation += 1
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def subscribe(self, run_id: str) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue()
+        self._streams[run_id].add(queue)
+        return queue
+
+    def unsubscribe(self, run_id: str, queue: asyncio.Queue) -> None:
+        streams = self._streams.get(run_id)
+        if streams is None:
+            return
+        streams.discard(queue)
+        if not streams:
+            del self._streams[run_id]
+
+    def on_notify(self, _conn, _pid, _channel, payload: str) -> None:
+        try:
+            event = json.loads(payload)
+        except ValueError:
+            logger.warning("Ignoring malformed run event %r", payload)
+            return
+        self.publish(event)
+
+    def publish(self, event: dict) -> None:
+        for queue in self._streams.get(event.get("id"), ()):
+            queue.put_nowait(event)
+
+    def __len__(self) -> int:
+        return sum(len(streams) for streams in self._streams.values())
@@ -1,24 +1,33 @@
 from __future__ import annotations
 
+import asyncio
+import base64
 import json
+import os
 import uuid
 from contextlib import asynccontextmanager
+from datetime import datetime
 from enum import Enum
-from typing import Optional
+from typing import Any, Optional
 
-from fastapi import FastAPI, Depends, HTTPException
+from fastapi import FastAPI, Depends, HTTPException, Query, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from sqlalchemy import select
-from sqlalchemy.orm import Session
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from backend.database import init_db, get_session
+from backend.database import AsyncSessionLocal, async_engine, init_db, get_async_session
+from backend.events import RunEvents
 from backend.models import WorkflowRun
-from backend.workflow_loader import list_templates, get_template
+from backend.notifications import CANCEL_CHANNEL, EVENTS_CHANNEL, JOBS_CHANNEL, notify, state_event
+from backend.workflow_loader import list_templates, get_template, template_registry
 from fastapi_mcp import FastApiMCP
 
 class WorkflowStatus(str, Enum):
     QUEUED = "queued"
+    # Taken off the queue by a worker process that hasn't started it yet
+    CLAIMED = "claimed"
     RUNNING = "running"
     NEEDS_INPUT = "needs_input"
     FAILED = "failed"
@@ -30,6 +39,7 @@ class WorkflowStatus(str, Enum):
 class StartWorkflowRequest(BaseModel):
     template_name: str
     inputs: dict = {}
+    priority: int = 0
 
 
 class ContinueWorkflowRequest(BaseModel):
@@ -58,19 +68,57 @@ class WorkflowHistory(BaseModel):
     created_at: str
 
 
+class TemplateParam(BaseModel):
+    name: str
+    type: str
+    optional: bool = False
+    default: Any = None
+
+
 class TemplateInfo(BaseModel):
     id: str
     name: str
     path: str
+    hash: str
+    workflow: Optional[str] = None
+    metadata: dict[str, str] = {}
+    inputs: list[TemplateParam] = []
+    outputs: list[TemplateParam] = []
+
+
+HISTORY_PAGE_SIZE = 50
+HISTORY_MAX_PAGE_SIZE = 500
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+# Comment line sent on idle event streams so proxies don't close them
+EVENTS_KEEPALIVE = float(os.getenv("EVENTS_KEEPALIVE", 15))
+# States after which a run never changes again and its event stream ends
+FINAL_STATES = {WorkflowStatus.SUCCEEDED, WorkflowStatus.FAILED, WorkflowStatus.CANCELED}
+
+run_events = RunEvents()
+
+
+def encode_cursor(created_at: datetime, run_id: str) -> str:
+    return base64.urlsafe_b64encode(f"{created_at.isoformat()}|{run_id}".encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, str]:
+    try:
+        created_at, run_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|", 1)
+        return datetime.fromisoformat(created_at), run_id
+    except ValueError:
+        raise HTTPException(400, "Invalid cursor")
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
     init_db()
+    template_registry.refresh()
+    await run_events.start(os.getenv("DATABASE_URL"))
     yield
     # Shutdown
-    pass
+    await run_events.stop()
+    await async_engine.dispose()
 
 app = FastAPI(lifespan=lifespan, docs_url="/api/docs")
 
@@ -82,6 +130,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],  # Allow all methods (GET, POST, PUT, DELETE, etc.)
     allow_headers=["*"],  # Allow all headers
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
 
@@ -92,9 +141,29 @@ def templates() -> list[TemplateInfo]:
 
 
 @app.get("/workflows", operation_id="getWorkflows")
-def workflows_history(db: Session = Depends(get_session)) -> list[WorkflowHistory]:
-    result = db.execute(select(WorkflowRun))
-    runs = result.scalars().all()
+async def workflows_history(
+    response: Response,
+    status: Optional[list[WorkflowStatus]] = Query(None),
+    template: Optional[str] = None,
+    limit: int = Query(HISTORY_PAGE_SIZE, ge=1, le=HISTORY_MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_session),
+) -> list[WorkflowHistory]:
+    """Newest runs first. The cursor for the next page is returned in the X-Next-Cursor header."""
+    # Only the listed columns are loaded, never the inputs/result JSON
+    query = select(WorkflowRun.id, WorkflowRun.graph_name, WorkflowRun.state, WorkflowRun.created_at)
+    if status:
+        query = query.where(WorkflowRun.state.in_([s.value for s in status]))
+    if template:
+        query = query.where(WorkflowRun.graph_name == template)
+    if cursor:
+        query = query.where(tuple_(WorkflowRun.created_at, WorkflowRun.id) < decode_cursor(cursor))
+    query = query.order_by(WorkflowRun.created_at.desc(), WorkflowRun.id.desc()).limit(limit + 1)
+
+    rows = (await db.execute(query)).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(rows[-1].created_at, rows[-1].id)
     return [
         WorkflowHistory(
             id=r.id,
@@ -102,15 +171,11 @@ def workflows_history(db: Session = Depends(get_session)) -> list[WorkflowHistor
             status=r.state,
             created_at=str(r.created_at),
         )
-        for r in runs
+        for r in rows
     ]
 
 
-@app.get("/workflows/{workflow_run_id}", operation_id="getWorkflowDetails")
-def workflow_detail(workflow_run_id: str, db: Session = Depends(get_session)) -> WorkflowDetail:
-    run = db.get(WorkflowRun, workflow_run_id)
-    if not run:
-        raise HTTPException(404, "Workflow not found")
+def to_detail(run: WorkflowRun) -> WorkflowDetail:
     return WorkflowDetail(
         id=run.id,
         inputs=run.inputs,
@@ -121,10 +186,85 @@ def workflow_detail(workflow_run_id: str, db: Session = Depends(get_session)) ->
     )
 
 
+@app.get("/workflows/{workflow_run_id}", operation_id="getWorkflowDetails")
+async def workflow_detail(workflow_run_id: str, db: AsyncSession = Depends(get_async_session)) -> WorkflowDetail:
+    run = await db.get(WorkflowRun, workflow_run_id)
+    if not run:
+        raise HTTPException(404, "Workflow not found")
+    return to_detail(run)
+
+
+async def read_detail(workflow_run_id: str) -> WorkflowDetail | None:
+    async with AsyncSessionLocal() as db:
+        run = await db.get(WorkflowRun, workflow_run_id)
+        return to_detail(run) if run else None
+
+
+async def read_state(workflow_run_id: str) -> str | None:
+    async with AsyncSessionLocal() as db:
+        return await db.scalar(select(WorkflowRun.state).where(WorkflowRun.id == workflow_run_id))
+
+
+def sse(event: str, data: str) -> str:
+    return f"event: {event}\ndata: {data}\n\n"
+
+
+@app.get("/workflows/{workflow_run_id}/events", operation_id="streamWorkflowEvents")
+async def workflow_events(workflow_run_id: str) -> StreamingResponse:
+    """Server-sent events of a run: `state` with the WorkflowDetail on connect and after every state
+    transition, `node` with the name of each completed node. The stream ends once the run is finished."""
+    # Subscribed before the first read so a transition in between is not missed
+    queue = run_events.subscribe(workflow_run_id)
+    detail = await read_detail(workflow_run_id)
+    if detail is None:
+        run_events.unsubscribe(workflow_run_id, queue)
+        raise HTTPException(404, "Workflow not found")
+
+    async def stream():
+        nonlocal detail
+        generation = run_events.generation
+        try:
+            yield sse("state", detail.model_dump_json())
+            while detail.status not in FINAL_STATES:
+                try:
+                    event = await asyncio.wait_for(queue.get(), EVENTS_KEEPALIVE)
+                except TimeoutError:
+                    # Catches up on events missed while the listener reconnected, and on databases
+                    # without NOTIFY it is the only way the stream learns about transitions
+                    if run_events.listening and run_events.generation == generation:
+                        yield ": keepalive\n\n"
+                        continue
+                    generation = run_events.generation
+                    state = await read_state(workflow_run_id)
+                    if state is None:
+                        return
+                    if state == detail.status:
+                        yield ": keepalive\n\n"
+                        continue
+                    detail = await read_detail(workflow_run_id)
+                    if detail is None:
+                        return
+                    yield sse("state", detail.model_dump_json())
+                    continue
+                if event.get("event") == "node":
+                    yield sse("node", json.dumps({"node": event["node"]}))
+                    continue
+                # NOTIFY payloads are too small for results, so only state changes read the run
+                detail = await read_detail(workflow_run_id)
+                if detail is None:
+                    return
+                yield sse("state", detail.model_dump_json())
+        finally:
+            run_events.unsubscribe(workflow_run_id, queue)
+
+    return StreamingResponse(stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
 @app.post("/workflows", operation_id="startWorkflow")
-def start_workflow(
+async def start_workflow(
     request: StartWorkflowRequest,
-    db: Session = Depends(get_session),
+    db: AsyncSession = Depends(get_async_session),
 ) -> WorkflowResponse:
     tpl = get_template(request.template_name)
     if not tpl:
@@ -136,21 +276,22 @@ def start_workflow(
         thread_id=workflow_run_id,
         state=WorkflowStatus.QUEUED,
         inputs=request.inputs,
+        priority=request.priority,
         result={},
     )
     db.add(run)
-    db.commit()
-    db.refresh(run)
+    await notify(db, JOBS_CHANNEL, workflow_run_id)
+    await db.commit()
     return WorkflowResponse(id=run.id, status=run.state, result={})
 
 
 @app.post("/workflows/{workflow_run_id}/continue", operation_id="continueWorkflow")
-def continue_workflow(
+async def continue_workflow(
     workflow_run_id: str,
     request: ContinueWorkflowRequest,
-    db: Session = Depends(get_session),
+    db: AsyncSession = Depends(get_async_session),
 ) -> WorkflowResponse:
-    run = db.get(WorkflowRun, workflow_run_id)
+    run = await db.get(WorkflowRun, workflow_run_id)
     if not run:
         raise HTTPException(404, "Workflow not found")
     if run.state == WorkflowStatus.CANCELED:
@@ -159,25 +300,30 @@ def continue_workflow(
         raise HTTPException(400, "Workflow not waiting for input")
     run.resume_payload = json.dumps({"answer": request.inputs})
     run.state = WorkflowStatus.QUEUED
-    db.commit()
-    db.refresh(run)
+    # attempt counts crash restarts for the reaper; claims that resume after human input are not crashes
+    run.attempt = 0
+    await notify(db, JOBS_CHANNEL, run.id)
+    await notify(db, EVENTS_CHANNEL, state_event(run.id, run.state))
+    await db.commit()
     return WorkflowResponse(id=run.id, status=run.state, result=run.result or {})
 
 
 @app.post("/workflows/{workflow_run_id}/cancel", operation_id="cancelWorkflow")
-def cancel_workflow(
+async def cancel_workflow(
     workflow_run_id: str,
-    db: Session = Depends(get_session),
+    db: AsyncSession = Depends(get_async_session),
 ) -> WorkflowResponse:
-    run = db.get(WorkflowRun, workflow_run_id)
+    run = await db.get(WorkflowRun, workflow_run_id)
     if not run:
         raise HTTPException(404, "Workflow not found")
-    if run.state != WorkflowStatus.RUNNING:
+    if run.state not in (WorkflowStatus.CLAIMED, WorkflowStatus.RUNNING):
         raise HTTPException(400, "Workflow not running")
     run.state = WorkflowStatus.CANCELED
-    db.commit()
-    db.refresh(run)
+    await notify(db, CANCEL_CHANNEL, run.id)
+    await notify(db, EVENTS_CHANNEL, state_event(run.id, run.state))
+    await db.commit()
     return WorkflowResponse(id=run.id, status=run.state, result=run.result or {})
 
-mcp = FastApiMCP(app, name="workflow runner")
+# Event streams never complete, so they can't be MCP tool calls
+mcp = FastApiMCP(app, name="workflow runner", exclude_operations=["streamWorkflowEvents"])
 mcp.mount()
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, Text, JSON, Integer
+from sqlalchemy import Column, String, DateTime, Text, JSON, Integer, Index, text
 from sqlalchemy.sql import func
 import uuid
 
@@ -6,6 +6,16 @@ from backend.database import Base
 
 class WorkflowRun(Base):
     __tablename__ = "workflow_runs"
+    __table_args__ = (
+        # Keyset pagination of the /workflows history, unfiltered and by status or template
+        Index("ix_workflow_runs_created_at", "created_at", "id"),
+        Index("ix_workflow_runs_state_created_at", "state", "created_at"),
+        Index("ix_workflow_runs_graph_name_created_at", "graph_name", "created_at"),
+        # Only queued rows, in claim order, so claiming stays cheap however long the history grows
+        Index("ix_workflow_runs_queue", text("priority DESC"), "created_at", "id",
+              postgresql_where=text("state = 'queued'"),
+              sqlite_where=text("state = 'queued'")),
+    )
 
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     graph_name = Column(String, nullable=False)
@@ -13,6 +23,8 @@ class WorkflowRun(Base):
     state = Column(String, nullable=False, default="queued")
     attempt = Column(Integer, nullable=False, default=0)
     max_attempts = Column(Integer, nullable=False, default=3)
+    # Higher priority runs are claimed first, FIFO by created_at within a priority
+    priority = Column(Integer, nullable=False, default=0, server_default=text("0"))
     worker_id = Column(String, nullable=True)
     started_at = Column(DateTime(timezone=True), nullable=True)
     heartbeat_at = Column(DateTime(timezone=True), nullable=True)
@@ -0,0 +1,80 @@
+import asyncio
+import json
+import logging
+from typing import Callable
+
+import asyncpg
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = logging.getLogger(__name__)
+
+# Postgres channel the worker pool LISTENs on to pick up queued runs immediately
+JOBS_CHANNEL = "workflow_jobs"
+# Channel that tells the worker running a canceled run to abort it
+CANCEL_CHANNEL = "workflow_cancel"
+# Channel of run progress (state transitions, completed nodes) relayed to the /events streams
+EVENTS_CHANNEL = "workflow_events"
+
+# A LISTEN connection is checked every LISTEN_CHECK_INTERVAL and reconnected with backoff when lost
+LISTEN_CHECK_INTERVAL = 30.0
+LISTEN_RETRY_MIN = 1.0
+LISTEN_RETRY_MAX = 30.0
+
+
+def state_event(run_id: str, state: str) -> str:
+    """Payload of a state transition; kept small since NOTIFY payloads are capped at 8000 bytes"""
+    return json.dumps({"id": run_id, "event": "state", "state": state})
+
+
+def node_event(run_id: str, node: str) -> str:
+    return json.dumps({"id": run_id, "event": "node", "node": node})
+
+
+async def notify(db: AsyncSession, channel: str, payload: str = "") -> None:
+    """Queue a NOTIFY that Postgres delivers when the session's transaction commits"""
+    if db.bind.dialect.name != "postgresql":
+        return
+    await db.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": channel, "payload": payload})
+
+
+async def listen(dsn: str | None,
+                 listeners: dict[str, Callable],
+                 on_connect: Callable[[], None] | None = None,
+                 check_interval: float = LISTEN_CHECK_INTERVAL) -> None:
+    """Hold a dedicated LISTEN connection that hands the notifications of each channel to its callback.
+
+    A dropped connection is re-established with backoff. `on_connect` runs after every connect, so the
+    caller can catch up on notifications sent while the connection was down.
+    """
+    delay = LISTEN_RETRY_MIN
+    channels = ", ".join(listeners)
+    while True:
+        lost = asyncio.Event()
+        try:
+            conn = await asyncpg.connect(dsn)
+        except (OSError, asyncpg.PostgresError, asyncpg.InterfaceError, asyncio.TimeoutError) as exc:
+            logger.warning("LISTEN on %s failed, retrying in %.0fs: %s", channels, delay, exc)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, LISTEN_RETRY_MAX)
+            continue
+        try:
+            conn.add_termination_listener(lambda _conn: lost.set())
+            for channel, callback in listeners.items():
+                await conn.add_listener(channel, callback)
+            delay = LISTEN_RETRY_MIN
+            if on_connect is not None:
+                on_connect()
+            while not lost.is_set():
+                try:
+                    await asyncio.wait_for(lost.wait(), check_interval)
+                except asyncio.TimeoutError:
+                    # A silently dropped connection is only noticed when it is used
+                    await conn.execute("SELECT 1", timeout=check_interval)
+            logger.warning("LISTEN connection for %s closed, reconnecting", channels)
+        except (OSError, asyncpg.PostgresError, asyncpg.InterfaceError, asyncio.TimeoutError) as exc:
+            logger.warning("LISTEN connection for %s lost, reconnecting in %.0fs: %s", channels, delay, exc)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, LISTEN_RETRY_MAX)
+        finally:
+            await conn.close(timeout=check_interval)
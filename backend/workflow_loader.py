@@ -1,20 +1,169 @@
+"""Index of the workflow templates under workflow_definitions.
+
+The directory is scanned at startup and kept in memory. Rescans happen at most every
+TEMPLATES_REFRESH_INTERVAL seconds, or when an unknown template is requested, and only
+re-parse the files whose mtime or size changed.
+
+The step functions of a template live in the module next to it with the same name, e.g.
+workflow_definitions/paper_rename_workflow/paper_rename_workflow.py, and are resolved
+once per template version.
+"""
+
+import importlib
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import List, Dict
+from typing import Any, Dict, List
+
+from awsl.grammar.workflow_parser import Input, Output, Workflow, parse_awsl_to_objects
+from awsl.run_awsl_workflow import resolve_functions
+from awsl.workflow_cache import file_content_hash
 
 WORKFLOWS_DIR = Path(__file__).resolve().parent.parent / "workflow_definitions"
+# Seconds a scan is reused before new, changed and removed templates are picked up
+TEMPLATES_REFRESH_INTERVAL = float(os.getenv("TEMPLATES_REFRESH_INTERVAL", 5))
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Template:
+    id: str
+    name: str
+    path: str
+    hash: str
+    mtime_ns: int
+    size: int
+    workflow: str | None = None
+    metadata: Dict[str, str] = field(default_factory=dict)
+    inputs: List[Dict[str, Any]] = field(default_factory=list)
+    outputs: List[Dict[str, Any]] = field(default_factory=list)
+    parsed: Workflow | None = field(default=None, repr=False)
+    # Function map of the steps module, resolved on first use by a worker
+    functions: Dict[str, Any] | None = field(default=None, repr=False)
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "name": self.name,
+            "path": self.path,
+            "hash": self.hash,
+            "workflow": self.workflow,
+            "metadata": dict(self.metadata),
+            "inputs": [dict(param) for param in self.inputs],
+            "outputs": [dict(param) for param in self.outputs],
+        }
+
+
+def _param(param: Input | Output) -> Dict[str, Any]:
+    return {"name": param.name, "type": str(param.type), "optional": param.optional}
+
+
+def load_template(path: Path, digest: str, stat: os.stat_result) -> Template:
+    template = Template(id=path.stem, name=path.stem, path=str(path), hash=digest,
+                        mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+    try:
+        workflow = parse_awsl_to_objects(str(path))
+    except Exception as exc:
+        # Still listed, so starting it fails with the parse error instead of "Template not found"
+        logger.warning("Could not parse template %s: %s", path, exc)
+        return template
+    set_workflow(template, workflow)
+    return template
+
+
+def set_workflow(template: Template, workflow: Workflow) -> None:
+    template.parsed = workflow
+    template.workflow = workflow.name
+    template.metadata = dict(workflow.metadata.entries) if workflow.metadata else {}
+    template.inputs = [dict(_param(inp), default=inp.default_value) for inp in workflow.inputs]
+    template.outputs = [_param(out) for out in workflow.outputs]
+
+
+def functions_module(path: Path, root: Path = WORKFLOWS_DIR) -> str:
+    """Module of the step functions, relative to the directory that contains the templates root"""
+    return ".".join(path.relative_to(root.parent).with_suffix("").parts)
+
+
+class TemplateRegistry:
+    def __init__(self, root: Path = WORKFLOWS_DIR, refresh_interval: float = TEMPLATES_REFRESH_INTERVAL):
+        self.root = root
+        self.refresh_interval = refresh_interval
+        self.parses = 0
+        self._templates: Dict[str, Template] = {}
+        self._scanned_at: float | None = None
+        self._lock = threading.Lock()
+
+    def refresh(self) -> None:
+        """Rescan the directory, re-parsing only added or modified files"""
+        with self._lock:
+            previous = {template.path: template for template in self._templates.values()}
+            templates: Dict[str, Template] = {}
+            for path in sorted(self.root.glob("**/*.awsl")):
+                template = previous.get(str(path))
+                stat = path.stat()
+                if template is None or (template.mtime_ns, template.size) != (stat.st_mtime_ns, stat.st_size):
+                    digest = file_content_hash(path)
+                    if template is not None and template.hash == digest:
+                        # Touched but unchanged
+                        template.mtime_ns, template.size = stat.st_mtime_ns, stat.st_size
+                    else:
+                        template = load_template(path, digest, stat)
+                        self.parses += 1
+                templates[template.id] = template
+            self._templates = templates
+            self._scanned_at = time.monotonic()
+
+    def _refresh_if_stale(self) -> None:
+        if self._scanned_at is None or time.monotonic() - self._scanned_at >= self.refresh_interval:
+            self.refresh()
+
+    def list(self) -> List[Dict[str, Any]]:
+        self._refresh_if_stale()
+        return [template.info() for template in self._templates.values()]
+
+    def get(self, identifier: str | None) -> Dict[str, Any] | None:
+        if not identifier:
+            return None
+        template = self._lookup(identifier)
+        return template.info() if template else None
+
+    def functions(self, identifier: str) -> Dict[str, Any]:
+        """Step functions the template calls, imported and checked against the workflow once"""
+        template = self._lookup(identifier)
+        if template is None:
+            raise ValueError("Template not found")
+        if template.functions is None:
+            if template.parsed is None:
+                # Parse errors surface here rather than when listing templates
+                set_workflow(template, parse_awsl_to_objects(template.path))
+            module = importlib.import_module(functions_module(Path(template.path), self.root))
+            template.functions = resolve_functions(template.parsed, module)
+        return template.functions
+
+    def _lookup(self, identifier: str) -> Template | None:
+        self._refresh_if_stale()
+        template = self._templates.get(identifier)
+        if template is None:
+            # A template added since the last scan is usable right away
+            self.refresh()
+            template = self._templates.get(identifier)
+        return template
+
+
+template_registry = TemplateRegistry()
+
+
+def list_templates() -> List[Dict[str, Any]]:
+    return template_registry.list()
 
 
-def list_templates() -> List[Dict[str, str]]:
-    templates: List[Dict[str, str]] = []
-    for awsl in WORKFLOWS_DIR.glob("**/*.awsl"):
-        templates.append({"id": awsl.stem, "name": awsl.stem, "path": str(awsl)})
-    return templates
+def get_template(identifier: str | None) -> Dict[str, Any] | None:
+    return template_registry.get(identifier)
 
 
-def get_template(identifier: str | None) -> Dict[str, str] | None:
-    if not identifier:
-        return None
-    for tpl in list_templates():
-        if tpl["id"] == identifier or tpl["name"] == identifier:
-            return tpl
-    return None
+def get_template_functions(identifier: str) -> Dict[str, Any]:
+    return template_registry.functions(identifier)
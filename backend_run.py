@@ -1,4 +1,7 @@
 import asyncio
+import logging
+import os
+
 import uvicorn
 from worker.worker_pool import main as worker_main
 from dotenv import load_dotenv
@@ -21,5 +24,7 @@ async def run_services():
     await asyncio.gather(backend_task, worker_task)
 
 if __name__ == "__main__":
+    # Worker logs, including the periodic claim metrics, go to stderr next to uvicorn's
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"), format="%(asctime)s %(levelname)s %(name)s: %(message)s")
     print("Starting backend server and worker pool...")
     asyncio.run(run_services())
@@ -0,0 +1,102 @@
+"""Requests per second of the backend under concurrent users.
+
+Starts the backend with uvicorn against DATABASE_URL (or targets --url), then for each
+scenario keeps --users concurrent clients busy for --duration seconds and reports
+throughput and latency percentiles.
+
+Usage:
+    DATABASE_URL=postgresql://... python -m benchmarks.bench_backend_load [--users 50] [--duration 10]
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+SCENARIOS = ("GET /workflows/{id}", "POST /workflows")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def wait_until_up(client: httpx.AsyncClient, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            await client.get("/workflow-templates")
+            return
+        except httpx.TransportError:
+            await asyncio.sleep(0.2)
+    raise RuntimeError("Backend did not start")
+
+
+async def request(client: httpx.AsyncClient, scenario: str, run_id: str) -> httpx.Response:
+    if scenario == "POST /workflows":
+        return await client.post("/workflows", json={"template_name": "sample", "inputs": {"query": "load"}})
+    return await client.get(f"/workflows/{run_id}")
+
+
+async def load(client: httpx.AsyncClient, scenario: str, run_id: str, users: int, duration: float):
+    latencies: list[float] = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+
+    async def user() -> None:
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            response = await request(client, scenario, run_id)
+            latencies.append(time.perf_counter() - start)
+            errors += response.status_code != 200
+
+    await asyncio.gather(*(user() for _ in range(users)))
+    return latencies, errors
+
+
+async def run(url: str, users: int, duration: float) -> None:
+    limits = httpx.Limits(max_connections=users, max_keepalive_connections=users)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=60) as client:
+        await wait_until_up(client)
+        run_id = (await request(client, "POST /workflows", "")).json()["id"]
+        print(f"{'scenario':<22} {'req/s':>8} {'p50':>9} {'p95':>9} {'errors':>7}")
+        for scenario in SCENARIOS:
+            latencies, errors = await load(client, scenario, run_id, users, duration)
+            quantiles = statistics.quantiles(latencies, n=20)
+            print(f"{scenario:<22} {len(latencies) / duration:>8.1f} {quantiles[9] * 1000:>7.1f}ms"
+                  f" {quantiles[18] * 1000:>7.1f}ms {errors:>7}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="Existing backend to target instead of starting one")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=10)
+    args = parser.parse_args()
+
+    if args.url:
+        asyncio.run(run(args.url, args.users, args.duration))
+        return
+
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "backend.main:app", "--port", str(port), "--log-level", "warning"],
+        env=dict(os.environ),
+    )
+    try:
+        asyncio.run(run(f"http://127.0.0.1:{port}", args.users, args.duration))
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Prompt size of process_info: joining every chunk vs dedup + BM25 packing.
+
+Chunk sets are read from a JSON file of recorded runs ([{"query": ..., "chunks": [...]}, ...],
+e.g. dumped from the Retrieve.chunks of finished workflows) or, without one, generated
+like a research loop: every iteration retrieves --top-k pages of 10000 characters, some
+seen before and some the same page with different boilerplate, and appends them to the
+chunk list. LLM time is estimated from the prompt tokens at --prefill-tps tokens/s.
+
+Usage:
+    python -m benchmarks.bench_chunk_packing [--chunks runs.json] [--iterations 10] [--prefill-tps 400]
+"""
+
+import argparse
+import json
+import random
+import time
+
+from components.chunk_packer import CONTEXT_TOKEN_BUDGET, dedupe_chunks, estimate_tokens, pack_chunks
+
+TOPICS = ["tidal", "solar", "wind", "geothermal", "hydro", "nuclear", "battery", "hydrogen"]
+
+
+def page(rng: random.Random, topic: str, number: int) -> str:
+    sentences = []
+    while sum(len(s) for s in sentences) < 10000:
+        i = len(sentences)
+        sentences.append(f"The {topic} plant {number}-{i} delivered {rng.randint(1, 900)} megawatts "
+                         f"in {rng.randint(1990, 2025)} according to report {rng.randint(1, 99999)}.")
+    return " ".join(sentences)[:10000]
+
+
+def research_loop(seed: int, iterations: int, top_k: int) -> dict:
+    rng = random.Random(seed)
+    pages = [page(rng, rng.choice(TOPICS), n) for n in range(iterations * top_k)]
+    chunks = []
+    for _ in range(iterations):
+        for _ in range(top_k):
+            text = rng.choice(pages[:len(chunks) + top_k])
+            if rng.random() < 0.3:
+                # The same page fetched again with a different banner
+                text = f"Cookie notice {rng.randint(1, 1000)}. " + text[:9950]
+            chunks.append(text)
+    return {"query": f"{rng.choice(TOPICS)} plant output in megawatts", "chunks": chunks}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunks", help="JSON file with recorded chunk sets")
+    parser.add_argument("--iterations", type=int, default=10)
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget", type=int, default=CONTEXT_TOKEN_BUDGET)
+    parser.add_argument("--prefill-tps", type=float, default=400)
+    args = parser.parse_args()
+
+    if args.chunks:
+        with open(args.chunks) as f:
+            runs = json.load(f)
+    else:
+        runs = [research_loop(seed, args.iterations, args.top_k) for seed in range(args.runs)]
+
+    before = deduped = after = packing = 0.0
+    for run in runs:
+        before += estimate_tokens("\n".join(run["chunks"]))
+        deduped += estimate_tokens("\n".join(dedupe_chunks(run["chunks"])))
+        start = time.perf_counter()
+        packed = pack_chunks(run["chunks"], run["query"], budget=args.budget)
+        packing += time.perf_counter() - start
+        after += estimate_tokens("\n".join(packed))
+
+    n = len(runs)
+    print(f"sets={n} chunks/set={sum(len(r['chunks']) for r in runs) / n:.0f} budget={args.budget}")
+    print(f"prompt tokens: joined={before / n:.0f} deduped={deduped / n:.0f} packed={after / n:.0f} "
+          f"({before / max(after, 1):.1f}x smaller)")
+    print(f"packing={packing / n * 1000:.1f}ms per set, est. prefill "
+          f"joined={before / n / args.prefill_tps:.1f}s packed={after / n / args.prefill_tps:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""Claim latency by history size, before and after the partial queue index.
+
+Fills workflow_runs in a scratch database with finished runs plus a small queue of the newest
+runs (random ids like the UUIDs the backend assigns), then times
+claiming one job (and releasing it again) with the legacy `ORDER BY id` query on an
+unindexed table and with claim_jobs on the partial index. The table is truncated first and
+its claim indexes are dropped, so the database is taken from --dsn or BENCH_DATABASE_URL and
+must not be DATABASE_URL.
+
+Usage:
+    BENCH_DATABASE_URL=postgresql://.../bench python -m benchmarks.bench_claim [--sizes 10000 100000 1000000]
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+import asyncpg
+from sqlalchemy import create_engine
+
+from backend import models  # noqa: F401 - registers the tables with init_db
+from backend.database import init_db
+from benchmarks.scratch_db import scratch_dsn
+from worker.db import claim_jobs, release_jobs
+
+QUEUED = 200
+# Indexes that did not exist when claims ordered by id
+CLAIM_INDEXES = ("ix_workflow_runs_queue", "ix_workflow_runs_state_created_at")
+
+LEGACY_SELECT = "SELECT id FROM workflow_runs WHERE state = 'queued' ORDER BY id LIMIT 1 FOR UPDATE SKIP LOCKED"
+INDEXED_SELECT = ("SELECT id FROM workflow_runs WHERE state = 'queued' "
+                  "ORDER BY priority DESC, created_at, id LIMIT 1 FOR UPDATE SKIP LOCKED")
+
+LEGACY_CLAIM = f"""
+    WITH next AS ({LEGACY_SELECT})
+    UPDATE workflow_runs
+    SET state = 'claimed', worker_id = $1, heartbeat_at = now(), attempt = attempt + 1
+    FROM next
+    WHERE workflow_runs.id = next.id
+    RETURNING workflow_runs.*
+"""
+
+
+async def fill(pool: asyncpg.pool.Pool, history: int) -> None:
+    async with pool.acquire() as conn:
+        await conn.execute("TRUNCATE workflow_runs")
+        await conn.execute(
+            """
+            INSERT INTO workflow_runs (id, graph_name, thread_id, state, attempt, max_attempts, priority,
+                                       inputs, result, created_at)
+            SELECT md5(g::text), 'sample', md5(g::text),
+                   CASE WHEN g <= $2::int THEN 'queued' WHEN g % 10 = 0 THEN 'failed' ELSE 'succeeded' END,
+                   0, 3, 0, '{"query": "bench"}', '{}', now() - g * interval '1 second'
+            FROM generate_series(1, $1::int + $2::int) AS g
+            """,
+            history,
+            QUEUED,
+        )
+        await conn.execute("ANALYZE workflow_runs")
+
+
+async def time_claims(pool: asyncpg.pool.Pool, claim, rounds: int) -> list[float]:
+    latencies = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        jobs = await claim()
+        latencies.append(time.perf_counter() - start)
+        await release_jobs(pool, "bench", [job["id"] for job in jobs])
+    return latencies
+
+
+async def server_time(pool: asyncpg.pool.Pool, query: str) -> float:
+    """Execution time of the claim's row selection inside Postgres, without the round trip"""
+    async with pool.acquire() as conn, conn.transaction():
+        plan = await conn.fetchval(f"EXPLAIN (ANALYZE, FORMAT JSON) {query}")
+    return json.loads(plan)[0]["Execution Time"] / 1000
+
+
+async def legacy_claim(pool: asyncpg.pool.Pool) -> list[dict]:
+    async with pool.acquire() as conn, conn.transaction():
+        return [dict(row) for row in await conn.fetch(LEGACY_CLAIM, "bench")]
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--rounds", type=int, default=50)
+    parser.add_argument("--dsn", help="Scratch database (default BENCH_DATABASE_URL)")
+    args = parser.parse_args()
+
+    dsn = scratch_dsn(args.dsn)
+    bench_engine = create_engine(dsn)
+    init_db(bench_engine)
+    pool = await asyncpg.create_pool(dsn=dsn)
+    print(f"{'history':>9} {'legacy median':>14} {'indexed median':>15} {'speedup':>8}"
+          f" {'legacy select':>14} {'indexed select':>15}")
+    for history in args.sizes:
+        await fill(pool, history)
+
+        for index in CLAIM_INDEXES:
+            await pool.execute(f"DROP INDEX IF EXISTS {index}")
+        await pool.execute("ANALYZE workflow_runs")
+        legacy = statistics.median(await time_claims(pool, lambda: legacy_claim(pool), args.rounds))
+        legacy_select = await server_time(pool, LEGACY_SELECT)
+
+        init_db(bench_engine)
+        await pool.execute("ANALYZE workflow_runs")
+        indexed = statistics.median(await time_claims(pool, lambda: claim_jobs(pool, "bench", 1), args.rounds))
+        indexed_select = await server_time(pool, INDEXED_SELECT)
+
+        print(f"{history:>9} {legacy * 1000:>12.2f}ms {indexed * 1000:>13.2f}ms {legacy / indexed:>7.1f}x"
+              f" {legacy_select * 1000:>12.3f}ms {indexed_select * 1000:>13.3f}ms")
+    await pool.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
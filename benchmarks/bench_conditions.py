@@ -0,0 +1,55 @@
+"""Condition evaluation cost with large state values: legacy repr/eval vs compiled closures.
+
+Usage:
+    python -m benchmarks.bench_conditions [--size 10000] [--runs 200]
+"""
+
+import argparse
+import re
+import time
+
+from awsl.expressions import compile_condition
+
+CONDITION = "(Retrieve.chunks && Check.is_enough) || !Retrieve.need_filtering"
+
+
+def legacy_eval_condition(expr: str, state: dict) -> bool:
+    """The regex + repr + eval evaluation used before conditions were compiled."""
+    def repl(match):
+        key = match.group(0)
+        if key in state:
+            return repr(state[key])
+        return "False"
+    expr_py = re.sub(r"([A-Za-z_][A-Za-z0-9_]*)\.([A-Za-z_][A-Za-z0-9_]*)", repl, expr)
+    expr_py = expr_py.replace("&&", " and ").replace("||", " or ").replace("!", " not ")
+    return bool(eval(expr_py))
+
+
+def measure(fn, runs: int) -> float:
+    start = time.perf_counter()
+    for _ in range(runs):
+        fn()
+    return (time.perf_counter() - start) / runs * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=10_000)
+    parser.add_argument("--runs", type=int, default=200)
+    args = parser.parse_args()
+
+    state = {
+        "Retrieve.chunks": [f"chunk {i} " + "lorem ipsum " * 20 for i in range(args.size)],
+        "Check.is_enough": False,
+        "Retrieve.need_filtering": True,
+    }
+    compiled = compile_condition(CONDITION)
+    assert compiled(state) == legacy_eval_condition(CONDITION, state)
+
+    legacy = measure(lambda: legacy_eval_condition(CONDITION, state), args.runs)
+    fast = measure(lambda: compiled(state), args.runs)
+    print(f"chunks={args.size} legacy={legacy:.1f}us compiled={fast:.2f}us speedup={legacy / fast:.0f}x")
+
+
+if __name__ == "__main__":
+    main()
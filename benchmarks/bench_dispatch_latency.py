@@ -0,0 +1,98 @@
+"""Submit-to-running latency of the worker pool with polling only vs LISTEN/NOTIFY.
+
+Runs worker coroutines in-process against a scratch database and measures
+`started_at - created_at` for runs inserted the way the backend does. The workers run
+every queued job they find, so the database is taken from --dsn or BENCH_DATABASE_URL
+and must not be DATABASE_URL.
+
+Usage:
+    BENCH_DATABASE_URL=postgresql://.../bench python -m benchmarks.bench_dispatch_latency [--jobs 5]
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import uuid
+
+import asyncpg
+from sqlalchemy import create_engine
+
+from backend import models  # noqa: F401 - registers the tables with init_db
+from backend.database import init_db
+from backend.notifications import JOBS_CHANNEL
+from benchmarks.scratch_db import scratch_dsn
+from worker import worker_pool
+from worker.db import checkpointer_pool
+
+
+async def submit(pool: asyncpg.pool.Pool) -> str:
+    run_id = str(uuid.uuid4())
+    async with pool.acquire() as conn, conn.transaction():
+        await conn.execute(
+            """
+            INSERT INTO workflow_runs (id, graph_name, thread_id, state, attempt, max_attempts, inputs, result)
+            VALUES ($1, 'sample', $1, 'queued', 0, 3, $2, '{}')
+            """,
+            run_id,
+            json.dumps({"query": "bench"}),
+        )
+        await conn.execute("SELECT pg_notify($1, $2)", JOBS_CHANNEL, run_id)
+    return run_id
+
+
+async def measure(dsn: str, jobs: int, listen: bool) -> list[float]:
+    async with checkpointer_pool(dsn) as checkpoints:
+        return await measure_with_checkpoints(dsn, jobs, listen, checkpoints)
+
+
+async def measure_with_checkpoints(dsn: str, jobs: int, listen: bool, checkpoints) -> list[float]:
+    pool = await asyncpg.create_pool(dsn=dsn)
+    signal = worker_pool.JobSignal()
+    claimer = worker_pool.JobClaimer(pool, "bench", signal)
+    workers = [asyncio.create_task(claimer.run())]
+    if listen:
+        workers.append(asyncio.create_task(worker_pool.listen_for_jobs(dsn, signal)))
+    running = worker_pool.RunningJobs()
+    workers += [asyncio.create_task(worker_pool.worker(pool, claimer, checkpoints, running))
+                for _ in range(worker_pool.CONCURRENCY)]
+    # Let the workers drain the queue and go idle
+    await asyncio.sleep(1)
+    run_ids = []
+    for _ in range(jobs):
+        await asyncio.sleep(random.uniform(0.5, 2))
+        run_ids.append(await submit(pool))
+    while True:
+        rows = await pool.fetch(
+            "SELECT extract(epoch FROM started_at - created_at) AS latency FROM workflow_runs "
+            "WHERE id = ANY($1::text[]) AND started_at IS NOT NULL",
+            run_ids,
+        )
+        if len(rows) == len(run_ids):
+            break
+        await asyncio.sleep(0.1)
+    for task in workers:
+        task.cancel()
+    await asyncio.gather(*workers, return_exceptions=True)
+    await claimer.release_unstarted()
+    await pool.close()
+    return [float(row["latency"]) for row in rows]
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--jobs", type=int, default=5)
+    parser.add_argument("--dsn", help="Scratch database (default BENCH_DATABASE_URL)")
+    args = parser.parse_args()
+
+    dsn = scratch_dsn(args.dsn)
+    init_db(create_engine(dsn))
+    for listen in (False, True):
+        latencies = await measure(dsn, args.jobs, listen)
+        mode = "listen/notify" if listen else f"polling ({worker_pool.POLL_INTERVAL:g}s)"
+        print(f"{mode:<16} median={statistics.median(latencies) * 1000:.1f}ms max={max(latencies) * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,92 @@
+"""Wall time of a wide fan-out workflow by max_parallelism and node executor type.
+
+Usage:
+    python -m benchmarks.bench_fanout [--width 8]
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from awsl.run_awsl_workflow import run_workflow
+from benchmarks import fanout_steps
+
+FN_MAP = {
+    "split": fanout_steps.split,
+    "cpu_work": fanout_steps.cpu_work,
+    "io_work": fanout_steps.io_work,
+    "join": fanout_steps.join,
+}
+
+
+def fanout_workflow(width: int, call: str, max_parallelism: int, executor: str) -> str:
+    workers = "\n".join(f"""
+  node Work{i} {{
+    call {call}
+    inputs {{
+      String seed = Split.seed
+    }}
+    executor {{ type: {executor}, max_workers: {width} }}
+    outputs {{
+      String result
+    }}
+  }}""" for i in range(width))
+    join_inputs = "\n".join(f"      String result{i} = Work{i}.result" for i in range(width))
+    return f"""workflow FanOut {{
+  metadata {{
+    max_parallelism: "{max_parallelism}"
+  }}
+  inputs {{
+    String query
+  }}
+  outputs {{
+    List<String> results = Join.results
+  }}
+  node Split {{
+    call split
+    inputs {{
+      String query = query
+    }}
+    outputs {{
+      String seed
+    }}
+  }}
+{workers}
+  node Join {{
+    call join
+    inputs {{
+{join_inputs}
+    }}
+    outputs {{
+      List<String> results
+    }}
+  }}
+}}
+"""
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--width", type=int, default=8)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{'step':<9} {'executor':<9} {'parallelism':>11} {'seconds':>8} {'speedup':>8}")
+        for call, executor in (("io_work", "thread"), ("cpu_work", "thread"), ("cpu_work", "process")):
+            baseline = None
+            for parallelism in (1, args.width):
+                path = Path(tmp) / f"{call}_{executor}_{parallelism}.awsl"
+                path.write_text(fanout_workflow(args.width, call, parallelism, executor))
+                # Warm up: parse, compile and start the pool outside the measurement
+                run_workflow(str(path), fn_map=FN_MAP, params={"query": "warmup"})
+                start = time.perf_counter()
+                result = run_workflow(str(path), fn_map=FN_MAP, params={"query": "bench"})
+                elapsed = time.perf_counter() - start
+                assert len(result["Join.results"]) == args.width
+                baseline = baseline or elapsed
+                print(f"{call:<9} {executor:<9} {parallelism:>11} {elapsed:>8.2f} {baseline / elapsed:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Result page fetching: browser for every page vs HTTP first with browser fallback.
+
+Pages are served by a local HTTP server with --latency seconds of server delay; a share of
+them (--js-share) only have content after scripts run. Chrome can't be assumed here, so the
+browser tier is simulated as --browser-seconds per page load on a pool of --pool browsers.
+
+Usage:
+    python -m benchmarks.bench_page_fetch [--pages 12] [--js-share 0.25] [--browser-seconds 1.5]
+"""
+
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from components.page_fetcher import PageFetcher
+
+ARTICLE = "<html><body><article><p>" + "Static article text. " * 200 + "</p></article></body></html>"
+APP = "<html><body><div id='root'></div><script src='/app.js'></script></body></html>"
+
+
+def serve(latency: float) -> ThreadingHTTPServer:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            time.sleep(latency)
+            data = (APP if self.path.startswith("/app") else ARTICLE).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=12)
+    parser.add_argument("--js-share", type=float, default=0.25)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--browser-seconds", type=float, default=1.5)
+    parser.add_argument("--pool", type=int, default=2)
+    args = parser.parse_args()
+
+    server = serve(args.latency)
+    site = f"http://127.0.0.1:{server.server_port}"
+    js_pages = round(args.pages * args.js_share)
+    urls = [f"{site}/app/{i}" if i < js_pages else f"{site}/article/{i}" for i in range(args.pages)]
+    slots = threading.BoundedSemaphore(args.pool)
+
+    def browser_fetch(url):
+        with slots:
+            time.sleep(args.browser_seconds)
+        return "rendered page text " * 10
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.pool) as executor:
+        list(executor.map(browser_fetch, urls))
+    browser_only = time.perf_counter() - start
+
+    fetcher = PageFetcher(browser_fetch=browser_fetch, http2=False)
+    start = time.perf_counter()
+    texts = fetcher.fetch_all(urls)
+    tiered = time.perf_counter() - start
+    fetcher.close()
+    server.shutdown()
+    assert all(texts)
+
+    print(f"pages={args.pages} js_pages={js_pages} browser_only={browser_only:.2f}s tiered={tiered:.2f}s "
+          f"speedup={browser_only / tiered:.1f}x")
+    for tier, stats in fetcher.stats.summary().items():
+        print(f"  {tier}: count={stats['count']} p50={stats['p50'] * 1000:.0f}ms p95={stats['p95'] * 1000:.0f}ms")
+
+
+if __name__ == "__main__":
+    main()
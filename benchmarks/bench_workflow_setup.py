@@ -0,0 +1,57 @@
+"""Per-job setup cost of AWSL workflows with and without the compiled-workflow cache.
+
+Usage:
+    python -m benchmarks.bench_workflow_setup [--runs 50]
+"""
+
+import argparse
+import time
+
+from awsl.grammar.workflow_parser import CycleClass, MapClass, parse_awsl_to_objects
+from awsl.run_awsl_workflow import build_pregel_graph, get_compiled_workflow
+from awsl.workflow_cache import compiled_workflows
+
+WORKFLOWS = [
+    "awsl/deepresearch.awsl",
+    "awsl/sample_with_cycle.awsl",
+    "workflow_definitions/paper_rename_workflow/paper_rename_workflow.awsl",
+]
+
+
+def stub_functions(path: str) -> dict:
+    """Build a function map with a no-op step for every `call` in the workflow."""
+    calls = set()
+    for node in parse_awsl_to_objects(path).nodes:
+        nodes = node.nodes if isinstance(node, (CycleClass, MapClass)) else [node]
+        calls.update(n.call for n in nodes)
+    return {call: (lambda **kwargs: {}) for call in calls}
+
+
+def measure(fn, runs: int) -> float:
+    start = time.perf_counter()
+    for _ in range(runs):
+        fn()
+    return (time.perf_counter() - start) / runs * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"{'workflow':<75} {'uncached ms':>12} {'cached ms':>12}")
+    for path in WORKFLOWS:
+        try:
+            functions = stub_functions(path)
+        except Exception as exc:
+            print(f"{path:<75} skipped: {type(exc).__name__}")
+            continue
+        compiled_workflows.clear()
+        uncached = measure(lambda: build_pregel_graph(path, functions=functions), args.runs)
+        get_compiled_workflow(path, functions)
+        cached = measure(lambda: get_compiled_workflow(path, functions), args.runs)
+        print(f"{path:<75} {uncached:>12.3f} {cached:>12.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,24 @@
+"""Step functions for the fan-out benchmark; module level so process pools can pickle them."""
+
+import hashlib
+import time
+
+
+def split(query: str, config: dict) -> dict:
+    return {"seed": query}
+
+
+def cpu_work(seed: str, config: dict) -> dict:
+    digest = seed.encode()
+    for _ in range(config.get("rounds", 200_000)):
+        digest = hashlib.sha256(digest).digest()
+    return {"result": digest.hex()[:8]}
+
+
+def io_work(seed: str, config: dict) -> dict:
+    time.sleep(config.get("seconds", 0.2))
+    return {"result": seed}
+
+
+def join(config: dict, **results) -> dict:
+    return {"results": sorted(str(r) for r in results.values())}
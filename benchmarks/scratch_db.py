@@ -0,0 +1,22 @@
+"""Scratch database for the benchmarks that rewrite workflow_runs or run its queued jobs."""
+
+import os
+
+from sqlalchemy.engine import make_url
+
+
+def _location(dsn: str) -> tuple:
+    url = make_url(dsn)
+    return url.host or "localhost", url.port or 5432, url.database
+
+
+def scratch_dsn(dsn: str | None) -> str:
+    """--dsn or BENCH_DATABASE_URL; refuses the application's DATABASE_URL so a benchmark
+    never truncates or drains real runs."""
+    dsn = dsn or os.getenv("BENCH_DATABASE_URL")
+    if not dsn:
+        raise SystemExit("Pass --dsn or set BENCH_DATABASE_URL to a scratch database")
+    application = os.getenv("DATABASE_URL")
+    if application and _location(dsn) == _location(application):
+        raise SystemExit("The benchmark database is DATABASE_URL; point it at a scratch database instead")
+    return dsn
@@ -0,0 +1,119 @@
+"""Context packing of retrieved chunks for the research prompts.
+
+Across research iterations the chunk list accumulates the same pages again and again,
+often with small differences (ads, dates, navigation). Chunks are deduplicated with
+MinHash sketches of their word shingles, ranked against the query with BM25 and packed
+best-first into a token budget.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import heapq
+import math
+import re
+from collections import Counter
+from typing import List, Sequence
+import os
+
+# Tokens of chunk text per prompt (one iteration of three full pages fits); about four characters per token
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", 8000))
+CHARS_PER_TOKEN = 4
+SHINGLE_SIZE = 5
+SKETCH_SIZE = 128
+# Estimated Jaccard similarity above which a chunk counts as a near-duplicate
+DUPLICATE_SIMILARITY = 0.8
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+_WORD = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    return _WORD.findall(text.lower())
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def shingle_hash(shingle: str) -> int:
+    """64-bit hash that, unlike the salted built-in hash(), is the same in every process"""
+    return int.from_bytes(hashlib.blake2b(shingle.encode(), digest_size=8).digest(), "big")
+
+
+def minhash(words: Sequence[str], shingle_size: int = SHINGLE_SIZE, sketch_size: int = SKETCH_SIZE) -> frozenset:
+    """Bottom-k MinHash sketch: the smallest hashes of the text's word shingles"""
+    shingles = {" ".join(words[i:i + shingle_size]) for i in range(max(len(words) - shingle_size + 1, 1))}
+    return frozenset(heapq.nsmallest(sketch_size, {shingle_hash(shingle) for shingle in shingles}))
+
+
+def similarity(a: frozenset, b: frozenset, sketch_size: int = SKETCH_SIZE) -> float:
+    """Jaccard similarity estimated from two sketches"""
+    union = heapq.nsmallest(sketch_size, a | b)
+    if not union:
+        return 1.0
+    return sum(1 for h in union if h in a and h in b) / len(union)
+
+
+def dedupe_chunks(chunks: Sequence[str], threshold: float = DUPLICATE_SIMILARITY) -> List[str]:
+    """Chunks without exact and near duplicates, keeping the first of each group"""
+    kept: List[str] = []
+    sketches: List[frozenset] = []
+    for chunk in dict.fromkeys(chunk for chunk in chunks if chunk and chunk.strip()):
+        sketch = minhash(tokenize(chunk))
+        if any(similarity(sketch, other) >= threshold for other in sketches):
+            continue
+        kept.append(chunk)
+        sketches.append(sketch)
+    return kept
+
+
+def bm25_scores(chunks: Sequence[str], query: str) -> List[float]:
+    docs = [Counter(tokenize(chunk)) for chunk in chunks]
+    terms = set(tokenize(query))
+    if not docs or not terms:
+        return [0.0] * len(docs)
+    lengths = [sum(doc.values()) for doc in docs]
+    avg_length = sum(lengths) / len(docs) or 1
+    idf = {}
+    for term in terms:
+        df = sum(1 for doc in docs if term in doc)
+        idf[term] = math.log(1 + (len(docs) - df + 0.5) / (df + 0.5))
+    scores = []
+    for doc, length in zip(docs, lengths):
+        score = 0.0
+        for term in terms:
+            tf = doc.get(term, 0)
+            if tf:
+                score += idf[term] * tf * (BM25_K1 + 1) / (tf + BM25_K1 * (1 - BM25_B + BM25_B * length / avg_length))
+        scores.append(score)
+    return scores
+
+
+def rank_chunks(chunks: Sequence[str], query: str) -> List[str]:
+    """Chunks by descending BM25 relevance to the query, ties in their original order"""
+    scores = bm25_scores(chunks, query)
+    order = sorted(range(len(chunks)), key=lambda i: -scores[i])
+    return [chunks[i] for i in order]
+
+
+def pack_chunks(chunks: Sequence[str], query: str, budget: int = CONTEXT_TOKEN_BUDGET) -> List[str]:
+    """The most relevant distinct chunks that fit into `budget` tokens, best first.
+
+    The best chunk is truncated if it alone exceeds the budget; chunks that don't fit
+    into what is left are skipped in favour of smaller, lower ranked ones.
+    """
+    packed: List[str] = []
+    remaining = budget
+    for chunk in rank_chunks(dedupe_chunks(chunks), query):
+        tokens = estimate_tokens(chunk)
+        if tokens <= remaining:
+            packed.append(chunk)
+            remaining -= tokens
+        elif not packed:
+            packed.append(chunk[:remaining * CHARS_PER_TOKEN])
+            remaining = 0
+        if remaining <= 0:
+            break
+    return packed
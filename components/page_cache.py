@@ -0,0 +1,179 @@
+"""On-disk cache of retrieved content shared by the web scraper and the research steps.
+
+Entries hold already-cleaned text keyed by a normalized URL (page text) or by a normalized
+query (search links, archive.org results), so a hit skips both the network and the text
+normalization. Expired page entries keep their ETag/Last-Modified validators, letting the
+fetcher revalidate them with a conditional request instead of downloading the page again.
+The least recently used entries are evicted once the stored text exceeds the size bound.
+"""
+
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+import os
+
+PAGE_CACHE_PATH = os.getenv("PAGE_CACHE_PATH", ".page_cache.sqlite")
+# Seconds an entry is served without revalidation
+PAGE_CACHE_TTL = float(os.getenv("PAGE_CACHE_TTL", 24 * 3600))
+# Pages known to have no content (gone, not HTML) are retried sooner
+PAGE_NEGATIVE_CACHE_TTL = float(os.getenv("PAGE_NEGATIVE_CACHE_TTL", 3600))
+PAGE_CACHE_MAX_BYTES = int(os.getenv("PAGE_CACHE_MAX_BYTES", 200_000_000))
+
+TRACKING_PARAMS = ("utm_", "fbclid", "gclid", "mc_cid", "mc_eid")
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def normalize_url(url: str) -> str:
+    """Cache key of a URL: case-folded scheme and host, no default port, fragment or tracking parameters"""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    params = sorted((name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+                    if not name.lower().startswith(TRACKING_PARAMS))
+    return urlunsplit((scheme, host, parts.path or "/", urlencode(params), ""))
+
+
+def query_key(kind: str, query: str, **params: Any) -> str:
+    """Cache key of a search: whitespace and case of the query don't matter"""
+    normalized = " ".join(query.lower().split())
+    return f"{kind}:{json.dumps([normalized, sorted(params.items())], default=str)}"
+
+
+@dataclass
+class CacheEntry:
+    value: Optional[str]
+    expires_at: float
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+    @property
+    def fresh(self) -> bool:
+        return self.expires_at > time.time()
+
+    def validators(self) -> dict[str, str]:
+        """Headers of a conditional request revalidating the entry"""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class PageCache:
+    """SQLite cache shared by every process on the host; `value` None records a page without content"""
+
+    def __init__(self,
+                 path: str = PAGE_CACHE_PATH,
+                 ttl: float = PAGE_CACHE_TTL,
+                 max_bytes: int = PAGE_CACHE_MAX_BYTES):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+
+    def _connect(self) -> sqlite3.Connection:
+        # Opened on first use, so importing the scraper doesn't create the file
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            with conn:
+                conn.execute("CREATE TABLE IF NOT EXISTS page_cache "
+                             "(key TEXT PRIMARY KEY, value TEXT, etag TEXT, last_modified TEXT, "
+                             "expires_at REAL NOT NULL, accessed_at REAL NOT NULL, size INTEGER NOT NULL)")
+                conn.execute("CREATE INDEX IF NOT EXISTS page_cache_accessed ON page_cache (accessed_at)")
+                # Running total of `size`, kept by triggers so every process sharing the file sees it and
+                # a write doesn't have to sum the whole table; seeded from caches created before it
+                conn.execute("CREATE TABLE IF NOT EXISTS page_cache_total "
+                             "(id INTEGER PRIMARY KEY CHECK (id = 0), size INTEGER NOT NULL)")
+                conn.execute("INSERT OR IGNORE INTO page_cache_total "
+                             "SELECT 0, COALESCE(SUM(size), 0) FROM page_cache")
+                conn.execute("CREATE TRIGGER IF NOT EXISTS page_cache_added AFTER INSERT ON page_cache BEGIN "
+                             "UPDATE page_cache_total SET size = size + NEW.size; END")
+                conn.execute("CREATE TRIGGER IF NOT EXISTS page_cache_removed AFTER DELETE ON page_cache BEGIN "
+                             "UPDATE page_cache_total SET size = size - OLD.size; END")
+                conn.execute("CREATE TRIGGER IF NOT EXISTS page_cache_resized AFTER UPDATE OF size ON page_cache "
+                             "BEGIN UPDATE page_cache_total SET size = size + NEW.size - OLD.size; END")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        """The entry for `key`, expired ones included so they can be revalidated"""
+        conn = self._connect()
+        row = conn.execute("SELECT value, expires_at, etag, last_modified FROM page_cache WHERE key = ?",
+                           (key,)).fetchone()
+        if row is None:
+            return None
+        with conn:
+            conn.execute("UPDATE page_cache SET accessed_at = ? WHERE key = ?", (time.time(), key))
+        return CacheEntry(*row)
+
+    def get_fresh(self, key: str) -> Optional[CacheEntry]:
+        entry = self.get(key)
+        return entry if entry is not None and entry.fresh else None
+
+    def set(self,
+            key: str,
+            value: Optional[str],
+            ttl: Optional[float] = None,
+            etag: Optional[str] = None,
+            last_modified: Optional[str] = None) -> None:
+        now = time.time()
+        size = len(key) + len(value or "")
+        with self._connect() as conn:
+            # An upsert rather than INSERT OR REPLACE, whose implicit delete skips the DELETE trigger
+            conn.execute("INSERT INTO page_cache "
+                         "(key, value, etag, last_modified, expires_at, accessed_at, size) "
+                         "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                         "ON CONFLICT (key) DO UPDATE SET value = excluded.value, etag = excluded.etag, "
+                         "last_modified = excluded.last_modified, expires_at = excluded.expires_at, "
+                         "accessed_at = excluded.accessed_at, size = excluded.size",
+                         (key, value, etag, last_modified, now + (self.ttl if ttl is None else ttl), now, size))
+            self._evict(conn)
+
+    def touch(self, key: str, ttl: Optional[float] = None) -> None:
+        """Extend an entry that was revalidated as unchanged"""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("UPDATE page_cache SET expires_at = ?, accessed_at = ? WHERE key = ?",
+                         (now + (self.ttl if ttl is None else ttl), now, key))
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        total = self._total(conn)
+        if total <= self.max_bytes:
+            return
+        # Drop the least recently used entries until the text fits again
+        freed, evicted = 0, []
+        for key, size in conn.execute("SELECT key, size FROM page_cache ORDER BY accessed_at"):
+            if total - freed <= self.max_bytes:
+                break
+            evicted.append((key,))
+            freed += size
+        conn.executemany("DELETE FROM page_cache WHERE key = ?", evicted)
+
+    @staticmethod
+    def _total(conn: sqlite3.Connection) -> int:
+        return conn.execute("SELECT size FROM page_cache_total").fetchone()[0]
+
+    def size(self) -> int:
+        return self._total(self._connect())
+
+    def clear(self) -> None:
+        with self._connect() as conn:
+            conn.execute("DELETE FROM page_cache")
+
+    def __len__(self) -> int:
+        return self._connect().execute("SELECT COUNT(*) FROM page_cache").fetchone()[0]
+
+
+# Shared by components.web_scraper and steps.deepresearch_functions; an empty PAGE_CACHE_PATH disables it
+page_cache: Optional[PageCache] = PageCache() if PAGE_CACHE_PATH else None
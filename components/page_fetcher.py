@@ -0,0 +1,234 @@
+"""Tiered page fetching for the web scraper.
+
+Pages are first fetched with a plain async HTTP client and their text extracted from the
+HTML. Only pages that come back without substantial text (rendered by scripts) or behind
+a bot wall fall back to the browser tier. With a page cache, fresh entries skip both tiers
+and expired ones are revalidated with a conditional request. The client lives on its own event loop thread, so
+its pooled keep-alive connections are shared by every scrape of the process.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import importlib.util
+import threading
+import time
+from collections import deque
+from html.parser import HTMLParser
+from typing import Callable, Dict, List, Optional
+import os
+
+import httpx
+
+from components.page_cache import PAGE_NEGATIVE_CACHE_TTL, CacheEntry, PageCache, normalize_url
+
+HTTP_TIMEOUT = float(os.getenv("HTTP_FETCH_TIMEOUT", 10))
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", 20))
+# HTTP/2 needs the h2 package (httpx[http2])
+HTTP2 = os.getenv("HTTP_FETCH_HTTP2", "1").lower() not in ("0", "false", "no") and \
+    importlib.util.find_spec("h2") is not None
+# Larger bodies are truncated; chunks keep at most MAX_CHUNK_CHARS characters anyway
+MAX_PAGE_BYTES = int(os.getenv("HTTP_MAX_PAGE_BYTES", 2_000_000))
+MIN_TEXT_LENGTH = 100
+MAX_CHUNK_CHARS = 10000
+# Statuses of bot walls and rate limits that a real browser often gets through
+BROWSER_RETRY_STATUSES = {403, 429, 503}
+# Errors that won't go away on a retry, so the empty result is cached; others (5xx) are not
+NEGATIVE_CACHE_STATUSES = {404, 410}
+HTML_TYPES = ("text/html", "application/xhtml+xml")
+
+CACHE_TIER = "cache"
+HTTP_TIER = "http"
+BROWSER_TIER = "browser"
+
+
+def clean_text(text: Optional[str]) -> Optional[str]:
+    """Whitespace-normalized text limited to MAX_CHUNK_CHARS, None unless it is substantial"""
+    text = " ".join(text.split()) if text else ""
+    if len(text) > MIN_TEXT_LENGTH:
+        return text[:MAX_CHUNK_CHARS]
+    return None
+
+
+class _TextExtractor(HTMLParser):
+    SKIPPED = {"script", "style", "noscript", "template", "svg", "head"}
+    BLOCKS = {"p", "div", "br", "li", "tr", "td", "th", "h1", "h2", "h3", "h4", "h5", "h6",
+              "section", "article", "header", "footer", "nav", "blockquote", "pre", "table"}
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.parts: List[str] = []
+        self._skipping = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIPPED:
+            self._skipping += 1
+        elif tag in self.BLOCKS:
+            self.parts.append(" ")
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIPPED:
+            self._skipping = max(self._skipping - 1, 0)
+        elif tag in self.BLOCKS:
+            self.parts.append(" ")
+
+    def handle_data(self, data):
+        if not self._skipping:
+            self.parts.append(data)
+
+
+def html_to_text(html: str) -> str:
+    """Visible text of an HTML document, roughly what a browser shows as body text"""
+    parser = _TextExtractor()
+    parser.feed(html)
+    parser.close()
+    return "".join(parser.parts)
+
+
+class TierStats:
+    """Latency of recent fetches per tier"""
+
+    def __init__(self, window: int = 1000):
+        self.counts: Dict[str, int] = {}
+        self._samples: Dict[str, deque] = {}
+        self._window = window
+        self._lock = threading.Lock()
+
+    def record(self, tier: str, seconds: float) -> None:
+        with self._lock:
+            self.counts[tier] = self.counts.get(tier, 0) + 1
+            self._samples.setdefault(tier, deque(maxlen=self._window)).append(seconds)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            samples = {tier: sorted(values) for tier, values in self._samples.items()}
+            counts = dict(self.counts)
+        return {
+            tier: {
+                "count": counts[tier],
+                "p50": values[len(values) // 2],
+                "p95": values[min(len(values) - 1, int(len(values) * 0.95))],
+            }
+            for tier, values in samples.items() if values
+        }
+
+
+class PageFetcher:
+    """Fetches pages over HTTP, handing those that need a browser to `browser_fetch`.
+
+    `browser_fetch(url)` returns the cleaned page text or None and is called from a worker
+    thread; `limiter.reserve(url)` returns the seconds to wait before loading from the url's host.
+    """
+
+    def __init__(self,
+                 browser_fetch: Optional[Callable[[str], Optional[str]]] = None,
+                 limiter=None,
+                 headers: Optional[Callable[[], Dict[str, str]]] = None,
+                 timeout: float = HTTP_TIMEOUT,
+                 http2: bool = HTTP2,
+                 transport: httpx.AsyncBaseTransport | None = None,
+                 cache: Optional[PageCache] = None):
+        self.browser_fetch = browser_fetch
+        self.limiter = limiter
+        self.headers = headers
+        self.timeout = timeout
+        self.http2 = http2
+        self.transport = transport
+        self.cache = cache
+        self.stats = TierStats()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._client: httpx.AsyncClient | None = None
+        self._lock = threading.Lock()
+
+    def _start(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="page-fetcher", daemon=True).start()
+                self._client = httpx.AsyncClient(
+                    http2=self.http2,
+                    timeout=self.timeout,
+                    follow_redirects=True,
+                    limits=httpx.Limits(max_connections=HTTP_MAX_CONNECTIONS,
+                                        max_keepalive_connections=HTTP_MAX_CONNECTIONS),
+                    headers=self.headers() if self.headers else None,
+                    transport=self.transport,
+                )
+                self._loop = loop
+            return self._loop
+
+    def fetch_all(self, urls: List[str]) -> List[Optional[str]]:
+        """Cleaned text of each url (None where there is none), fetched concurrently"""
+        if not urls:
+            return []
+        return asyncio.run_coroutine_threadsafe(self._fetch_all(urls), self._start()).result()
+
+    async def _fetch_all(self, urls: List[str]) -> List[Optional[str]]:
+        return list(await asyncio.gather(*(self._fetch(url) for url in urls)))
+
+    async def _fetch(self, url: str) -> Optional[str]:
+        start = time.perf_counter()
+        key = normalize_url(url)
+        entry = await asyncio.to_thread(self.cache.get, key) if self.cache is not None else None
+        if entry is not None and entry.fresh:
+            self.stats.record(CACHE_TIER, time.perf_counter() - start)
+            return entry.value
+        if self.limiter is not None:
+            delay = self.limiter.reserve(url)
+            if delay > 0:
+                await asyncio.sleep(delay)
+        try:
+            text, needs_browser = await self._http_text(url, key, entry)
+        except httpx.HTTPError as e:
+            print(f"HTTP fetch of {url} failed: {str(e)}")
+            text, needs_browser = None, True
+        self.stats.record(HTTP_TIER, time.perf_counter() - start)
+        if not needs_browser or self.browser_fetch is None:
+            return text
+
+        start = time.perf_counter()
+        text = await asyncio.to_thread(self.browser_fetch, url)
+        self.stats.record(BROWSER_TIER, time.perf_counter() - start)
+        if text is not None:
+            await self._store(key, text)
+        return text
+
+    async def _http_text(self, url: str, key: str, entry: Optional[CacheEntry]) -> tuple[Optional[str], bool]:
+        headers = entry.validators() if entry is not None else {}
+        async with self._client.stream("GET", url, headers=headers) as response:
+            if response.status_code == 304 and entry is not None:
+                await asyncio.to_thread(self.cache.touch, key)
+                return entry.value, False
+            if response.status_code in BROWSER_RETRY_STATUSES:
+                return None, True
+            content_type = response.headers.get("content-type", "text/html").split(";")[0].strip()
+            if response.status_code >= 400 or content_type not in HTML_TYPES:
+                # Error pages and documents a browser wouldn't turn into body text either
+                if response.status_code < 400 or response.status_code in NEGATIVE_CACHE_STATUSES:
+                    await self._store(key, None, ttl=PAGE_NEGATIVE_CACHE_TTL)
+                return None, False
+            body = bytearray()
+            async for chunk in response.aiter_bytes():
+                body += chunk
+                if len(body) >= MAX_PAGE_BYTES:
+                    break
+            html = bytes(body).decode(response.encoding or "utf-8", errors="replace")
+        text = clean_text(html_to_text(html))
+        if text is None:
+            # Too little text in the HTML means the content is rendered by scripts
+            return None, True
+        await self._store(key, text, response.headers.get("etag"), response.headers.get("last-modified"))
+        return text, False
+
+    async def _store(self, key: str, text: Optional[str], etag: Optional[str] = None,
+                     last_modified: Optional[str] = None, ttl: Optional[float] = None) -> None:
+        if self.cache is not None:
+            await asyncio.to_thread(self.cache.set, key, text, ttl=ttl, etag=etag, last_modified=last_modified)
+
+    def close(self) -> None:
+        with self._lock:
+            loop, client, self._loop, self._client = self._loop, self._client, None, None
+        if loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(client.aclose(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
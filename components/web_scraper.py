@@ -1,77 +1,239 @@
 from __future__ import annotations
 
-from typing import List, Optional
-from urllib.parse import quote_plus
-import random
+from collections import deque
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Callable, Dict, Iterator, List, Optional
+from urllib.parse import quote_plus, urlsplit
+import atexit
+import json
+import threading
 import time
 import os
 
 import undetected_chromedriver as uc
 from fake_useragent import UserAgent
 from selenium import webdriver
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from selenium.webdriver.support.ui import WebDriverWait
+
+from components.page_cache import page_cache, query_key
+from components.page_fetcher import PageFetcher, clean_text
 
 
 WEB_SEARCH_URL = os.getenv("WEB_SEARCH_URL")
 FILTER_OUT_TAGS = os.getenv("FILTER_OUT_TAGS", "").split(",") if os.getenv("FILTER_OUT_TAGS") else []
+# Warm browsers shared by all scrapes of the process, each replaced after BROWSER_MAX_PAGES page loads
+BROWSER_POOL_SIZE = int(os.getenv("BROWSER_POOL_SIZE", 2))
+BROWSER_MAX_PAGES = int(os.getenv("BROWSER_MAX_PAGES", 50))
+PAGE_LOAD_TIMEOUT = float(os.getenv("PAGE_LOAD_TIMEOUT", 30))
+# Longest wait for a search page to render enough result links
+SEARCH_RESULTS_TIMEOUT = float(os.getenv("SEARCH_RESULTS_TIMEOUT", 5))
+# Minimum seconds between two page loads from the same host
+DOMAIN_INTERVAL = float(os.getenv("SCRAPER_DOMAIN_INTERVAL", 2))
 
-def search_and_scrape(
-    query: str,
-    top_k: int = 3,
-    base_url: str = WEB_SEARCH_URL,
-    filter_out_tags: Optional[list[str]] | None = FILTER_OUT_TAGS,
-) -> List[str]:
-    """Search the web using a headless browser and return page chunks."""
-    ua = UserAgent()
+
+@lru_cache(maxsize=1)
+def _user_agents() -> UserAgent:
+    # Loading the user agent data is slow, so it happens once per process
+    return UserAgent()
+
+
+def new_driver() -> webdriver.Chrome:
     options = uc.ChromeOptions()
     options.headless = True
-    options.add_argument(f'--user-agent={ua.random}')
+    options.add_argument(f'--user-agent={_user_agents().random}')
     options.add_argument('--disable-blink-features=AutomationControlled')
     options.add_argument('--no-sandbox')
     options.add_argument('--disable-dev-shm-usage')
     options.add_argument("--incognito")
     options.add_argument("--disable-search-engine-choice-screen")
-    
-    try:
-        driver = webdriver.Chrome(options=options)
-        
-        search_url = f"{base_url}?q={quote_plus(query)}"
+    driver = webdriver.Chrome(options=options)
+    driver.set_page_load_timeout(PAGE_LOAD_TIMEOUT)
+    return driver
 
-        driver.get(search_url)
-        time.sleep(random.uniform(2, 4))
-        
-        links = []
-        elements = driver.find_elements("tag name", "a")
-        for element in elements:
-            href = element.get_attribute("href")
-            if href and all(tag not in href for tag in filter_out_tags): 
-                links.append(href)
-                if len(links) >= top_k:
-                    break
-                    
-        chunks = []
-        for link in links:
+
+class Browser:
+    def __init__(self, driver) -> None:
+        self.driver = driver
+        self.pages = 0
+
+
+class BrowserPool:
+    """Up to `size` browsers handed out one caller at a time and kept warm between scrapes.
+
+    An idle browser is checked before reuse and replaced if it died; every browser is
+    quit and replaced after `max_pages` checkouts to bound memory growth.
+    """
+
+    def __init__(self,
+                 size: int = BROWSER_POOL_SIZE,
+                 max_pages: int = BROWSER_MAX_PAGES,
+                 factory: Callable[[], object] = new_driver):
+        self.size = size
+        self.max_pages = max_pages
+        self.factory = factory
+        self.started = 0
+        self._idle: deque[Browser] = deque()
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def driver(self) -> Iterator[object]:
+        with self._slots:
+            browser = self._checkout()
+            healthy = True
             try:
-                driver.get(link)
-                time.sleep(random.uniform(2, 5))
-                
-                page_text = driver.find_element("tag name", "body").text
-                if page_text:
-                    # Clean and normalize the text
-                    text = " ".join(page_text.split())
-                    if len(text) > 100:  # Only keep substantial content
-                        chunks.append(text[:10000])  # Limit chunk size
-            except Exception as e:
-                print(f"Failed to fetch {link}: {str(e)}")
-                continue
-                       
-        return {"chunks": chunks}
-        
+                yield browser.driver
+            except WebDriverException:
+                healthy = self._alive(browser)
+                raise
+            finally:
+                browser.pages += 1
+                if healthy and browser.pages < self.max_pages:
+                    with self._lock:
+                        self._idle.append(browser)
+                else:
+                    self._quit(browser)
+
+    def _checkout(self) -> Browser:
+        while True:
+            with self._lock:
+                # Most recently used first, so rarely needed browsers age out
+                browser = self._idle.pop() if self._idle else None
+            if browser is None:
+                self.started += 1
+                return Browser(self.factory())
+            if self._alive(browser):
+                return browser
+            self._quit(browser)
+
+    @staticmethod
+    def _alive(browser: Browser) -> bool:
+        try:
+            browser.driver.current_url
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _quit(browser: Browser) -> None:
+        try:
+            browser.driver.quit()
+        except Exception:
+            pass
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = list(self._idle), deque()
+        for browser in idle:
+            self._quit(browser)
+
+
+class DomainLimiter:
+    """Spaces page loads from the same host by `interval` seconds; other hosts are not delayed"""
+
+    def __init__(self, interval: float = DOMAIN_INTERVAL):
+        self.interval = interval
+        self._next_slot: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def reserve(self, url: str) -> float:
+        """Book the next load slot of the url's host and return the seconds until it starts"""
+        host = urlsplit(url).hostname or ""
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = start + self.interval
+        return start - now
+
+    def wait(self, url: str) -> None:
+        delay = self.reserve(url)
+        if delay > 0:
+            time.sleep(delay)
+
+
+browser_pool = BrowserPool()
+domain_limiter = DomainLimiter()
+atexit.register(browser_pool.close)
+
+
+def _result_links(driver, top_k: int, filter_out_tags: list[str]) -> List[str]:
+    links = []
+    for element in driver.find_elements("tag name", "a"):
+        href = element.get_attribute("href")
+        if href and all(tag not in href for tag in filter_out_tags):
+            links.append(href)
+            if len(links) >= top_k:
+                break
+    return links
+
+
+def search_links(query: str, top_k: int, base_url: str, filter_out_tags: list[str]) -> List[str]:
+    key = query_key("search", query, top_k=top_k, base_url=base_url, filter_out_tags=sorted(filter_out_tags))
+    entry = page_cache.get_fresh(key) if page_cache is not None else None
+    if entry is not None:
+        return json.loads(entry.value)
+    links = _search_links(query, top_k, base_url, filter_out_tags)
+    if links and page_cache is not None:
+        page_cache.set(key, json.dumps(links))
+    return links
+
+
+def _search_links(query: str, top_k: int, base_url: str, filter_out_tags: list[str]) -> List[str]:
+    search_url = f"{base_url}?q={quote_plus(query)}"
+    domain_limiter.wait(search_url)
+    with browser_pool.driver() as driver:
+        driver.get(search_url)
+        try:
+            # Results may be rendered by scripts after the load event
+            WebDriverWait(driver, SEARCH_RESULTS_TIMEOUT, poll_frequency=0.2).until(
+                lambda d: len(_result_links(d, top_k, filter_out_tags)) >= top_k)
+        except TimeoutException:
+            pass
+        return _result_links(driver, top_k, filter_out_tags)
+
+
+def fetch_page_text(link: str) -> Optional[str]:
+    """Cleaned text of a page, None when it is unreachable or has no substantial content"""
+    try:
+        domain_limiter.wait(link)
+        with browser_pool.driver() as driver:
+            driver.get(link)
+            page_text = driver.find_element("tag name", "body").text
+    except Exception as e:
+        print(f"Failed to fetch {link}: {str(e)}")
+        return None
+    return clean_text(page_text)
+
+
+# Result pages go over plain HTTP first; the browser pool only loads pages that need scripts
+page_fetcher = PageFetcher(browser_fetch=fetch_page_text,
+                           limiter=domain_limiter,
+                           headers=lambda: {"User-Agent": _user_agents().random},
+                           cache=page_cache)
+atexit.register(page_fetcher.close)
+
+
+def search_and_scrape(
+    query: str,
+    top_k: int = 3,
+    base_url: str = WEB_SEARCH_URL,
+    filter_out_tags: Optional[list[str]] | None = FILTER_OUT_TAGS,
+) -> Dict[str, List[str]]:
+    """Search the web using pooled headless browsers and return page chunks.
+
+    Result pages are fetched concurrently over HTTP, falling back to the browsers for
+    pages rendered by scripts. Search links and page text are served from the page cache
+    when a query or page was retrieved before.
+    """
+    try:
+        links = search_links(query, top_k, base_url, filter_out_tags or [])
     except Exception as e:
         print(f"Browser automation failed: {str(e)}")
         raise e
-    finally:
-        if driver:
-            try:
-                driver.quit()
-            except Exception:
-                pass
\ No newline at end of file
+    if not links:
+        return {"chunks": []}
+
+    texts = page_fetcher.fetch_all(links)
+    return {"chunks": [text for text in texts if text]}
@@ -1,13 +1,25 @@
-import { useEffect, useState } from 'react'
+import { useEffect, useRef, useState } from 'react'
 import './App.css'
-import { cancelWorkflow as apiCancel, continueWorkflow as apiContinue, startWorkflow as apiStart, getWorkflow, getWorkflows, getWorkflowTemplates } from './api.js'
+import { cancelWorkflow as apiCancel, continueWorkflow as apiContinue, startWorkflow as apiStart, getWorkflow, getWorkflows, getWorkflowTemplates, subscribeWorkflow, supportsEvents } from './api.js'
 import { POLL_INTERVAL_MS } from './constants.js'
 import { startPolling } from './timer.js'
 
+// Replace the newest runs with a freshly polled first page, keeping older loaded runs below it
+function mergeNewestPage(current, page) {
+  if (page.length === 0) return page
+  const ids = new Set(page.map(w => w.id))
+  const oldest = page[page.length - 1].created_at
+  return [...page, ...current.filter(w => !ids.has(w.id) && w.created_at < oldest)]
+}
+
 export default function App() {
   const [workflows, setWorkflows] = useState([])
+  const [nextCursor, setNextCursor] = useState(null)
+  // Set once older pages are loaded, so polling the newest page keeps them
+  const loadedMore = useRef(false)
   const [selectedId, setSelectedId] = useState(null)
   const [selected, setSelected] = useState(null)
+  const [completedNodes, setCompletedNodes] = useState([])
   const [showInterrupt, setShowInterrupt] = useState(false)
   const [expandedSections, setExpandedSections] = useState({
     inputs: true,
@@ -21,11 +33,16 @@ export default function App() {
 
   useEffect(() => {
     const fetchList = () => {
-      getWorkflows().then(data => {
-        setWorkflows(data)
+      getWorkflows().then(({ workflows: page, nextCursor: cursor }) => {
+        if (loadedMore.current) {
+          setWorkflows(current => mergeNewestPage(current, page))
+        } else {
+          setWorkflows(page)
+          setNextCursor(cursor)
+        }
         setSelectedId(current => {
-          if (current === null && data.length > 0) {
-            return data[0].id
+          if (current === null && page.length > 0) {
+            return page[0].id
           }
           return current
         })
@@ -49,11 +66,24 @@ export default function App() {
   useEffect(() => {
     if (!selectedId) return
 
-    getWorkflow(selectedId).then(setSelected)
+    setCompletedNodes([])
+    if (!supportsEvents()) {
+      getWorkflow(selectedId).then(setSelected)
+      return
+    }
+
+    // The stream starts with the current details and then pushes every change of the run
+    return subscribeWorkflow(selectedId, {
+      onState: detail => {
+        setSelected(detail)
+        setWorkflows(current => current.map(w => (w.id === detail.id ? { ...w, status: detail.status } : w)))
+      },
+      onNode: node => setCompletedNodes(current => [...current, node])
+    })
   }, [selectedId])
 
   useEffect(() => {
-    if (!selectedId || selected?.status !== 'running') return
+    if (supportsEvents() || !selectedId || selected?.status !== 'running') return
 
     const fetchSelected = () => {
       getWorkflow(selectedId).then(setSelected)
@@ -79,10 +109,20 @@ export default function App() {
     setShowStartModal(true)
   }
 
+  const loadMoreWorkflows = async () => {
+    const { workflows: page, nextCursor: cursor } = await getWorkflows(nextCursor)
+    loadedMore.current = true
+    setWorkflows(current => {
+      const ids = new Set(current.map(w => w.id))
+      return [...current, ...page.filter(w => !ids.has(w.id))]
+    })
+    setNextCursor(cursor)
+  }
+
   const confirmStartWorkflow = async () => {
     setShowStartModal(false)
     const data = await apiStart(newTemplate, newQuery)
-    setWorkflows([...workflows, { id: data.id, template: newTemplate, status: data.status }])
+    setWorkflows([{ id: data.id, template: newTemplate, status: data.status }, ...workflows])
     setSelectedId(data.id)
     setSelected(data)
   }
@@ -132,6 +172,9 @@ export default function App() {
             </li>
           ))}
         </ul>
+        {nextCursor && (
+          <button className="load-more" onClick={loadMoreWorkflows}>Load more</button>
+        )}
         <button className="new-workflow" onClick={openStartModal}>Start New Workflow</button>
       </aside>
       <main className="content">
@@ -142,11 +185,15 @@ export default function App() {
               <span className={`status-badge status-${selected.status.replace(/[\s_]+/g, '-').toLowerCase()}`}>
                 {selected.status}
               </span>
-              {selected.status === 'running' && (
+              {(selected.status === 'running' || selected.status === 'claimed') && (
                 <button className="cancel-btn" onClick={cancelRunningWorkflow}>Cancel Workflow</button>
               )}
             </div>
 
+            {selected.status === 'running' && completedNodes.length > 0 && (
+              <p className="node-progress">Completed: {completedNodes.join(' → ')}</p>
+            )}
+
             {showInterrupt && interrupt ? (
               <div className="interrupt-section">
                 <h3>🤔 Questions</h3>
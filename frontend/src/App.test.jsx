@@ -30,8 +30,12 @@ afterEach(() => {
   jest.resetAllMocks();
 });
 
-function mockResponse(data) {
-  return Promise.resolve({ ok: true, json: () => Promise.resolve(data) });
+function mockResponse(data, headers = {}) {
+  return Promise.resolve({
+    ok: true,
+    json: () => Promise.resolve(data),
+    headers: { get: name => headers[name] ?? null },
+  });
 }
 
 test('workflows display in succeeded, running and waiting states', async () => {
@@ -217,6 +221,31 @@ test('user can cancel running workflow', async () => {
   expect(canceledElems.length).toBeGreaterThan(0);
 });
 
+test('loads older workflows page by page', async () => {
+  fetch.mockImplementation((url) => {
+    if (url === '/workflows') {
+      return mockResponse([{ id: '2', template: 'newest', status: 'succeeded', created_at: '2024-01-02' }],
+        { 'X-Next-Cursor': 'page-2' });
+    }
+    if (url === '/workflows?cursor=page-2') {
+      return mockResponse([{ id: '1', template: 'oldest', status: 'failed', created_at: '2024-01-01' }]);
+    }
+    if (url === '/workflow-templates') {
+      return mockResponse([]);
+    }
+    return mockResponse({ id: '2', template: 'newest', status: 'succeeded', result: {} });
+  });
+
+  render(<App />);
+
+  fireEvent.click(await screen.findByText('Load more'));
+
+  expect(await screen.findByText('oldest')).toBeInTheDocument();
+  expect(screen.getAllByRole('listitem')).toHaveLength(2);
+  // The last page has no cursor
+  expect(screen.queryByText('Load more')).not.toBeInTheDocument();
+});
+
 test('polls workflows periodically', async () => {
   fetch.mockImplementation((url) => {
     if (url === '/workflows') {
@@ -277,3 +306,49 @@ test('does not poll selected workflow when not running', async () => {
   const timer = require('./timer');
   expect(timer.startPolling).toHaveBeenCalledTimes(1); // only list
 });
+
+test('follows selected workflow through server-sent events instead of polling', async () => {
+  const sources = [];
+  global.EventSource = class {
+    constructor(url) {
+      this.url = url;
+      this.listeners = {};
+      this.closed = false;
+      sources.push(this);
+    }
+    addEventListener(type, listener) {
+      this.listeners[type] = listener;
+    }
+    emit(type, data) {
+      this.listeners[type]({ data: JSON.stringify(data) });
+    }
+    close() {
+      this.closed = true;
+    }
+  };
+  fetch.mockImplementation((url) => {
+    if (url === '/workflows') {
+      return mockResponse([{ id: '1', template: 'a', status: 'running' }]);
+    }
+    return mockResponse([]);
+  });
+
+  try {
+    render(<App />);
+    await waitFor(() => expect(sources).toHaveLength(1));
+    expect(sources[0].url).toBe('/workflows/1/events');
+
+    act(() => sources[0].emit('state', { id: '1', template: 'a', status: 'running', result: {} }));
+    act(() => sources[0].emit('node', { node: 'Retrieve' }));
+    expect(await screen.findByText('Completed: Retrieve')).toBeInTheDocument();
+
+    act(() => sources[0].emit('state', { id: '1', template: 'a', status: 'succeeded', result: { answer: 'done' } }));
+    await waitFor(() => expect(document.querySelector('.status-succeeded')).toBeTruthy());
+    expect(sources[0].closed).toBe(true);
+    expect(fetch).not.toHaveBeenCalledWith('/workflows/1');
+    const timer = require('./timer');
+    expect(timer.startPolling).toHaveBeenCalledTimes(1); // only list
+  } finally {
+    delete global.EventSource;
+  }
+});
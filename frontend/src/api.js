@@ -3,13 +3,18 @@ import { API_BASE_URL } from './constants.js'
 // Base URL configuration - can be overridden via environment variables
 const BASE_URL = API_BASE_URL
 
+// Response header with the cursor of the next, older page of runs
+const NEXT_CURSOR_HEADER = 'X-Next-Cursor'
+
 /**
- * Fetch list of workflow runs.
- * @returns {Promise<WorkflowHistory[]>}
+ * Fetch a page of workflow runs, newest first.
+ * @param {string} [cursor] nextCursor of the previous page; omitted for the newest runs
+ * @returns {Promise<WorkflowPage>}
  */
-export async function getWorkflows() {
-  const resp = await fetch(`${BASE_URL}/workflows`)
-  return resp.json()
+export async function getWorkflows(cursor) {
+  const query = cursor ? `?cursor=${encodeURIComponent(cursor)}` : ''
+  const resp = await fetch(`${BASE_URL}/workflows${query}`)
+  return { workflows: await resp.json(), nextCursor: resp.headers.get(NEXT_CURSOR_HEADER) }
 }
 
 /**
@@ -72,3 +77,35 @@ export async function cancelWorkflow(id) {
   })
   return resp.json()
 }
+
+// Statuses after which the server ends a run's event stream
+const FINAL_STATUSES = ['succeeded', 'failed', 'canceled']
+
+/**
+ * Whether the browser can follow workflows through server-sent events.
+ * @returns {boolean}
+ */
+export function supportsEvents() {
+  return typeof EventSource !== 'undefined'
+}
+
+/**
+ * Follow a workflow through server-sent events instead of polling it.
+ * The first state event carries the current details.
+ * @param {string} id
+ * @param {{onState: (detail: WorkflowDetail) => void, onNode: (node: string) => void}} handlers
+ * @returns {() => void} closes the stream
+ */
+export function subscribeWorkflow(id, { onState, onNode }) {
+  const source = new EventSource(`${BASE_URL}/workflows/${id}/events`)
+  source.addEventListener('state', event => {
+    const detail = JSON.parse(event.data)
+    onState(detail)
+    // Closing keeps EventSource from reconnecting once the server ended the stream
+    if (FINAL_STATUSES.includes(detail.status)) {
+      source.close()
+    }
+  })
+  source.addEventListener('node', event => onNode(JSON.parse(event.data).node))
+  return () => source.close()
+}
@@ -1,5 +1,5 @@
 /**
- * @typedef {'queued' | 'running' | 'needs_input' | 'failed' | 'succeeded' | 'canceled'} WorkflowStatus
+ * @typedef {'queued' | 'claimed' | 'running' | 'needs_input' | 'failed' | 'succeeded' | 'canceled'} WorkflowStatus
  */
 
 /**
@@ -10,6 +10,12 @@
  * @property {string} created_at
  */
 
+/**
+ * @typedef {Object} WorkflowPage
+ * @property {WorkflowHistory[]} workflows
+ * @property {string | null} nextCursor null on the last page
+ */
+
 /**
  * @typedef {Object} WorkflowDetail
  * @property {string} id
@@ -25,9 +31,22 @@
  * @property {Object} [result]
  */
 
+/**
+ * @typedef {Object} TemplateParam
+ * @property {string} name
+ * @property {string} type
+ * @property {boolean} optional
+ * @property {*} [default]
+ */
+
 /**
  * @typedef {Object} TemplateInfo
  * @property {string} id
  * @property {string} name
  * @property {string} path
+ * @property {string} hash
+ * @property {string} [workflow]
+ * @property {Object<string, string>} metadata
+ * @property {TemplateParam[]} inputs
+ * @property {TemplateParam[]} outputs
  */
@@ -1,12 +1,17 @@
 from typing import Any, Dict
 from pathlib import Path
 from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+from itertools import zip_longest
 import yaml
 from pydantic import BaseModel, Field
 from llama_index.llms.ollama import Ollama
 from llama_index.core.llms import ChatMessage
 from bpmn_ext.bpmn_ext import bpmn_op
+from components.chunk_packer import pack_chunks
+from components.page_cache import page_cache, query_key
 from components.web_scraper import search_and_scrape
+import json
 import logging
 import traceback
 from langgraph.types import interrupt
@@ -224,61 +229,118 @@ def retrieve_from_web(state: Dict[str, Any]) -> Dict[str, Any]:
         logger.error("Error in retrieve_from_web: %s\n%s", str(e), traceback.format_exc())
         raise
 
+ARCHIVE_SEARCH_URL = "https://archive.org/advancedsearch.php"
+ARCHIVE_TIMEOUT = 10
+# Query variants searched at once; also the size of the session's connection pool
+ARCHIVE_MAX_QUERIES = 3
+
+
+@lru_cache()
+def _archive_session():
+    """Keep-alive session for archive.org, retrying transient failures with exponential backoff."""
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    retry = Retry(total=3, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504),
+                  allowed_methods=("GET",))
+    session = requests.Session()
+    session.mount("https://", HTTPAdapter(pool_maxsize=ARCHIVE_MAX_QUERIES, max_retries=retry))
+    return session
+
+
+def _search_archive(session, query: str, limit: int) -> list[str]:
+    key = query_key("archive", query, rows=limit)
+    cached = page_cache.get_fresh(key) if page_cache is not None else None
+    if cached is not None:
+        logger.info("Archive search for %r served from the page cache", query)
+        return json.loads(cached.value)
+
+    params = {
+        "output": "json",
+        "q": query,
+        "rows": limit,
+        "fields": "title,description",
+    }
+    resp = session.get(ARCHIVE_SEARCH_URL, params=params, timeout=ARCHIVE_TIMEOUT)
+    data = resp.json()
+    docs = data.get("response", {}).get("docs", [])
+
+    chunks: list[str] = []
+    for doc in docs:
+        title = doc.get("title", "")
+        desc = doc.get("description", "")
+        text = " ".join(part for part in [title, desc] if part).strip()
+        if text:
+            chunks.append(text)
+    if page_cache is not None:
+        page_cache.set(key, json.dumps(chunks))
+    return chunks
+
+
 @bpmn_op(
     name="retrieve_from_archive",
-    inputs={"extended_query": str},
+    inputs={"extended_query": str, "query": str, "next_query": str},
     outputs={"chunks": list},
 )
 def retrieve_from_archive(state: Dict[str, Any]) -> Dict[str, Any]:
-    """Search archive.org for papers matching the query."""
+    """Search archive.org for papers matching the query.
+
+    The extended query, the validator's next query and the original query are searched
+    concurrently; their results are interleaved with duplicates removed.
+    """
     logger.info("Starting retrieve_from_archive with state: %s", state)
     query = state.get("extended_query", "")
     limit = int(state.get("top_k", 3))
+    variants = list(dict.fromkeys(
+        q.strip() for q in (query, state.get("next_query"), state.get("query")) if q and q.strip()
+    ))[:ARCHIVE_MAX_QUERIES] or [query]
 
     try:
-        import requests
+        session = _archive_session()
     except Exception as e:
-        logger.error("Failed to import requests: %s", str(e))
+        logger.error("Failed to create requests session: %s", str(e))
         return {"chunks": [f"chunk for {query}"]}
 
-    url = "https://archive.org/advancedsearch.php"
-    params = {
-        "output": "json",
-        "q": query,
-        "rows": limit,
-        "fields": "title,description",
-    }
-
-    try:
-        resp = requests.get(url, params=params, timeout=10)
-        data = resp.json()
-        docs = data.get("response", {}).get("docs", [])
-        
-        chunks: list[str] = []
-        for doc in docs:
-            title = doc.get("title", "")
-            desc = doc.get("description", "")
-            text = " ".join(part for part in [title, desc] if part).strip()
-            if text:
-                chunks.append(text)
-        
-        logger.info("Successfully completed retrieve_from_archive: %s chunks", len(chunks))
-        return {"chunks": chunks}
-    except Exception as e:
-        logger.error("Error in retrieve_from_archive: %s\n%s", str(e), traceback.format_exc())
+    def search(variant: str) -> list[str] | None:
+        try:
+            return _search_archive(session, variant, limit)
+        except Exception as e:
+            logger.error("Error in retrieve_from_archive for %r: %s\n%s", variant, str(e), traceback.format_exc())
+            return None
+
+    if len(variants) == 1:
+        results = [search(variants[0])]
+    else:
+        with ThreadPoolExecutor(max_workers=len(variants)) as executor:
+            results = list(executor.map(search, variants))
+    found = [chunks for chunks in results if chunks is not None]
+    if not found:
         return {"chunks": [f"chunk for {query}"]}
 
+    # Best hits of every variant first
+    merged = dict.fromkeys(chunk for rank in zip_longest(*found) for chunk in rank if chunk is not None)
+    chunks = list(merged)
+    logger.info("Successfully completed retrieve_from_archive: %s chunks from %s queries", len(chunks), len(variants))
+    return {"chunks": chunks}
+
 @bpmn_op(
     name="process_info",
     inputs={"query": str, "chunks": list, "answer_draft": str},
     outputs={"answer_draft": str},
 )
 def process_info(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Update the draft from the retrieved chunks most relevant to the query.
+
+    Duplicate chunks are dropped and the rest ranked and packed into the prompt's token budget.
+    """
     logger.info("Starting process_info with state: %s", state)
     draft = state.get("answer_draft", "")
-    chunks = state.get("chunks", [])
     query = state.get("query", "")
     extended_query = state.get("extended_query", "")
+    all_chunks = state.get("chunks", [])
+    chunks = pack_chunks(all_chunks, f"{query} {extended_query}")
+    logger.info("Packed %s of %s chunks into the prompt", len(chunks), len(all_chunks))
     prompts = _load_prompts()
     llm = _structured_llm_draft()
     joined = "\n".join(chunks)
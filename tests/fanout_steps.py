@@ -0,0 +1,73 @@
+"""Fan-out workflow and its step functions; module level so process pools can pickle them."""
+
+import hashlib
+import time
+
+
+def split(query: str, config: dict) -> dict:
+    return {"seed": query}
+
+
+def cpu_work(seed: str, config: dict) -> dict:
+    digest = seed.encode()
+    for _ in range(config.get("rounds", 10_000)):
+        digest = hashlib.sha256(digest).digest()
+    return {"result": digest.hex()[:8]}
+
+
+def io_work(seed: str, config: dict) -> dict:
+    time.sleep(config.get("seconds", 0.05))
+    return {"result": seed}
+
+
+def join(config: dict, **results) -> dict:
+    return {"results": sorted(str(r) for r in results.values())}
+
+
+FN_MAP = {"split": split, "cpu_work": cpu_work, "io_work": io_work, "join": join}
+
+
+def fanout_workflow(width: int, call: str, max_parallelism: int, executor: str, name: str = "FanOut") -> str:
+    workers = "\n".join(f"""
+  node Work{i} {{
+    call {call}
+    inputs {{
+      String seed = Split.seed
+    }}
+    executor {{ type: {executor}, max_workers: {width} }}
+    outputs {{
+      String result
+    }}
+  }}""" for i in range(width))
+    join_inputs = "\n".join(f"      String result{i} = Work{i}.result" for i in range(width))
+    return f"""workflow {name} {{
+  metadata {{
+    max_parallelism: "{max_parallelism}"
+  }}
+  inputs {{
+    String query
+  }}
+  outputs {{
+    List<String> results = Join.results
+  }}
+  node Split {{
+    call split
+    inputs {{
+      String query = query
+    }}
+    outputs {{
+      String seed
+    }}
+  }}
+{workers}
+  node Join {{
+    call join
+    inputs {{
+{join_inputs}
+    }}
+    outputs {{
+      List<String> results
+    }}
+  }}
+}}
+"""
@@ -0,0 +1,85 @@
+import asyncio
+import threading
+
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.types import interrupt
+
+from awsl.run_awsl_workflow import arun_workflow, run_workflow
+from tests.test_simple_awsl_runner import AWSL_PATH, FN_MAP
+
+step_threads = set()
+
+
+async def query_extender(query: str, config: dict) -> dict:
+    await asyncio.sleep(0)
+    return {"extended_query": "extended query"}
+
+
+async def retrieve_from_web(extended_query: str, config: dict) -> dict:
+    await asyncio.sleep(0)
+    return {"chunks": ["chunk for hello"], "need_filtering": False}
+
+
+def final_answer_generation(query: str, extended_query: str, need_filtering: bool, chunks: list[str],
+                            filtered_chunks_summary: str, config: dict) -> dict:
+    step_threads.add(threading.current_thread().name)
+    return FN_MAP["final_answer_generation"](query, extended_query, need_filtering, chunks,
+                                              filtered_chunks_summary, config)
+
+
+ASYNC_FN_MAP = dict(FN_MAP,
+                    query_extender=query_extender,
+                    retrieve_from_web=retrieve_from_web,
+                    final_answer_generation=final_answer_generation)
+
+
+def test_arun_workflow_with_async_and_sync_steps():
+    step_threads.clear()
+    result = asyncio.run(arun_workflow(AWSL_PATH, fn_map=ASYNC_FN_MAP, params={"query": "hello"}))
+    assert result.get("FinalAnswer.final_answer") == "final answer from chunks"
+    assert all(name.startswith("awsl-step") for name in step_threads)
+
+
+def test_run_workflow_with_async_steps():
+    result = run_workflow(AWSL_PATH, fn_map=ASYNC_FN_MAP, params={"query": "hello"})
+    assert result.get("FinalAnswer.final_answer") == "final answer from chunks"
+
+
+def test_arun_workflow_runs_concurrently_on_one_loop():
+    async def scenario():
+        return await asyncio.gather(*[
+            arun_workflow(AWSL_PATH, fn_map=ASYNC_FN_MAP, params={"query": "hello"}) for _ in range(10)
+        ])
+
+    results = asyncio.run(scenario())
+    assert all(r.get("FinalAnswer.final_answer") == "final answer from chunks" for r in results)
+
+
+def test_arun_workflow_reports_completed_nodes():
+    completed = []
+
+    async def on_node(name: str) -> None:
+        completed.append(name)
+
+    result = asyncio.run(arun_workflow(AWSL_PATH, fn_map=ASYNC_FN_MAP, params={"query": "hello"}, on_node=on_node))
+    assert result == asyncio.run(arun_workflow(AWSL_PATH, fn_map=ASYNC_FN_MAP, params={"query": "hello"}))
+    # FilterChunks is skipped because need_filtering is false
+    assert completed == ["QueryExtender", "Retrieve", "FinalAnswer"]
+
+
+def test_arun_workflow_with_on_node_returns_interrupts():
+    def ask(extended_query: str, config: dict) -> dict:
+        return {"chunks": [interrupt({"questions": ["clarify?"]})], "need_filtering": False}
+
+    async def on_node(name: str) -> None:
+        pass
+
+    fn_map = dict(ASYNC_FN_MAP, retrieve_from_web=ask)
+    results = [
+        asyncio.run(arun_workflow(AWSL_PATH, fn_map=fn_map, params={"query": "hello"}, thread_id=thread_id,
+                                  checkpointer=MemorySaver(), **kwargs))
+        for thread_id, kwargs in (("plain", {}), ("streamed", {"on_node": on_node}))
+    ]
+    assert results[0]["__interrupt__"][0].value == results[1]["__interrupt__"][0].value == {"questions": ["clarify?"]}
+    assert {k: v for k, v in results[0].items() if k != "__interrupt__"} == \
+        {k: v for k, v in results[1].items() if k != "__interrupt__"}
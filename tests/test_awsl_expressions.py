@@ -0,0 +1,31 @@
+import pytest
+
+from awsl.expressions import ConditionSyntaxError, compile_condition
+
+
+@pytest.mark.parametrize("expr, state, expected", [
+    ("A.flag", {"A.flag": True}, True),
+    ("A.flag", {}, False),
+    ("!A.questions", {"A.questions": []}, True),
+    ("(A.questions && B.answers) || (!A.questions)", {"A.questions": ["q"], "B.answers": "a"}, True),
+    ("(A.questions && B.answers) || (!A.questions)", {"A.questions": ["q"]}, False),
+    ("A.need and B.items or not A.need", {"A.need": False}, True),
+    ("A.need and B.items or not A.need", {"A.need": True, "B.items": []}, False),
+    ('A.status == "GOOD"', {"A.status": "GOOD"}, True),
+    ("A.count >= 3 && A.count < 5.5", {"A.count": 4}, True),
+    ("query", {"query": "hello"}, True),
+    ("true && !false", {}, True),
+])
+def test_conditions(expr, state, expected):
+    assert compile_condition(expr)(state) is expected
+
+
+def test_condition_reads_values_without_copying():
+    chunks = [f"chunk {i}" for i in range(10_000)]
+    assert compile_condition("Retrieve.chunks")({"Retrieve.chunks": chunks})
+
+
+@pytest.mark.parametrize("expr", ["", "A.x &&", "(A.x", "A.x B.y", "A.x; import os"])
+def test_invalid_conditions(expr):
+    with pytest.raises(ConditionSyntaxError):
+        compile_condition(expr)
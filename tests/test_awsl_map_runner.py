@@ -0,0 +1,153 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from langgraph.checkpoint.memory import InMemorySaver
+
+from awsl.grammar.workflow_parser import MapClass, parse_awsl_to_objects
+from awsl.run_awsl_workflow import arun_workflow, run_workflow
+
+AWSL_PATH = "workflow_definitions/paper_rename_workflow/paper_rename_workflow.awsl"
+
+in_flight = 0
+max_in_flight = 0
+lock = threading.Lock()
+
+
+def get_files(drafts_folder_path: str, config: dict) -> dict:
+    count = int(drafts_folder_path.rsplit("/", 1)[-1])
+    return {"file_paths": [f"{drafts_folder_path}/paper{i}.pdf" for i in range(count)]}
+
+
+def read_pdf_file(file_path: str, config: dict) -> dict:
+    global in_flight, max_in_flight
+    assert config["pages_to_read"] == 2
+    with lock:
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+    time.sleep(0.02)
+    with lock:
+        in_flight -= 1
+    return {"pages": [f"page of {file_path}"], "file_path": file_path}
+
+
+def extract_metadata(pages: list, config: dict) -> dict:
+    return {"title": pages[0].rsplit("/", 1)[-1], "authors": ["Author"], "year": "2024"}
+
+
+def rename_file(file_path: str, title: str, authors: list[str], year: str, processed_folder_path: str,
+                config: dict) -> dict:
+    return {"new_file_path": f"{processed_folder_path}/[{year}] {authors[0]} - {title}"}
+
+
+def return_processed_files(processed_files: list[str], config: dict) -> dict:
+    return {"processed_files": processed_files}
+
+
+FN_MAP = {
+    "get_files": get_files,
+    "read_pdf_file": read_pdf_file,
+    "extract_metadata": extract_metadata,
+    "rename_file": rename_file,
+    "return_processed_files": return_processed_files,
+}
+
+
+def expected_files(count: int) -> list[str]:
+    return [f"/done/[2024] Author - paper{i}.pdf" for i in range(count)]
+
+
+def test_map_block_is_parsed():
+    workflow = parse_awsl_to_objects(AWSL_PATH)
+    rename = next(node for node in workflow.nodes if isinstance(node, MapClass))
+    assert (rename.item, rename.over, rename.max_concurrency) == ("file_path", "file_paths", 4)
+    assert [node.name for node in rename.nodes] == ["ReadPdfFile", "ExtractMetadata", "RenameFile"]
+
+
+def test_map_processes_every_item_concurrently():
+    global max_in_flight
+    max_in_flight = 0
+    params = {"drafts_folder_path": "/drafts/12", "processed_folder_path": "/done"}
+    result = run_workflow(AWSL_PATH, fn_map=FN_MAP, params=params)
+    assert result["ReturnProcessedFiles.processed_files"] == expected_files(12)
+    assert 1 < max_in_flight <= 4
+
+
+def test_map_async_path():
+    params = {"drafts_folder_path": "/drafts/7", "processed_folder_path": "/done"}
+    result = asyncio.run(arun_workflow(AWSL_PATH, fn_map=FN_MAP, params=params))
+    assert result["ReturnProcessedFiles.processed_files"] == expected_files(7)
+
+
+def test_map_over_empty_list():
+    params = {"drafts_folder_path": "/drafts/0", "processed_folder_path": "/done"}
+    result = run_workflow(AWSL_PATH, fn_map=FN_MAP, params=params)
+    assert result["ReturnProcessedFiles.processed_files"] == []
+
+
+def test_zero_max_concurrency_is_rejected(tmp_path):
+    path = tmp_path / "map.awsl"
+    path.write_text(open(AWSL_PATH).read().replace("max_concurrency: 4", "max_concurrency: 0"))
+    with pytest.raises(ValueError, match="max_concurrency"):
+        parse_awsl_to_objects(str(path))
+
+
+def test_body_cache_counters_reach_the_parent(tmp_path):
+    path = tmp_path / "map.awsl"
+    cached = open(AWSL_PATH).read().replace("call extract_metadata", "call extract_metadata\n cache { ttl: 1h }")
+    path.write_text(cached)
+    params = {"drafts_folder_path": "/cached/3", "processed_folder_path": "/done"}
+    first = run_workflow(str(path), fn_map=FN_MAP, params=params)
+    second = run_workflow(str(path), fn_map=FN_MAP, params=params)
+    assert (first["ExtractMetadata.cache_hits"], first["ExtractMetadata.cache_misses"]) == (0, 3)
+    assert (second["ExtractMetadata.cache_hits"], second["ExtractMetadata.cache_misses"]) == (3, 0)
+
+
+class RenameFailed(Exception):
+    pass
+
+
+@pytest.fixture
+def renames():
+    """rename_file that fails once for paper2 and records every rename it does"""
+    done = []
+    failed = []
+
+    def flaky_rename_file(file_path: str, title: str, authors: list[str], year: str, processed_folder_path: str,
+                          config: dict) -> dict:
+        if title == "paper2.pdf" and not failed:
+            failed.append(file_path)
+            raise RenameFailed(file_path)
+        done.append(file_path)
+        return rename_file(file_path, title, authors, year, processed_folder_path, config)
+
+    return done, dict(FN_MAP, rename_file=flaky_rename_file)
+
+
+def test_resume_reruns_only_the_failed_item(renames):
+    done, fn_map = renames
+    saver = InMemorySaver()
+    params = {"drafts_folder_path": "/drafts/5", "processed_folder_path": "/done"}
+    with pytest.raises(RenameFailed):
+        run_workflow(AWSL_PATH, fn_map=fn_map, params=params, thread_id="job", checkpointer=saver)
+
+    result = run_workflow(AWSL_PATH, fn_map=fn_map, params=params, thread_id="job", checkpointer=saver,
+                          resume_existing=True)
+    assert result["ReturnProcessedFiles.processed_files"] == expected_files(5)
+    assert sorted(done) == [f"/drafts/5/paper{i}.pdf" for i in range(5)]
+
+
+def test_async_resume_reruns_only_the_failed_item(renames):
+    done, fn_map = renames
+    saver = InMemorySaver()
+    params = {"drafts_folder_path": "/drafts/5", "processed_folder_path": "/done"}
+
+    async def scenario():
+        with pytest.raises(RenameFailed):
+            await arun_workflow(AWSL_PATH, fn_map=fn_map, params=params, thread_id="job", checkpointer=saver)
+        return await arun_workflow(AWSL_PATH, fn_map=fn_map, params=params, thread_id="job", checkpointer=saver,
+                                   resume_existing=True)
+
+    assert asyncio.run(scenario())["ReturnProcessedFiles.processed_files"] == expected_files(5)
+    assert sorted(done) == [f"/drafts/5/paper{i}.pdf" for i in range(5)]
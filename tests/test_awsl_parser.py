@@ -0,0 +1,34 @@
+from pathlib import Path
+
+import pytest
+from lark import Lark
+
+from awsl.grammar.workflow_parser import ASTBuilder, get_parser, load_grammar, parse_awsl_to_objects
+
+AWSL_FILES = [
+    "awsl/sample.awsl",
+    "awsl/sample_with_cycle.awsl",
+    "workflow_definitions/sample/sample.awsl",
+    "workflow_definitions/paper_rename_workflow/paper_rename_workflow.awsl",
+]
+
+
+def test_parser_is_shared():
+    assert get_parser() is get_parser()
+    assert get_parser().options.parser == "lalr"
+
+
+@pytest.mark.parametrize("path", AWSL_FILES)
+def test_lalr_matches_earley(path):
+    earley = Lark(load_grammar(), start="workflow")
+    expected = ASTBuilder().transform(earley.parse(Path(path).read_text()))
+    assert repr(parse_awsl_to_objects(path)) == repr(expected)
+
+
+def test_serialized_parser_cache(tmp_path):
+    cache_file = tmp_path / "awsl.lark"
+    Lark(load_grammar(), start="workflow", parser="lalr", cache=str(cache_file))
+    assert cache_file.exists()
+    cached = Lark(load_grammar(), start="workflow", parser="lalr", cache=str(cache_file))
+    text = Path(AWSL_FILES[0]).read_text()
+    assert repr(ASTBuilder().transform(cached.parse(text))) == repr(parse_awsl_to_objects(AWSL_FILES[0]))
@@ -1,6 +1,10 @@
+import asyncio
+import json
 import os
 import tempfile
+from datetime import datetime, timedelta, timezone
 from fastapi.testclient import TestClient
+from sqlalchemy import inspect, text
 from sqlalchemy.orm import Session
 
 # use temporary sqlite db for tests
@@ -10,7 +14,7 @@ os.environ["DATABASE_URL"] = f"sqlite:///{path}"
 
 from backend import main  # noqa: E402
 from backend.models import WorkflowRun  # noqa: E402
-from backend.database import SessionLocal  # noqa: E402
+from backend.database import SessionLocal, engine, init_db  # noqa: E402
 
 
 def dummy_run(*args, **kwargs):
@@ -52,3 +56,266 @@ def test_cancel_workflow():
 
         cont = client.post(f"/workflows/{wf_id}/continue", json={"query": "ok"})
         assert cont.status_code == 400
+
+
+def test_cancel_claimed_workflow():
+    with TestClient(main.app) as client:
+        start = client.post("/workflows", json={"template_name": "sample", "query": "hi"})
+        wf_id = start.json()["id"]
+        # claimed by a worker that hasn't started it yet
+        db: Session = SessionLocal()
+        run = db.get(WorkflowRun, wf_id)
+        run.state = main.WorkflowStatus.CLAIMED
+        db.commit()
+        db.close()
+
+        assert client.get(f"/workflows/{wf_id}").json()["status"] == "claimed"
+        cancel = client.post(f"/workflows/{wf_id}/cancel")
+        assert cancel.status_code == 200
+        assert cancel.json()["status"] == "canceled"
+
+
+def test_human_input_resumes_do_not_use_up_attempts():
+    with TestClient(main.app) as client:
+        wf_id = client.post("/workflows", json={"template_name": "sample", "query": "hi"}).json()["id"]
+
+        # The attempt bookkeeping of worker.db claim_jobs and reap_stale_jobs
+        def claim():
+            with engine.begin() as conn:
+                conn.execute(text("UPDATE workflow_runs SET state = 'claimed', attempt = attempt + 1 WHERE id = :id"),
+                             {"id": wf_id})
+
+        def reap() -> str:
+            with engine.begin() as conn:
+                conn.execute(text("UPDATE workflow_runs SET state = CASE WHEN attempt >= max_attempts "
+                                  "THEN 'failed' ELSE 'queued' END WHERE id = :id"), {"id": wf_id})
+            return client.get(f"/workflows/{wf_id}").json()["status"]
+
+        for answer in ("first", "second", "third"):
+            claim()
+            with engine.begin() as conn:
+                conn.execute(text("UPDATE workflow_runs SET state = 'needs_input' WHERE id = :id"), {"id": wf_id})
+            assert client.post(f"/workflows/{wf_id}/continue", json={"inputs": {"answer": answer}}).status_code == 200
+
+        # The worker crashes on the first claim after the last answer
+        claim()
+        assert reap() == "queued"
+
+
+def add_history_runs(template: str, states: list[str]) -> list[str]:
+    db: Session = SessionLocal()
+    base = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    ids = []
+    for i, state in enumerate(states):
+        run_id = f"{template}-{i:02d}"
+        db.add(WorkflowRun(id=run_id, graph_name=template, thread_id=run_id, state=state,
+                           inputs={"query": "large" * 100}, created_at=base + timedelta(minutes=i)))
+        ids.append(run_id)
+    db.commit()
+    db.close()
+    return ids
+
+
+def test_history_pages_newest_first():
+    ids = add_history_runs("history", ["succeeded"] * 5)
+    with TestClient(main.app) as client:
+        pages, cursor = [], None
+        while True:
+            params = {"template": "history", "limit": 2}
+            if cursor:
+                params["cursor"] = cursor
+            resp = client.get("/workflows", params=params)
+            assert resp.status_code == 200
+            pages.append([run["id"] for run in resp.json()])
+            cursor = resp.headers.get("x-next-cursor")
+            if not cursor:
+                break
+    assert pages == [ids[4:2:-1], ids[2:0:-1], ids[:1]]
+
+
+def test_history_filters_by_status():
+    add_history_runs("filtered", ["succeeded", "failed", "queued", "failed"])
+    with TestClient(main.app) as client:
+        resp = client.get("/workflows", params={"template": "filtered", "status": ["failed", "queued"]})
+        assert [run["id"] for run in resp.json()] == ["filtered-03", "filtered-02", "filtered-01"]
+        assert "x-next-cursor" not in resp.headers
+
+        assert client.get("/workflows", params={"cursor": "not a cursor"}).status_code == 400
+        assert client.get("/workflows", params={"limit": 0}).status_code == 422
+
+
+def test_start_with_priority():
+    with TestClient(main.app) as client:
+        start = client.post("/workflows", json={"template_name": "sample", "inputs": {}, "priority": 5})
+        db: Session = SessionLocal()
+        assert db.get(WorkflowRun, start.json()["id"]).priority == 5
+        db.close()
+
+
+def test_init_db_adds_columns_and_indexes_to_existing_tables():
+    with TestClient(main.app) as client:
+        wf_id = client.post("/workflows", json={"template_name": "sample", "inputs": {}}).json()["id"]
+    with engine.begin() as conn:
+        conn.exec_driver_sql("DROP INDEX ix_workflow_runs_queue")
+        conn.exec_driver_sql("ALTER TABLE workflow_runs DROP COLUMN priority")
+    init_db()
+    columns = {column["name"] for column in inspect(engine).get_columns("workflow_runs")}
+    indexes = {index["name"] for index in inspect(engine).get_indexes("workflow_runs")}
+    assert "priority" in columns
+    assert "ix_workflow_runs_queue" in indexes
+    db: Session = SessionLocal()
+    assert db.get(WorkflowRun, wf_id).priority == 0
+    db.close()
+
+
+def test_events_stream_state_and_node_progress():
+    with TestClient(main.app) as client:
+        wf_id = client.post("/workflows", json={"template_name": "sample", "inputs": {}}).json()["id"]
+
+        async def worker_progress():
+            # What the worker publishes through NOTIFY once the stream is subscribed
+            while not len(main.run_events):
+                await asyncio.sleep(0.01)
+            main.run_events.publish({"id": wf_id, "event": "node", "node": "QueryExtender"})
+            db: Session = SessionLocal()
+            run = db.get(WorkflowRun, wf_id)
+            run.state, run.result = main.WorkflowStatus.SUCCEEDED, {"answer": "done"}
+            db.commit()
+            db.close()
+            main.run_events.publish({"id": wf_id, "event": "state", "state": "succeeded"})
+
+        client.portal.start_task_soon(worker_progress)
+        resp = client.get(f"/workflows/{wf_id}/events")
+
+    assert resp.headers["content-type"].startswith("text/event-stream")
+    events = [block.split("\n") for block in resp.text.strip().split("\n\n")]
+    assert [lines[0] for lines in events] == ["event: state", "event: node", "event: state"]
+    first, node, last = (json.loads(lines[1].removeprefix("data: ")) for lines in events)
+    assert first["status"] == "queued"
+    assert node == {"node": "QueryExtender"}
+    assert (last["status"], last["result"]) == ("succeeded", {"answer": "done"})
+    assert len(main.run_events) == 0
+
+
+def test_events_stream_rereads_the_run_without_notifications(monkeypatch):
+    monkeypatch.setattr(main, "EVENTS_KEEPALIVE", 0.05)
+    with TestClient(main.app) as client:
+        wf_id = client.post("/workflows", json={"template_name": "sample", "inputs": {}}).json()["id"]
+
+        async def worker_progress():
+            # No NOTIFY, as on SQLite or while the listener reconnects
+            while not len(main.run_events):
+                await asyncio.sleep(0.01)
+            await asyncio.sleep(0.1)
+            db: Session = SessionLocal()
+            db.get(WorkflowRun, wf_id).state = main.WorkflowStatus.SUCCEEDED
+            db.commit()
+            db.close()
+
+        client.portal.start_task_soon(worker_progress)
+        resp = client.get(f"/workflows/{wf_id}/events")
+
+    states = [json.loads(block.split("\n")[1].removeprefix("data: "))["status"]
+              for block in resp.text.strip().split("\n\n") if block.startswith("event: state")]
+    assert states == ["queued", "succeeded"]
+    assert ": keepalive" in resp.text
+
+
+def test_events_stream_rereads_the_run_only_after_the_listener_reconnects(monkeypatch):
+    from backend import events
+
+    monkeypatch.setattr(main, "EVENTS_KEEPALIVE", 0.05)
+    monkeypatch.setattr(events.RunEvents, "listening", property(lambda self: True))
+    reads = []
+
+    async def read_state(workflow_run_id):
+        reads.append(workflow_run_id)
+        return await original_read_state(workflow_run_id)
+
+    original_read_state = main.read_state
+    monkeypatch.setattr(main, "read_state", read_state)
+    with TestClient(main.app) as client:
+        wf_id = client.post("/workflows", json={"template_name": "sample", "inputs": {}}).json()["id"]
+
+        async def worker_progress():
+            while not len(main.run_events):
+                await asyncio.sleep(0.01)
+            await asyncio.sleep(0.2)
+            # The run finished while the LISTEN connection was down, so its NOTIFY was lost
+            db: Session = SessionLocal()
+            db.get(WorkflowRun, wf_id).state = main.WorkflowStatus.SUCCEEDED
+            db.commit()
+            db.close()
+            main.run_events.generation += 1
+
+        client.portal.start_task_soon(worker_progress)
+        resp = client.get(f"/workflows/{wf_id}/events")
+
+    assert resp.text.count("event: state") == 2
+    assert ": keepalive" in resp.text
+    assert reads == [wf_id]
+
+
+def test_run_events_reconnect_after_the_connection_drops(monkeypatch):
+    from backend import events, notifications
+
+    connections = []
+
+    class FakeConnection:
+        def __init__(self):
+            self.on_close = []
+            self.closed = False
+
+        def add_termination_listener(self, callback):
+            self.on_close.append(callback)
+
+        async def add_listener(self, channel, callback):
+            self.callback = callback
+
+        async def close(self, timeout=None):
+            self.closed = True
+
+    async def fake_connect(dsn):
+        connections.append(FakeConnection())
+        return connections[-1]
+
+    monkeypatch.setattr(notifications.asyncpg, "connect", fake_connect)
+
+    async def scenario():
+        run_events = events.RunEvents()
+        queue = run_events.subscribe("run")
+        await run_events.start("postgresql://localhost/db")
+        await asyncio.sleep(0.01)
+        for callback in connections[0].on_close:
+            callback(connections[0])
+        await asyncio.sleep(0.01)
+        connections[1].callback(None, 0, "workflow_events", json.dumps({"id": "run", "event": "node", "node": "A"}))
+        await run_events.stop()
+        return queue.get_nowait(), run_events.generation
+
+    # Each connect bumps the generation, so streams re-read their run after the reconnect
+    assert asyncio.run(scenario()) == ({"id": "run", "event": "node", "node": "A"}, 2)
+    assert len(connections) == 2
+    assert all(conn.closed for conn in connections)
+
+
+def test_events_stream_of_finished_or_unknown_run():
+    with TestClient(main.app) as client:
+        wf_id = client.post("/workflows", json={"template_name": "sample", "inputs": {}}).json()["id"]
+        db: Session = SessionLocal()
+        db.get(WorkflowRun, wf_id).state = main.WorkflowStatus.FAILED
+        db.commit()
+        db.close()
+
+        resp = client.get(f"/workflows/{wf_id}/events")
+        assert resp.text.count("event: state") == 1
+        assert client.get("/workflows/missing/events").status_code == 404
+    assert len(main.run_events) == 0
+
+
+def test_templates_include_input_schema():
+    with TestClient(main.app) as client:
+        sample = next(t for t in client.get("/workflow-templates").json() if t["id"] == "sample")
+    assert sample["workflow"] == "SampleRAGWorkflow"
+    assert sample["inputs"] == [{"name": "query", "type": "String", "optional": False, "default": None}]
+    assert sample["outputs"][0]["name"] == "final_answer"
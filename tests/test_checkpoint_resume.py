@@ -0,0 +1,48 @@
+import asyncio
+
+import pytest
+from langgraph.checkpoint.memory import InMemorySaver
+
+from awsl.run_awsl_workflow import arun_workflow, run_workflow
+from tests.test_node_retry import FN_MAP, OllamaTimeout, calls, retry_workflow
+
+
+@pytest.fixture
+def failing_once(tmp_path):
+    calls.update(prepare=0, fetch=0)
+    path = tmp_path / "resume.awsl"
+    path.write_text(retry_workflow("", failures=1))
+    return str(path)
+
+
+def test_rerun_resumes_after_last_completed_node(failing_once):
+    saver = InMemorySaver()
+    with pytest.raises(OllamaTimeout):
+        run_workflow(failing_once, fn_map=FN_MAP, params={"query": "q"}, thread_id="job", checkpointer=saver)
+
+    result = run_workflow(failing_once, fn_map=FN_MAP, params={"query": "q"}, thread_id="job",
+                          checkpointer=saver, resume_existing=True)
+    assert result["Finish.result"] == "answer to prompt for q"
+    assert calls == {"prepare": 1, "fetch": 2}
+
+
+def test_async_rerun_resumes_after_last_completed_node(failing_once):
+    saver = InMemorySaver()
+
+    async def scenario():
+        with pytest.raises(OllamaTimeout):
+            await arun_workflow(failing_once, fn_map=FN_MAP, params={"query": "q"}, thread_id="job",
+                                checkpointer=saver, resume_existing=True)
+        return await arun_workflow(failing_once, fn_map=FN_MAP, params={"query": "q"}, thread_id="job",
+                                   checkpointer=saver, resume_existing=True)
+
+    assert asyncio.run(scenario())["Finish.result"] == "answer to prompt for q"
+    assert calls == {"prepare": 1, "fetch": 2}
+
+
+def test_without_resume_existing_the_run_starts_over(failing_once):
+    saver = InMemorySaver()
+    with pytest.raises(OllamaTimeout):
+        run_workflow(failing_once, fn_map=FN_MAP, params={"query": "q"}, thread_id="job", checkpointer=saver)
+    run_workflow(failing_once, fn_map=FN_MAP, params={"query": "q"}, thread_id="job", checkpointer=saver)
+    assert calls == {"prepare": 2, "fetch": 2}
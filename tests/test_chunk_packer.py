@@ -0,0 +1,50 @@
+import os
+import subprocess
+import sys
+
+from components.chunk_packer import dedupe_chunks, estimate_tokens, minhash, pack_chunks, rank_chunks, tokenize
+
+ARTICLE = " ".join(f"Solar panel model {i} converts sunlight with {10 + i % 13} percent efficiency "
+                   f"after {i * 3} hours of testing." for i in range(40))
+OTHER = " ".join(f"Printing press number {i} was built in {1450 + i * 7} and printed {i * 11} "
+                 f"books before it was retired." for i in range(40))
+
+
+def test_exact_and_near_duplicates_are_dropped():
+    near = ARTICLE.replace("model 7 ", "model seven ") + " Advertisement. Subscribe to our newsletter."
+    assert dedupe_chunks([ARTICLE, OTHER, ARTICLE, near, "", "  "]) == [ARTICLE, OTHER]
+
+
+def test_distinct_chunks_on_the_same_topic_are_kept():
+    related = " ".join(f"Solar panel model {i} converts sunlight with {10 + i % 11} percent efficiency "
+                       f"after {i * 5} hours of testing." for i in range(40))
+    assert dedupe_chunks([ARTICLE, related]) == [ARTICLE, related]
+
+
+def test_chunks_are_ranked_by_relevance_to_the_query():
+    assert rank_chunks([OTHER, ARTICLE], "solar panel efficiency") == [ARTICLE, OTHER]
+    # Without matching terms the original order is kept
+    assert rank_chunks([OTHER, ARTICLE], "quantum chromodynamics") == [OTHER, ARTICLE]
+
+
+def test_packing_respects_the_token_budget():
+    short = "Solar farms in deserts produce cheap power. " * 3
+    budget = estimate_tokens(ARTICLE) + estimate_tokens(short)
+    packed = pack_chunks([OTHER, ARTICLE, ARTICLE, short], "solar power", budget=budget)
+    assert packed == [short, ARTICLE] or packed == [ARTICLE, short]
+    assert sum(estimate_tokens(chunk) for chunk in packed) <= budget
+
+
+def test_an_oversized_best_chunk_is_truncated():
+    packed = pack_chunks([ARTICLE], "solar", budget=10)
+    assert packed == [ARTICLE[:40]]
+
+
+def test_sketches_are_the_same_in_every_process():
+    # Sketches stored or compared across workers must not depend on the per-process hash seed
+    text = "the same page fetched by two different worker processes"
+    script = f"from components.chunk_packer import minhash, tokenize; print(sorted(minhash(tokenize({text!r}))))"
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    outputs = {subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True, cwd=root,
+                              env=dict(os.environ, PYTHONHASHSEED=seed)).stdout for seed in ("1", "2")}
+    assert outputs == {f"{sorted(minhash(tokenize(text)))}\n"}
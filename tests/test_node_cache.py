@@ -0,0 +1,133 @@
+import asyncio
+import time
+
+import pytest
+
+from awsl.grammar.workflow_parser import CacheConfig, parse_awsl_to_objects
+from awsl.node_cache import MemoryCache, SqliteCache, get_backend, register_backend
+from awsl.run_awsl_workflow import arun_workflow, run_workflow
+
+calls = []
+
+
+def expand(query: str, page: int, config: dict) -> dict:
+    calls.append((query, page))
+    return {"expanded": f"{query}:{page}:{config['suffix']}"}
+
+
+async def aexpand(query: str, page: int, config: dict) -> dict:
+    return expand(query, page, config)
+
+
+def cached_workflow(cache: str, call: str = "expand") -> str:
+    return f"""workflow Cached {{
+  inputs {{
+    String query
+    Int page
+  }}
+  outputs {{
+    String expanded = Expand.expanded
+  }}
+  node Expand {{
+    call {call}
+    const {{
+      suffix: "v1"
+    }}
+    inputs {{
+      String query = query
+      Int page = page
+    }}
+    {cache}
+    outputs {{
+      String expanded
+    }}
+  }}
+}}
+"""
+
+
+@pytest.fixture
+def workflow(tmp_path):
+    calls.clear()
+    register_backend("memory", MemoryCache)
+
+    def write(cache: str, call: str = "expand") -> str:
+        path = tmp_path / "cached.awsl"
+        path.write_text(cached_workflow(cache, call))
+        return str(path)
+    return write
+
+
+def test_cache_block_is_parsed(workflow):
+    path = workflow("cache { ttl: 24h, key: [query], backend: sqlite }")
+    assert parse_awsl_to_objects(path).nodes[0].cache == CacheConfig(ttl="24h", key=["query"], backend="sqlite")
+
+
+def test_repeated_inputs_hit_the_cache(workflow):
+    path = workflow("cache { ttl: 1h }")
+    fn_map = {"expand": expand}
+
+    first = run_workflow(path, fn_map=fn_map, params={"query": "q", "page": 1})
+    second = run_workflow(path, fn_map=fn_map, params={"query": "q", "page": 1})
+    third = run_workflow(path, fn_map=fn_map, params={"query": "q", "page": 2})
+
+    assert first["Expand.expanded"] == second["Expand.expanded"] == "q:1:v1"
+    assert third["Expand.expanded"] == "q:2:v1"
+    assert calls == [("q", 1), ("q", 2)]
+    assert (first["Expand.cache_hits"], first["Expand.cache_misses"]) == (0, 1)
+    assert (second["Expand.cache_hits"], second["Expand.cache_misses"]) == (1, 0)
+
+
+def test_key_restricts_inputs(workflow):
+    path = workflow("cache { ttl: 1h, key: [query] }")
+    run_workflow(path, fn_map={"expand": expand}, params={"query": "q", "page": 1})
+    result = run_workflow(path, fn_map={"expand": expand}, params={"query": "q", "page": 2})
+    assert result["Expand.expanded"] == "q:1:v1"
+    assert calls == [("q", 1)]
+
+
+def test_unknown_key_input_is_rejected(workflow):
+    path = workflow("cache { ttl: 1h, key: [missing] }")
+    with pytest.raises(ValueError, match="unknown inputs"):
+        run_workflow(path, fn_map={"expand": expand}, params={"query": "q", "page": 1}, use_cache=False)
+
+
+def test_async_step_is_cached(workflow):
+    path = workflow("cache { ttl: 1h }", call="aexpand")
+    fn_map = {"aexpand": aexpand}
+    asyncio.run(arun_workflow(path, fn_map=fn_map, params={"query": "q", "page": 1}))
+    result = asyncio.run(arun_workflow(path, fn_map=fn_map, params={"query": "q", "page": 1}))
+    assert result["Expand.cache_hits"] == 1
+    assert calls == [("q", 1)]
+
+
+def test_sqlite_backend_survives_restarts(workflow, tmp_path):
+    register_backend("sqlite", lambda: SqliteCache(str(tmp_path / "cache.sqlite")))
+    path = workflow("cache { ttl: 1h, backend: sqlite }")
+    run_workflow(path, fn_map={"expand": expand}, params={"query": "q", "page": 1})
+
+    # A new backend instance over the same file stands in for a fresh process
+    register_backend("sqlite", lambda: SqliteCache(str(tmp_path / "cache.sqlite")))
+    result = run_workflow(path, fn_map={"expand": expand}, params={"query": "q", "page": 1})
+    assert result["Expand.cache_hits"] == 1
+    assert calls == [("q", 1)]
+
+
+def test_expired_entries_are_missed(monkeypatch):
+    backend = MemoryCache(maxsize=2)
+    backend.set("a", b"1", ttl=10)
+    backend.set("b", b"2", ttl=None)
+    backend.set("c", b"3", ttl=None)
+    assert backend.get("a") is None  # evicted as least recently used
+
+    now = time.time()
+    monkeypatch.setattr("awsl.node_cache.time.time", lambda: now + 20)
+    backend.set("d", b"4", ttl=10)
+    monkeypatch.setattr("awsl.node_cache.time.time", lambda: now + 40)
+    assert backend.get("d") is None
+    assert backend.get("c") == b"3"
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError, match="Unknown cache backend"):
+        get_backend("redis")
@@ -0,0 +1,144 @@
+import asyncio
+
+import pytest
+
+from awsl.grammar.workflow_parser import RetryConfig, parse_awsl_to_objects
+from awsl.run_awsl_workflow import arun_workflow, run_workflow
+
+calls = {"prepare": 0, "fetch": 0}
+
+
+class OllamaTimeout(Exception):
+    pass
+
+
+def prepare(query: str, config: dict) -> dict:
+    calls["prepare"] += 1
+    return {"prompt": f"prompt for {query}"}
+
+
+def fetch(prompt: str, config: dict) -> dict:
+    calls["fetch"] += 1
+    if calls["fetch"] <= config["failures"]:
+        raise OllamaTimeout("model timed out")
+    return {"answer": f"answer to {prompt}"}
+
+
+def finish(query: str, answer: str, config: dict) -> dict:
+    return {"result": answer or f"no answer for {query}"}
+
+
+FN_MAP = {"prepare": prepare, "fetch": fetch, "finish": finish, "OllamaTimeout": OllamaTimeout}
+
+
+def retry_workflow(retry: str, failures: int) -> str:
+    return f"""workflow Retried {{
+  inputs {{
+    String query
+  }}
+  outputs {{
+    String result = Finish.result
+  }}
+  node Prepare {{
+    call prepare
+    inputs {{
+      String query = query
+    }}
+    outputs {{
+      String prompt
+    }}
+  }}
+  node Fetch {{
+    call fetch
+    const {{
+      failures: {failures}
+    }}
+    inputs {{
+      String prompt = Prepare.prompt
+    }}
+    {retry}
+    outputs {{
+      String answer
+    }}
+  }}
+  node Finish {{
+    call finish
+    inputs {{
+      String query = query
+      String answer = Fetch.answer?
+    }}
+    outputs {{
+      String result
+    }}
+  }}
+}}
+"""
+
+
+@pytest.fixture
+def workflow(tmp_path):
+    calls.update(prepare=0, fetch=0)
+
+    def write(retry: str, failures: int = 0) -> str:
+        path = tmp_path / f"retry_{failures}.awsl"
+        path.write_text(retry_workflow(retry, failures))
+        return str(path)
+    return write
+
+
+def test_retry_block_is_parsed(workflow):
+    path = workflow("retry { attempts: 3, backoff: jittered, policy: skip, delay: 2s, retry_on: [OllamaTimeout] }")
+    assert parse_awsl_to_objects(path).nodes[1].retry == RetryConfig(
+        attempts=3, backoff="jittered", policy="skip", delay="2s", retry_on=["OllamaTimeout"])
+
+
+def test_only_the_failing_node_is_retried(workflow):
+    path = workflow("retry { attempts: 3, backoff: exponential, policy: fail, delay: 0s }", failures=2)
+    result = run_workflow(path, fn_map=FN_MAP, params={"query": "q"})
+    assert result["Finish.result"] == "answer to prompt for q"
+    assert calls == {"prepare": 1, "fetch": 3}
+
+
+def test_async_run_retries(workflow):
+    path = workflow("retry { attempts: 2, backoff: fixed, policy: fail, delay: 0s }", failures=1)
+    result = asyncio.run(arun_workflow(path, fn_map=FN_MAP, params={"query": "q"}))
+    assert result["Finish.result"] == "answer to prompt for q"
+    assert calls["fetch"] == 2
+
+
+def test_exhausted_retries_fail_the_run(workflow):
+    path = workflow("retry { attempts: 2, backoff: fixed, policy: fail, delay: 0s }", failures=5)
+    with pytest.raises(OllamaTimeout):
+        run_workflow(path, fn_map=FN_MAP, params={"query": "q"})
+    assert calls["fetch"] == 2
+
+
+def test_skip_policy_continues_without_outputs(workflow):
+    path = workflow("retry { attempts: 2, backoff: fixed, policy: skip, delay: 0s }", failures=5)
+    result = run_workflow(path, fn_map=FN_MAP, params={"query": "q"})
+    assert result["Finish.result"] == "no answer for q"
+    assert calls["fetch"] == 2
+
+
+def test_retry_on_limits_retried_exceptions(workflow):
+    path = workflow("retry { attempts: 3, backoff: fixed, policy: fail, delay: 0s, retry_on: [ConnectionError] }",
+                    failures=1)
+    with pytest.raises(OllamaTimeout):
+        run_workflow(path, fn_map=FN_MAP, params={"query": "q"})
+    assert calls["fetch"] == 1
+
+    calls["fetch"] = 0
+    path = workflow("retry { attempts: 3, backoff: fixed, policy: fail, delay: 0s, retry_on: [OllamaTimeout] }",
+                    failures=1)
+    run_workflow(path, fn_map=FN_MAP, params={"query": "q"})
+    assert calls["fetch"] == 2
+
+
+@pytest.mark.parametrize("retry, message", [
+    ("retry { attempts: 3, backoff: linear, policy: fail }", "unknown backoff"),
+    ("retry { attempts: 3, backoff: fixed, policy: ignore }", "unknown retry policy"),
+    ("retry { attempts: 3, backoff: fixed, policy: fail, retry_on: [NoSuchError] }", "Unknown exception"),
+])
+def test_invalid_retry_config(workflow, retry, message):
+    with pytest.raises(ValueError, match=message):
+        run_workflow(workflow(retry), fn_map=FN_MAP, params={"query": "q"}, use_cache=False)
@@ -0,0 +1,114 @@
+import asyncio
+import time
+
+import pytest
+
+from awsl.grammar.workflow_parser import parse_awsl_to_objects, parse_duration
+from awsl.run_awsl_workflow import arun_workflow, overrunning_steps, run_workflow
+
+calls = []
+
+
+def slow(query: str, config: dict) -> dict:
+    calls.append(query)
+    time.sleep(config["seconds"])
+    return {"answer": query}
+
+
+async def aslow(query: str, config: dict) -> dict:
+    calls.append(query)
+    await asyncio.sleep(config["seconds"])
+    return {"answer": query}
+
+
+def timeout_workflow(call: str, seconds: int, extra: str = "") -> str:
+    return f"""workflow Timed {{
+  inputs {{
+    String query
+  }}
+  outputs {{
+    String answer = Slow.answer
+  }}
+  node Slow {{
+    call {call}
+    const {{
+      seconds: {seconds}
+    }}
+    inputs {{
+      String query = query
+    }}
+    timeout 200ms
+    {extra}
+    outputs {{
+      String answer
+    }}
+  }}
+}}
+"""
+
+
+FN_MAP = {"slow": slow, "aslow": aslow}
+
+
+@pytest.fixture
+def workflow(tmp_path):
+    calls.clear()
+
+    def write(call: str, seconds: int, extra: str = "") -> str:
+        path = tmp_path / f"{call}_{seconds}.awsl"
+        path.write_text(timeout_workflow(call, seconds, extra))
+        return str(path)
+    return write
+
+
+def test_duration_units():
+    assert parse_duration("200ms") == 0.2
+    assert parse_duration("15m") == 900
+
+
+def test_timeout_clause_is_parsed(workflow):
+    assert parse_awsl_to_objects(workflow("slow", 0)).nodes[0].timeout == "200ms"
+
+
+def test_fast_step_is_unaffected(workflow):
+    result = run_workflow(workflow("slow", 0), fn_map={"slow": FN_MAP["slow"]}, params={"query": "q"})
+    assert result["Slow.answer"] == "q"
+
+
+def test_sync_run_times_out(workflow):
+    start = time.perf_counter()
+    with pytest.raises(TimeoutError, match="Node Slow timed out after 0.2s"):
+        run_workflow(workflow("slow", 2), fn_map={"slow": FN_MAP["slow"]}, params={"query": "q"})
+    assert time.perf_counter() - start < 1.5
+
+
+@pytest.mark.parametrize("call", ["slow", "aslow"])
+def test_async_run_times_out(workflow, call):
+    start = time.perf_counter()
+    with pytest.raises(TimeoutError, match="timed out"):
+        asyncio.run(arun_workflow(workflow(call, 2), fn_map={call: FN_MAP[call]}, params={"query": "q"}))
+    assert time.perf_counter() - start < 1.5
+
+
+def test_timeouts_can_be_retried(workflow):
+    retry = "retry { attempts: 2, backoff: fixed, policy: skip, delay: 0s, retry_on: [TimeoutError] }"
+    result = asyncio.run(arun_workflow(workflow("aslow", 2, retry), fn_map=FN_MAP, params={"query": "q"}))
+    # Skipped after both attempts timed out, so no output was produced
+    assert result is None
+    assert calls == ["q", "q"]
+
+
+@pytest.mark.parametrize("run", [run_workflow, lambda *args, **kwargs: asyncio.run(arun_workflow(*args, **kwargs))])
+def test_overrunning_threads_are_counted_until_they_return(workflow, run):
+    def wait_for_overrunning_threads():
+        deadline = time.monotonic() + 5
+        while overrunning_steps() and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert overrunning_steps() == 0
+
+    # Threads of the timeout tests above may still be sleeping
+    wait_for_overrunning_threads()
+    with pytest.raises(TimeoutError, match="timed out"):
+        run(workflow("slow", 1), fn_map={"slow": FN_MAP["slow"]}, params={"query": "q"})
+    assert overrunning_steps() == 1
+    wait_for_overrunning_threads()
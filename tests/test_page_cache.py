@@ -0,0 +1,144 @@
+import sqlite3
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from components.page_cache import PAGE_NEGATIVE_CACHE_TTL, PageCache, normalize_url, query_key
+from components.page_fetcher import PageFetcher
+
+ARTICLE = "<html><body><p>" + "Cached article text that is long enough. " * 5 + "</p></body></html>"
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    requests = []
+
+    def do_GET(self):
+        self.requests.append((self.path, self.headers.get("If-None-Match")))
+        if self.path == "/missing":
+            self.reply(404, b"")
+        elif self.path == "/flaky":
+            self.reply(502, b"")
+        elif self.headers.get("If-None-Match") == '"v1"':
+            self.reply(304, b"")
+        else:
+            self.reply(200, ARTICLE.encode(), {"ETag": '"v1"'})
+
+    def reply(self, status, data, headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html")
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def site():
+    Handler.requests = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return PageCache(str(tmp_path / "pages.sqlite"))
+
+
+def test_urls_and_queries_are_normalized():
+    assert normalize_url("HTTPS://Example.com:443/a?b=2&utm_source=x&a=1#top") == "https://example.com/a?a=1&b=2"
+    assert normalize_url("http://example.com") == "http://example.com/"
+    assert normalize_url("http://example.com:8080/a") == "http://example.com:8080/a"
+    assert query_key("archive", " Deep   research ", rows=3) == query_key("archive", "deep research", rows=3)
+    assert query_key("archive", "deep research", rows=3) != query_key("archive", "deep research", rows=4)
+
+
+def test_expired_entries_are_kept_for_revalidation(cache):
+    cache.set("k", "text", ttl=-1, etag='"v1"')
+    entry = cache.get("k")
+    assert entry.value == "text" and not entry.fresh
+    assert entry.validators() == {"If-None-Match": '"v1"'}
+    assert cache.get_fresh("k") is None
+    cache.touch("k")
+    assert cache.get_fresh("k").value == "text"
+
+
+def test_least_recently_used_entries_are_evicted(cache):
+    cache.max_bytes = 250
+    for key in "abc":
+        cache.set(key, key * 99)
+    assert cache.get("a") is None
+    cache.get("b")
+    cache.set("d", "d" * 99)
+    assert cache.get("c") is None and cache.get("b") is not None
+    assert cache.size() <= 250
+
+
+def test_size_is_kept_as_a_running_total(cache):
+    cache.set("a", "a" * 99)
+    cache.set("b", "b" * 49)
+    cache.set("a", "a" * 9)
+    assert cache.size() == 10 + 50
+    cache.clear()
+    assert cache.size() == 0
+
+
+def test_running_total_starts_from_an_existing_cache(tmp_path):
+    path = str(tmp_path / "pages.sqlite")
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE page_cache (key TEXT PRIMARY KEY, value TEXT, etag TEXT, last_modified TEXT, "
+                     "expires_at REAL NOT NULL, accessed_at REAL NOT NULL, size INTEGER NOT NULL)")
+        conn.execute("INSERT INTO page_cache VALUES ('old', 'x', NULL, NULL, 0, 0, 42)")
+    conn.close()
+    cache = PageCache(path)
+    cache.set("new", "y" * 7)
+    assert cache.size() == 42 + 10
+
+
+def test_fetcher_serves_and_revalidates_cached_pages(site, cache):
+    fetcher = PageFetcher(http2=False, cache=cache)
+    try:
+        [first] = fetcher.fetch_all([f"{site}/article?utm_source=feed"])
+        [second] = fetcher.fetch_all([f"{site}/article"])
+        assert first == second and first.startswith("Cached article")
+        assert Handler.requests == [("/article?utm_source=feed", None)]
+
+        cache.set(normalize_url(f"{site}/article"), first, ttl=-1, etag='"v1"')
+        assert fetcher.fetch_all([f"{site}/article"]) == [first]
+        assert Handler.requests[-1] == ("/article", '"v1"')
+        assert cache.get_fresh(normalize_url(f"{site}/article")) is not None
+        assert fetcher.stats.counts == {"http": 2, "cache": 1}
+    finally:
+        fetcher.close()
+
+
+def test_pages_without_content_are_cached_too(site, cache):
+    fetcher = PageFetcher(http2=False, cache=cache)
+    try:
+        assert fetcher.fetch_all([f"{site}/missing"]) == [None]
+        assert fetcher.fetch_all([f"{site}/missing"]) == [None]
+        assert len(Handler.requests) == 1
+        entry = cache.get(normalize_url(f"{site}/missing"))
+        assert entry.value is None
+        assert entry.expires_at - time.time() <= PAGE_NEGATIVE_CACHE_TTL
+    finally:
+        fetcher.close()
+
+
+def test_server_errors_are_not_cached(site, cache):
+    fetcher = PageFetcher(http2=False, cache=cache)
+    try:
+        assert fetcher.fetch_all([f"{site}/flaky"]) == [None]
+        assert fetcher.fetch_all([f"{site}/flaky"]) == [None]
+        assert len(Handler.requests) == 2
+        assert cache.get(normalize_url(f"{site}/flaky")) is None
+    finally:
+        fetcher.close()
@@ -0,0 +1,101 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from components.page_fetcher import BROWSER_TIER, HTTP_TIER, PageFetcher, html_to_text
+from components.web_scraper import DomainLimiter
+
+ARTICLE = "Static article text that is long enough to keep. " * 5
+PAGES = {
+    "/article": (200, "text/html; charset=utf-8",
+                 f"<html><head><title>T</title><style>p {{}}</style></head>"
+                 f"<body><script>var x = 1;</script><p>{ARTICLE}</p></body></html>"),
+    "/app": (200, "text/html", "<html><body><div id='root'></div><script src='app.js'></script></body></html>"),
+    "/paper.pdf": (200, "application/pdf", "%PDF-1.4"),
+    "/blocked": (403, "text/html", "<html><body>Access denied</body></html>"),
+    "/missing": (404, "text/html", "<html><body>Not found</body></html>"),
+}
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        status, content_type, body = PAGES[self.path]
+        data = body.encode()
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def site():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+
+@pytest.fixture
+def fetcher():
+    browsed = []
+
+    def browser_fetch(url):
+        browsed.append(url)
+        return f"rendered {url} " * 10
+
+    fetcher = PageFetcher(browser_fetch=browser_fetch, http2=False)
+    fetcher.browsed = browsed
+    yield fetcher
+    fetcher.close()
+
+
+def test_static_pages_skip_the_browser(site, fetcher):
+    [text] = fetcher.fetch_all([f"{site}/article"])
+    assert text == " ".join(ARTICLE.split())
+    assert fetcher.browsed == []
+    assert fetcher.stats.counts == {HTTP_TIER: 1}
+
+
+def test_script_rendered_and_blocked_pages_fall_back_to_the_browser(site, fetcher):
+    texts = fetcher.fetch_all([f"{site}/app", f"{site}/blocked", f"{site}/article"])
+    assert texts[0].startswith(f"rendered {site}/app")
+    assert texts[1].startswith(f"rendered {site}/blocked")
+    assert texts[2].startswith("Static article")
+    assert fetcher.browsed == [f"{site}/app", f"{site}/blocked"]
+    summary = fetcher.stats.summary()
+    assert summary[HTTP_TIER]["count"] == 3 and summary[BROWSER_TIER]["count"] == 2
+
+
+def test_documents_and_error_pages_are_dropped(site, fetcher):
+    assert fetcher.fetch_all([f"{site}/paper.pdf", f"{site}/missing"]) == [None, None]
+    assert fetcher.browsed == []
+
+
+def test_unreachable_hosts_fall_back_to_the_browser(fetcher):
+    [text] = fetcher.fetch_all(["http://127.0.0.1:9/page"])
+    assert text.startswith("rendered")
+
+
+def test_fetches_to_the_same_host_are_spaced(site):
+    fetcher = PageFetcher(limiter=DomainLimiter(interval=0.2), http2=False)
+    try:
+        start = time.perf_counter()
+        texts = fetcher.fetch_all([f"{site}/article"] * 3)
+        assert time.perf_counter() - start >= 0.4
+        assert all(texts)
+    finally:
+        fetcher.close()
+
+
+def test_html_to_text_skips_scripts_and_separates_blocks():
+    html = "<html><head><title>x</title></head><body><h1>Title</h1><p>One</p><p>Two &amp; three</p>" \
+           "<noscript>enable js</noscript></body></html>"
+    assert html_to_text(html).split() == ["Title", "One", "Two", "&", "three"]
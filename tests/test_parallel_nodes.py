@@ -0,0 +1,77 @@
+import threading
+import time
+
+from awsl.grammar.workflow_parser import ExecutorConfig, parse_awsl_to_objects
+from awsl.run_awsl_workflow import build_pregel_graph, get_compiled_workflow, run_workflow
+from tests.fanout_steps import FN_MAP, fanout_workflow
+
+in_flight = 0
+max_in_flight = 0
+lock = threading.Lock()
+
+
+def tracked_work(seed: str, config: dict) -> dict:
+    global in_flight, max_in_flight
+    with lock:
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+    time.sleep(0.05)
+    with lock:
+        in_flight -= 1
+    return {"result": seed}
+
+
+def run_fanout(tmp_path, parallelism: int, executor: str = "thread", call: str = "tracked_work") -> dict:
+    global max_in_flight
+    max_in_flight = 0
+    path = tmp_path / f"fanout_{parallelism}_{executor}.awsl"
+    path.write_text(fanout_workflow(4, call, parallelism, executor))
+    return run_workflow(str(path), fn_map=dict(FN_MAP, tracked_work=tracked_work), params={"query": "q"})
+
+
+def test_executor_block_is_parsed(tmp_path):
+    path = tmp_path / "fanout.awsl"
+    path.write_text(fanout_workflow(2, "io_work", 2, "process"))
+    workflow = parse_awsl_to_objects(str(path))
+    assert workflow.metadata.entries["max_parallelism"] == "2"
+    assert workflow.nodes[1].executor == ExecutorConfig(type="process", max_workers=2)
+
+
+def test_max_parallelism_from_metadata(tmp_path):
+    result = run_fanout(tmp_path, 1)
+    assert result["Join.results"] == ["q"] * 4
+    assert max_in_flight == 1
+
+    run_fanout(tmp_path, 4)
+    assert max_in_flight == 4
+
+
+def test_process_executor(tmp_path):
+    result = run_fanout(tmp_path, 4, "process", "cpu_work")
+    assert len(result["Join.results"]) == 4
+
+
+def test_compiled_graph_carries_max_concurrency(tmp_path):
+    path = tmp_path / "fanout.awsl"
+    path.write_text(fanout_workflow(2, "io_work", 3, "thread"))
+    assert get_compiled_workflow(str(path), FN_MAP).config == {"max_concurrency": 3}
+
+
+def test_recompiled_graphs_share_node_pools(tmp_path):
+    from awsl import executors
+
+    executors.shutdown_executors()
+    for name in ("FanOut", "Other"):
+        path = tmp_path / f"{name}.awsl"
+        path.write_text(fanout_workflow(2, "io_work", 2, "thread", name))
+        for _ in range(3):
+            build_pregel_graph(str(path), FN_MAP)
+    # Recompiles reuse a pool, workflows with the same node names don't share one
+    assert sorted(executors._executors) == [("FanOut", "Work0", "thread", 2), ("FanOut", "Work1", "thread", 2),
+                                            ("Other", "Work0", "thread", 2), ("Other", "Work1", "thread", 2)]
+
+    executor = executors.node_executor("Pools", "Pool", "thread", 1)
+    assert executor.call(lambda x: x + 1, {"x": 1}) == 2
+    executors.shutdown_executors()
+    assert executor._executor is None
+    assert executors._executors == {}
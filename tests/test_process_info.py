@@ -33,3 +33,29 @@ def test_process_info_llm(monkeypatch):
         "answer_draft": "prev",
     })
     assert res["answer_draft"] == "from llm"
+
+
+def test_process_info_packs_distinct_relevant_chunks(monkeypatch):
+    prompts = []
+
+    class Dummy:
+        def chat(self, msgs):
+            prompts.append(msgs[0].content)
+
+            class R:
+                raw = drf.AnswerDraft(answer_draft="from llm")
+
+            return R()
+
+    page = " ".join(f"Tidal turbine {i} near the coast produced {i * 3} megawatts in year {2000 + i}."
+                    for i in range(30))
+    other = " ".join(f"Chess opening {i} was played {i * 9} times in tournament {i + 4}." for i in range(30))
+    monkeypatch.setattr(drf, "_structured_llm_draft", lambda: Dummy())
+    drf.process_info({
+        "query": "tidal energy",
+        "extended_query": "tidal turbines",
+        "chunks": [other, page, page, page + " Share this article."],
+        "answer_draft": "prev",
+    })
+    assert prompts[0].count("Tidal turbine 0 ") == 1
+    assert prompts[0].index("Tidal turbine") < prompts[0].index("Chess opening")
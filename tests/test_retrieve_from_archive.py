@@ -1,6 +1,23 @@
-import types
 import sys
+import time
+import types
+
+import pytest
+
 import steps.deepresearch_functions as drf
+from components.page_cache import PageCache
+
+
+@pytest.fixture(autouse=True)
+def cache(monkeypatch, tmp_path):
+    cache = PageCache(str(tmp_path / "pages.sqlite"))
+    monkeypatch.setattr(drf, "page_cache", cache)
+    return cache
+
+
+def use_session(monkeypatch, get):
+    monkeypatch.setattr(drf, "_archive_session", lambda: types.SimpleNamespace(get=get))
+
 
 class DummyResp:
     def __init__(self, data):
@@ -19,7 +36,7 @@ def test_retrieve_from_archive(monkeypatch):
             {"title": "T2", "description": ""}
         ]}})
 
-    monkeypatch.setitem(sys.modules, "requests", types.SimpleNamespace(get=dummy_get))
+    use_session(monkeypatch, dummy_get)
     result = drf.retrieve_from_archive({"extended_query": "hello", "top_k": 2})
     assert result["chunks"] == ["T1 D1", "T2"]
 
@@ -28,6 +45,76 @@ def test_retrieve_from_archive_fallback(monkeypatch):
     def bad_get(*args, **kwargs):
         raise RuntimeError("fail")
 
-    monkeypatch.setitem(sys.modules, "requests", types.SimpleNamespace(get=bad_get))
+    use_session(monkeypatch, bad_get)
     result = drf.retrieve_from_archive({"extended_query": "oops"})
     assert result["chunks"] == ["chunk for oops"]
+
+
+def test_retrieve_from_archive_is_cached(monkeypatch, cache):
+    calls = []
+
+    def dummy_get(url, params=None, timeout=10):
+        calls.append(params["q"])
+        return DummyResp({"response": {"docs": [{"title": "T1", "description": "D1"}]}})
+
+    use_session(monkeypatch, dummy_get)
+    first = drf.retrieve_from_archive({"extended_query": "Deep  Research", "top_k": 2})
+    second = drf.retrieve_from_archive({"extended_query": "deep research", "top_k": 2})
+    assert first == second == {"chunks": ["T1 D1"]}
+    assert calls == ["Deep  Research"]
+    drf.retrieve_from_archive({"extended_query": "deep research", "top_k": 3})
+    assert len(calls) == 2
+
+
+def test_failed_archive_searches_are_not_cached(monkeypatch, cache):
+    def bad_get(*args, **kwargs):
+        raise RuntimeError("fail")
+
+    use_session(monkeypatch, bad_get)
+    drf.retrieve_from_archive({"extended_query": "oops"})
+    assert len(cache) == 0
+
+
+def test_query_variants_are_searched_concurrently_and_merged(monkeypatch):
+    docs = {
+        "extended": [{"title": "A"}, {"title": "B"}],
+        "next": [{"title": "C"}, {"title": "A"}],
+        "original": [{"title": "D"}],
+    }
+
+    def slow_get(url, params=None, timeout=10):
+        time.sleep(0.2)
+        return DummyResp({"response": {"docs": docs[params["q"]]}})
+
+    use_session(monkeypatch, slow_get)
+    start = time.perf_counter()
+    result = drf.retrieve_from_archive({"extended_query": "extended", "next_query": "next", "query": "original"})
+    assert time.perf_counter() - start < 0.4
+    assert result["chunks"] == ["A", "C", "D", "B"]
+
+
+def test_failed_variants_are_skipped(monkeypatch):
+    def flaky_get(url, params=None, timeout=10):
+        if params["q"] == "original":
+            raise RuntimeError("fail")
+        return DummyResp({"response": {"docs": [{"title": params["q"]}]}})
+
+    use_session(monkeypatch, flaky_get)
+    result = drf.retrieve_from_archive({"extended_query": "extended", "next_query": "", "query": "original"})
+    assert result["chunks"] == ["extended"]
+
+
+def test_archive_session_pools_and_retries(monkeypatch):
+    drf._archive_session.cache_clear()
+    try:
+        session = drf._archive_session()
+        assert drf._archive_session() is session
+        adapter = session.get_adapter(drf.ARCHIVE_SEARCH_URL)
+        assert adapter.max_retries.total == 3 and adapter.max_retries.backoff_factor > 0
+        assert 503 in adapter.max_retries.status_forcelist
+
+        drf._archive_session.cache_clear()
+        monkeypatch.setitem(sys.modules, "requests", None)
+        assert drf.retrieve_from_archive({"extended_query": "offline"}) == {"chunks": ["chunk for offline"]}
+    finally:
+        drf._archive_session.cache_clear()
@@ -0,0 +1,168 @@
+import os
+import sys
+
+import pytest
+
+from backend.workflow_loader import TemplateRegistry, functions_module
+
+TEMPLATE = """workflow Greeter {
+  metadata {
+    description: "Says hello"
+  }
+  inputs {
+    String name
+    Int times = 1
+    %s
+  }
+  outputs {
+    String greeting = Greet.greeting
+  }
+  node Greet {
+    call greet
+    inputs {
+      String name = name
+    }
+    outputs {
+      String greeting
+    }
+  }
+}
+"""
+
+
+def write(path, extra_input: str = "", mtime_ns: int | None = None):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(TEMPLATE % extra_input)
+    if mtime_ns is not None:
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+@pytest.fixture
+def registry(tmp_path):
+    write(tmp_path / "greeter" / "greeter.awsl", mtime_ns=1_000_000_000)
+    return TemplateRegistry(tmp_path, refresh_interval=3600)
+
+
+def test_templates_are_parsed_once(registry, tmp_path):
+    [template] = registry.list()
+    assert template["id"] == template["name"] == "greeter"
+    assert template["path"] == str(tmp_path / "greeter" / "greeter.awsl")
+    assert template["workflow"] == "Greeter"
+    assert template["metadata"] == {"description": "Says hello"}
+    assert template["inputs"] == [
+        {"name": "name", "type": "String", "optional": False, "default": None},
+        {"name": "times", "type": "Int", "optional": False, "default": 1},
+    ]
+    assert template["outputs"] == [{"name": "greeting", "type": "String", "optional": False}]
+
+    assert registry.get("greeter")["hash"] == template["hash"]
+    registry.list()
+    assert registry.parses == 1
+
+
+def test_refresh_reparses_only_modified_files(registry, tmp_path):
+    path = tmp_path / "greeter" / "greeter.awsl"
+    registry.list()
+
+    # Touched without changes: the content hash matches, so nothing is parsed
+    os.utime(path, ns=(2_000_000_000, 2_000_000_000))
+    registry.refresh()
+    assert registry.parses == 1
+
+    write(path, "String title?", mtime_ns=3_000_000_000)
+    registry.refresh()
+    assert registry.parses == 2
+    assert [param["name"] for param in registry.get("greeter")["inputs"]] == ["name", "times", "title"]
+
+    path.unlink()
+    registry.refresh()
+    assert registry.list() == []
+
+
+def test_new_template_is_found_before_the_next_scan(registry, tmp_path):
+    registry.list()
+    write(tmp_path / "other" / "other.awsl")
+    assert [t["id"] for t in registry.list()] == ["greeter"]
+    assert registry.get("other")["workflow"] == "Greeter"
+    assert registry.get("missing") is None
+
+
+def test_broken_template_is_still_listed(tmp_path):
+    (tmp_path / "broken.awsl").write_text("workflow {")
+    registry = TemplateRegistry(tmp_path)
+    assert registry.get("broken")["inputs"] == []
+
+
+STEPS = """import os
+
+
+class GreetingFailed(Exception):
+    pass
+
+
+def greet(name: str, config: dict) -> dict:
+    return {"greeting": f"hello {name}"}
+
+
+def unused_helper() -> None:
+    pass
+"""
+
+
+@pytest.fixture
+def package(tmp_path, monkeypatch):
+    """Templates root inside an importable package named after the test"""
+    root = tmp_path / f"templates_{tmp_path.name}"
+    monkeypatch.syspath_prepend(str(tmp_path))
+    yield root
+    for name in [name for name in sys.modules if name.startswith(root.name)]:
+        del sys.modules[name]
+
+
+def test_functions_module_is_relative_to_the_templates_package(tmp_path):
+    root = tmp_path / "workflow_definitions"
+    assert functions_module(root / "paper" / "paper.awsl", root) == "workflow_definitions.paper.paper"
+
+
+def test_functions_are_resolved_once_with_only_called_names(package):
+    write(package / "greeter" / "greeter.awsl")
+    (package / "greeter" / "greeter.py").write_text(STEPS)
+    registry = TemplateRegistry(package)
+
+    functions = registry.functions("greeter")
+    assert list(functions) == ["greet"]
+    assert functions["greet"]("you", {}) == {"greeting": "hello you"}
+    assert registry.functions("greeter") is functions
+
+
+def test_retry_on_exceptions_are_resolved(package):
+    write(package / "greeter" / "greeter.awsl")
+    template = (package / "greeter" / "greeter.awsl").read_text()
+    (package / "greeter" / "greeter.awsl").write_text(template.replace(
+        "    call greet\n", "    call greet\n    retry { attempts: 2, backoff: fixed, policy: fail, "
+                            "retry_on: [GreetingFailed, ConnectionError] }\n"))
+    (package / "greeter" / "greeter.py").write_text(STEPS)
+    assert sorted(TemplateRegistry(package).functions("greeter")) == ["GreetingFailed", "greet"]
+
+
+def test_missing_functions_fail_at_load(package):
+    write(package / "greeter" / "greeter.awsl")
+    (package / "greeter" / "greeter.py").write_text(STEPS.replace("def greet(", "def salute("))
+    with pytest.raises(ValueError, match="greet not found in"):
+        TemplateRegistry(package).functions("greeter")
+
+
+def test_functions_reparse_a_template_that_failed_to_load(package, monkeypatch):
+    from backend import workflow_loader
+
+    write(package / "greeter" / "greeter.awsl")
+    (package / "greeter" / "greeter.py").write_text(STEPS)
+    parse = workflow_loader.parse_awsl_to_objects
+    # e.g. read while the file was still being written
+    monkeypatch.setattr(workflow_loader, "parse_awsl_to_objects", lambda path: 1 / 0)
+    registry = TemplateRegistry(package)
+    assert registry.get("greeter")["inputs"] == []
+
+    monkeypatch.setattr(workflow_loader, "parse_awsl_to_objects", parse)
+    assert list(registry.functions("greeter")) == ["greet"]
+    assert registry.get("greeter")["workflow"] == "Greeter"
@@ -0,0 +1,151 @@
+import threading
+import time
+
+import httpx
+import pytest
+from selenium.common.exceptions import WebDriverException
+
+from components import web_scraper
+from components.page_cache import PageCache
+from components.page_fetcher import PageFetcher
+from components.web_scraper import BrowserPool, DomainLimiter
+
+PAGE_TEXT = "substantial page content " * 10
+
+
+class FakeElement:
+    def __init__(self, href=None, text=""):
+        self.href = href
+        self.text = text
+
+    def get_attribute(self, name):
+        return self.href
+
+
+class FakeDriver:
+    def __init__(self, links, load_seconds=0.0):
+        self.links = links
+        self.load_seconds = load_seconds
+        self.url = None
+        self.dead = False
+        self.quit_called = False
+
+    @property
+    def current_url(self):
+        if self.dead:
+            raise WebDriverException("browser died")
+        return self.url
+
+    def get(self, url):
+        time.sleep(self.load_seconds)
+        self.url = url
+
+    def find_elements(self, by, value):
+        return [FakeElement(href=link) for link in self.links]
+
+    def find_element(self, by, value):
+        return FakeElement(text=f"{self.url} {PAGE_TEXT}")
+
+    def quit(self):
+        self.quit_called = True
+
+
+@pytest.fixture
+def scraper(monkeypatch):
+    drivers = []
+    fetchers = []
+
+    def install(size=2, max_pages=50, links=(), load_seconds=0.0, interval=0.0, cache=None):
+        def factory():
+            drivers.append(FakeDriver(list(links), load_seconds))
+            return drivers[-1]
+        monkeypatch.setattr(web_scraper, "browser_pool", BrowserPool(size, max_pages, factory))
+        monkeypatch.setattr(web_scraper, "domain_limiter", DomainLimiter(interval))
+        monkeypatch.setattr(web_scraper, "SEARCH_RESULTS_TIMEOUT", 0.05)
+        # Every page is behind a bot wall, so all of them go to the browsers
+        fetcher = PageFetcher(browser_fetch=web_scraper.fetch_page_text,
+                              transport=httpx.MockTransport(lambda request: httpx.Response(503)),
+                              cache=cache)
+        monkeypatch.setattr(web_scraper, "page_fetcher", fetcher)
+        monkeypatch.setattr(web_scraper, "page_cache", cache)
+        fetchers.append(fetcher)
+        return drivers
+    yield install
+    for fetcher in fetchers:
+        fetcher.close()
+
+
+def test_browsers_are_reused_across_scrapes(scraper):
+    drivers = scraper(size=1, links=["https://a.example/1", "https://b.example/2"])
+    first = web_scraper.search_and_scrape("q", top_k=2, base_url="https://search.example")
+    second = web_scraper.search_and_scrape("q", top_k=2, base_url="https://search.example")
+    assert len(first["chunks"]) == len(second["chunks"]) == 2
+    assert first["chunks"][0].startswith("https://a.example/1")
+    assert len(drivers) == 1
+
+
+def test_browsers_are_recycled_after_max_pages():
+    drivers = []
+    pool = BrowserPool(size=1, max_pages=2, factory=lambda: drivers.append(FakeDriver([])) or drivers[-1])
+    for _ in range(3):
+        with pool.driver() as driver:
+            driver.get("https://a.example")
+    assert len(drivers) == 2
+    assert drivers[0].quit_called and not drivers[1].quit_called
+
+
+def test_dead_browsers_are_replaced():
+    drivers = []
+    pool = BrowserPool(size=1, factory=lambda: drivers.append(FakeDriver([])) or drivers[-1])
+    with pool.driver():
+        pass
+    drivers[0].dead = True
+    with pool.driver() as driver:
+        assert driver is drivers[1]
+    with pytest.raises(WebDriverException):
+        with pool.driver() as driver:
+            driver.dead = True
+            raise WebDriverException("tab crashed")
+    assert pool.started == 2 and drivers[1].quit_called
+
+
+def test_domain_limiter_spaces_only_the_same_host():
+    limiter = DomainLimiter(interval=0.1)
+    starts = {}
+
+    def load(url):
+        limiter.wait(url)
+        starts.setdefault(url.split("/")[2], []).append(time.monotonic())
+
+    threads = [threading.Thread(target=load, args=(url,))
+               for url in ["https://a.example/1", "https://a.example/2", "https://a.example/3", "https://b.example/1"]]
+    begin = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    a = sorted(starts["a.example"])
+    assert all(later - earlier >= 0.09 for earlier, later in zip(a, a[1:]))
+    assert starts["b.example"][0] - begin < 0.05
+
+
+def test_pages_load_concurrently(scraper):
+    links = [f"https://site{i}.example/page" for i in range(3)]
+    scraper(size=3, links=links, load_seconds=0.2)
+    start = time.perf_counter()
+    result = web_scraper.search_and_scrape("q", top_k=3, base_url="https://search.example")
+    # The search plus one round of three parallel page loads
+    assert time.perf_counter() - start < 0.7
+    assert len(result["chunks"]) == 3
+
+
+def test_repeated_searches_are_served_from_the_page_cache(scraper, tmp_path):
+    cache = PageCache(str(tmp_path / "pages.sqlite"))
+    drivers = scraper(size=1, links=["https://a.example/1", "https://b.example/2"], cache=cache)
+    first = web_scraper.search_and_scrape("q", top_k=2, base_url="https://search.example")
+    loaded = drivers[0].url
+    second = web_scraper.search_and_scrape("Q ", top_k=2, base_url="https://search.example")
+    assert first == second and len(first["chunks"]) == 2
+    # Neither the search page nor the result pages were loaded again
+    assert drivers[0].url == loaded
+    assert web_scraper.page_fetcher.stats.counts["cache"] == 2
@@ -0,0 +1,242 @@
+import asyncio
+import time
+
+from worker.worker_pool import JobSignal
+
+
+def test_signal_wakes_idle_worker():
+    async def scenario():
+        signal = JobSignal()
+        loop = asyncio.get_running_loop()
+        loop.call_later(0.05, signal.notify)
+        start = time.perf_counter()
+        await signal.wait(5)
+        return time.perf_counter() - start
+
+    assert asyncio.run(scenario()) < 1
+
+
+def test_signal_set_before_wait_is_not_lost():
+    async def scenario():
+        signal = JobSignal()
+        signal.notify()
+        start = time.perf_counter()
+        await signal.wait(5)
+        return time.perf_counter() - start
+
+    assert asyncio.run(scenario()) < 1
+
+
+def test_signal_falls_back_to_timeout():
+    async def scenario():
+        signal = JobSignal()
+        start = time.perf_counter()
+        await signal.wait(0.05)
+        return time.perf_counter() - start
+
+    assert asyncio.run(scenario()) >= 0.05
+
+
+def test_claimer_claims_for_idle_workers_and_releases_unstarted(monkeypatch):
+    from worker import worker_pool
+
+    queued = [{"id": f"job-{i}"} for i in range(5)]
+    limits = []
+    released = []
+
+    async def fake_claim_jobs(pool, worker_id, limit):
+        limits.append(limit)
+        claimed, queued[:] = queued[:limit], queued[limit:]
+        return claimed
+
+    async def fake_release_jobs(pool, worker_id, job_ids):
+        released.extend((worker_id, job_id) for job_id in job_ids)
+
+    monkeypatch.setattr(worker_pool, "claim_jobs", fake_claim_jobs)
+    monkeypatch.setattr(worker_pool, "release_jobs", fake_release_jobs)
+    monkeypatch.setattr(worker_pool, "POLL_INTERVAL", 0.01)
+
+    async def scenario():
+        claimer = worker_pool.JobClaimer(None, "test", JobSignal(), batch_size=3, buffer_size=3, prefetch=1)
+        task = asyncio.create_task(claimer.run())
+        # With every worker busy only the prefetch is claimed, not a full buffer other processes could run
+        await asyncio.sleep(0.05)
+        assert limits == [1]
+        first = await claimer.next_job()
+        await asyncio.sleep(0.05)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        await claimer.release_unstarted()
+        return first, claimer.metrics
+
+    first, metrics = asyncio.run(scenario())
+    assert first["id"] == "job-0"
+    # The worker took the prefetched job, so one more is prefetched
+    assert limits == [1, 1]
+    assert released == [("test", "job-1")]
+    assert metrics.jobs_claimed == 2
+    assert metrics.max_queue_depth == 1
+
+
+def test_cancel_aborts_in_flight_run_and_frees_the_worker(monkeypatch):
+    from worker import worker_pool
+
+    states = []
+
+    async def fake_run_awsl(job, checkpoints, on_node=None):
+        await asyncio.sleep(0 if job["id"] == "quick" else 30)
+        return "succeeded", {}
+
+    async def fake_set_state(pool, job_id, new_state, result=None, error=None, worker_id=None):
+        states.append((job_id, new_state))
+
+    async def fake_start_job(pool, job_id, worker_id):
+        states.append((job_id, "running"))
+        return job_id != "canceled-in-db"
+
+    monkeypatch.setattr(worker_pool, "run_awsl", fake_run_awsl)
+    monkeypatch.setattr(worker_pool, "set_state", fake_set_state)
+    monkeypatch.setattr(worker_pool, "start_job", fake_start_job)
+
+    async def scenario():
+        claimer = worker_pool.JobClaimer(None, "test", JobSignal(), buffer_size=4)
+        running = worker_pool.RunningJobs()
+        for job_id in ("slow", "never-started", "canceled-in-db", "quick"):
+            claimer.jobs.put_nowait({"id": job_id})
+        running.cancel("never-started")
+        task = asyncio.create_task(worker_pool.worker(None, claimer, None, running))
+        await asyncio.sleep(0.05)
+        assert len(running) == 1
+        running.on_cancel(None, 0, "workflow_cancel", "slow")
+        await asyncio.sleep(0.05)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        return running
+
+    start = time.perf_counter()
+    running = asyncio.run(scenario())
+    assert time.perf_counter() - start < 5
+    assert states == [("slow", "running"), ("never-started", "running"), ("canceled-in-db", "running"),
+                      ("quick", "running"), ("quick", "succeeded")]
+    assert len(running) == 0
+
+
+def test_heartbeat_aborts_jobs_the_worker_lost(monkeypatch):
+    from worker import worker_pool
+
+    beats = []
+
+    async def fake_heartbeat_jobs(pool, worker_id, job_ids):
+        beats.append(sorted(job_ids))
+        return ["lost-running", "lost-buffered"]
+
+    monkeypatch.setattr(worker_pool, "heartbeat_jobs", fake_heartbeat_jobs)
+    monkeypatch.setattr(worker_pool, "HEARTBEAT_INTERVAL", 0.01)
+
+    async def scenario():
+        claimer = worker_pool.JobClaimer(None, "test", JobSignal())
+        claimer.pending.add("lost-buffered")
+        running = worker_pool.RunningJobs()
+        runs = [running.start(job_id, lambda: asyncio.sleep(30)) for job_id in ("lost-running", "alive")]
+        task = asyncio.create_task(worker_pool.heartbeat(None, claimer, running))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        lost, alive = runs
+        outcome = lost.cancelled(), alive.done(), running.was_canceled("lost-buffered")
+        alive.cancel()
+        return outcome
+
+    assert asyncio.run(scenario()) == (True, False, True)
+    assert beats[0] == ["alive", "lost-buffered", "lost-running"]
+
+
+def test_reaper_wakes_workers_for_requeued_runs(monkeypatch):
+    from worker import worker_pool
+
+    async def fake_reap_stale_jobs(pool, stale_after):
+        return [{"id": "job-1", "state": "queued", "attempt": 1}]
+
+    monkeypatch.setattr(worker_pool, "reap_stale_jobs", fake_reap_stale_jobs)
+
+    async def scenario():
+        signal = JobSignal()
+        task = asyncio.create_task(worker_pool.reaper(None, signal))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        start = time.perf_counter()
+        await signal.wait(5)
+        return time.perf_counter() - start
+
+    assert asyncio.run(scenario()) < 1
+
+
+def test_listener_reconnects_after_the_connection_drops(monkeypatch):
+    from backend import notifications
+    from worker import worker_pool
+
+    connections = []
+
+    class FakeConnection:
+        def __init__(self):
+            self.on_close = []
+            self.channels = []
+            self.closed = False
+
+        def add_termination_listener(self, callback):
+            self.on_close.append(callback)
+
+        async def add_listener(self, channel, callback):
+            self.channels.append(channel)
+
+        def drop(self):
+            self.closed = True
+            for callback in self.on_close:
+                callback(self)
+
+        async def close(self, timeout=None):
+            self.closed = True
+
+    async def fake_connect(dsn=None):
+        connections.append(FakeConnection())
+        return connections[-1]
+
+    monkeypatch.setattr(notifications.asyncpg, "connect", fake_connect)
+
+    async def scenario():
+        signal = JobSignal()
+        task = asyncio.create_task(worker_pool.listen_for_jobs(None, signal, worker_pool.RunningJobs()))
+        await asyncio.sleep(0.01)
+        await signal.wait(0)
+        connections[0].drop()
+        await asyncio.sleep(0.01)
+        start = time.perf_counter()
+        # The new connection wakes the claimer for jobs queued while LISTEN was down
+        await signal.wait(5)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        return time.perf_counter() - start
+
+    assert asyncio.run(scenario()) < 1
+    assert len(connections) == 2
+    assert connections[1].channels == ["workflow_jobs", "workflow_cancel"]
+    assert all(conn.closed for conn in connections)
+
+
+def test_claim_metrics_are_logged(monkeypatch, caplog):
+    from worker import worker_pool
+
+    monkeypatch.setattr(worker_pool, "METRICS_INTERVAL", 0.01)
+
+    async def scenario():
+        claimer = worker_pool.JobClaimer(None, "test", JobSignal())
+        claimer.metrics.record(0.002, 3, 1)
+        task = asyncio.create_task(worker_pool.report_claims(claimer))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    with caplog.at_level("INFO", logger="worker.worker_pool"):
+        asyncio.run(scenario())
+    assert "Claims: 1 round trips, 3 jobs, avg 2.0ms, last 2.0ms; buffer depth 1 (max 1)" in caplog.text
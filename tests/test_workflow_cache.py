@@ -0,0 +1,77 @@
+import shutil
+
+from awsl.run_awsl_workflow import get_compiled_workflow, run_workflow
+from awsl.workflow_cache import CompiledWorkflowCache, compiled_workflows
+from tests.test_simple_awsl_runner import AWSL_PATH, FN_MAP
+
+
+def test_compiled_workflow_is_reused():
+    compiled_workflows.clear()
+    first = get_compiled_workflow(AWSL_PATH, dict(FN_MAP))
+    second = get_compiled_workflow(AWSL_PATH, dict(FN_MAP))
+    assert first is second
+    assert compiled_workflows.hits == 1
+    assert compiled_workflows.misses == 1
+
+    result = run_workflow(AWSL_PATH, fn_map=FN_MAP, params={"query": "hello"})
+    assert result.get("FinalAnswer.final_answer") == "final answer from chunks"
+    assert compiled_workflows.misses == 1
+
+
+def test_different_functions_are_not_shared():
+    compiled_workflows.clear()
+    first = get_compiled_workflow(AWSL_PATH, FN_MAP)
+    other = dict(FN_MAP, query_extender=lambda query, config: {"extended_query": "other"})
+    assert get_compiled_workflow(AWSL_PATH, other) is not first
+
+
+def test_changed_file_is_rebuilt(tmp_path):
+    path = tmp_path / "sample.awsl"
+    shutil.copy(AWSL_PATH, path)
+    cache = CompiledWorkflowCache()
+    builds = []
+
+    def builder():
+        builds.append(path.read_text())
+        return object()
+
+    first = cache.get_or_build(str(path), FN_MAP, builder)
+    assert cache.get_or_build(str(path), FN_MAP, builder) is first
+
+    path.write_text(path.read_text().replace("Sample RAG workflow", "Changed RAG workflow"))
+    assert cache.get_or_build(str(path), FN_MAP, builder) is not first
+    assert len(builds) == 2
+
+
+def test_lru_eviction(tmp_path):
+    cache = CompiledWorkflowCache(maxsize=2)
+    paths = []
+    for i in range(3):
+        path = tmp_path / f"wf{i}.awsl"
+        path.write_text(f"workflow W{i} {{}}")
+        paths.append(str(path))
+
+    first = cache.get_or_build(paths[0], {}, object)
+    cache.get_or_build(paths[1], {}, object)
+    cache.get_or_build(paths[2], {}, object)
+    assert len(cache) == 2
+    assert cache.get_or_build(paths[0], {}, object) is not first
+
+
+def test_checkpointer_is_bound_per_run():
+    from langgraph.checkpoint.memory import InMemorySaver
+
+    compiled_workflows.clear()
+    saver = InMemorySaver()
+    result = run_workflow(AWSL_PATH, fn_map=FN_MAP, params={"query": "hello"}, thread_id="t1", checkpointer=saver)
+    assert result.get("FinalAnswer.final_answer") == "final answer from chunks"
+    assert list(saver.list({"configurable": {"thread_id": "t1"}}))
+    assert get_compiled_workflow(AWSL_PATH, FN_MAP).checkpointer is None
+
+
+def test_debug_is_bound_per_run(capsys):
+    compiled_workflows.clear()
+    result = run_workflow(AWSL_PATH, fn_map=FN_MAP, params={"query": "hello"}, debug=True)
+    assert result.get("FinalAnswer.final_answer") == "final answer from chunks"
+    assert "[updates]" in capsys.readouterr().out
+    assert not get_compiled_workflow(AWSL_PATH, FN_MAP).debug
@@ -1,31 +1,60 @@
 import os
 import json
-import asyncio
-from typing import Any, Dict
-from pathlib import Path
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict
 
 import asyncpg
-from langgraph.checkpoint.postgres import PostgresSaver
+from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
+from psycopg.rows import dict_row
+from psycopg_pool import AsyncConnectionPool
 
-from awsl.run_awsl_workflow import run_workflow
-from backend.workflow_loader import get_template
+from awsl.run_awsl_workflow import arun_workflow
+from backend.notifications import EVENTS_CHANNEL, JOBS_CHANNEL, node_event, state_event
+from backend.workflow_loader import get_template, get_template_functions
 
-async def claim_job(pool: asyncpg.pool.Pool, worker_id: str) -> Dict[str, Any] | None:
-    async with pool.acquire() as conn, conn.transaction():
-        row = await conn.fetchrow(
+# Checkpoint connections shared by all jobs of the worker process, one per concurrent job by default
+CHECKPOINTER_POOL_SIZE = int(os.getenv("CHECKPOINTER_POOL_SIZE", os.getenv("WORKERS", 4)))
+
+@asynccontextmanager
+async def checkpointer_pool(conn_string: str | None,
+                            max_size: int = CHECKPOINTER_POOL_SIZE) -> AsyncIterator[AsyncConnectionPool]:
+    """Open the checkpoint connection pool and run the checkpointer migrations once"""
+    async with AsyncConnectionPool(
+        conn_string,
+        min_size=1,
+        max_size=max_size,
+        kwargs={"autocommit": True, "prepare_threshold": 0, "row_factory": dict_row},
+    ) as pool:
+        await AsyncPostgresSaver(pool).setup()
+        yield pool
+
+async def publish_events(conn: asyncpg.Connection, payloads: list[str]) -> None:
+    """NOTIFY run events; inside a transaction they are delivered when it commits"""
+    if payloads:
+        await conn.executemany("SELECT pg_notify($1, $2)", [(EVENTS_CHANNEL, payload) for payload in payloads])
+
+async def publish_node(pool: asyncpg.pool.Pool, job_id: str, node: str) -> None:
+    await pool.execute("SELECT pg_notify($1, $2)", EVENTS_CHANNEL, node_event(job_id, node))
+
+async def claim_jobs(pool: asyncpg.pool.Pool, worker_id: str, limit: int) -> list[Dict[str, Any]]:
+    """Claim up to `limit` queued jobs in a single statement, highest priority first then FIFO.
+
+    Claimed jobs wait in the worker's buffer; they only become 'running' in start_job.
+    """
+    async with pool.acquire() as conn:
+        rows = await conn.fetch(
             """
             WITH next AS (
                 SELECT id
                 FROM workflow_runs
                 WHERE state = 'queued'
-                ORDER BY id
-                LIMIT 1
+                ORDER BY priority DESC, created_at, id
+                LIMIT $2
                 FOR UPDATE SKIP LOCKED
             )
             UPDATE workflow_runs
-            SET state='running',
+            SET state = 'claimed',
                 worker_id = $1,
-                started_at = now(),
                 heartbeat_at = now(),
                 attempt = attempt + 1
             FROM next
@@ -33,8 +62,100 @@ async def claim_job(pool: asyncpg.pool.Pool, worker_id: str) -> Dict[str, Any] |
             RETURNING workflow_runs.*;
             """,
             worker_id,
+            limit,
+        )
+    return [dict(row) for row in rows]
+
+async def start_job(pool: asyncpg.pool.Pool, job_id: str, worker_id: str) -> bool:
+    """Mark a claimed job running once a worker picks it up; False if it was canceled or reassigned.
+
+    The resume payload is consumed here: the worker already holds it in the claimed row, and a
+    re-claim after a crash continues from the checkpoint instead of replaying the old answer.
+    """
+    async with pool.acquire() as conn, conn.transaction():
+        started = await conn.fetchval(
+            """
+            UPDATE workflow_runs
+            SET state = 'running',
+                started_at = now(),
+                heartbeat_at = now(),
+                resume_payload = NULL
+            WHERE id = $1 AND worker_id = $2 AND state = 'claimed'
+            RETURNING id
+            """,
+            job_id,
+            worker_id,
         )
-    return dict(row) if row else None
+        if started is not None:
+            await publish_events(conn, [state_event(job_id, "running")])
+    return started is not None
+
+async def release_jobs(pool: asyncpg.pool.Pool, worker_id: str, job_ids: list[str]) -> None:
+    """Return the worker's claimed but unstarted jobs to the queue without counting the attempt"""
+    if not job_ids:
+        return
+    async with pool.acquire() as conn, conn.transaction():
+        rows = await conn.fetch(
+            """
+            UPDATE workflow_runs
+            SET state = 'queued',
+                worker_id = NULL,
+                attempt = GREATEST(attempt - 1, 0)
+            WHERE id = ANY($1::text[]) AND worker_id = $2 AND state = 'claimed'
+            RETURNING id
+            """,
+            job_ids,
+            worker_id,
+        )
+        if rows:
+            await conn.execute("SELECT pg_notify($1, '')", JOBS_CHANNEL)
+
+async def heartbeat_jobs(pool: asyncpg.pool.Pool, worker_id: str, job_ids: list[str]) -> list[str]:
+    """Refresh heartbeat_at of the worker's jobs and return the ids it no longer owns"""
+    if not job_ids:
+        return []
+    async with pool.acquire() as conn:
+        rows = await conn.fetch(
+            """
+            UPDATE workflow_runs
+            SET heartbeat_at = now()
+            WHERE id = ANY($1::text[]) AND worker_id = $2 AND state IN ('claimed', 'running')
+            RETURNING id
+            """,
+            job_ids,
+            worker_id,
+        )
+    alive = {row["id"] for row in rows}
+    return [job_id for job_id in job_ids if job_id not in alive]
+
+async def reap_stale_jobs(pool: asyncpg.pool.Pool, stale_after: float) -> list[Dict[str, Any]]:
+    """Requeue claimed or running jobs whose worker stopped heartbeating, or fail them once out of attempts"""
+    async with pool.acquire() as conn, conn.transaction():
+        rows = await conn.fetch(
+            """
+            WITH stale AS (
+                SELECT id
+                FROM workflow_runs
+                WHERE state IN ('claimed', 'running') AND heartbeat_at < now() - make_interval(secs => $1)
+                FOR UPDATE SKIP LOCKED
+            )
+            UPDATE workflow_runs
+            SET state = CASE WHEN attempt >= max_attempts THEN 'failed' ELSE 'queued' END,
+                error = CASE WHEN attempt >= max_attempts
+                             THEN 'Worker stopped responding on attempt ' || attempt || ' of ' || max_attempts
+                             ELSE error END,
+                finished_at = CASE WHEN attempt >= max_attempts THEN now() END,
+                worker_id = NULL
+            FROM stale
+            WHERE workflow_runs.id = stale.id
+            RETURNING workflow_runs.id, workflow_runs.state, workflow_runs.attempt
+            """,
+            stale_after,
+        )
+        if any(row["state"] == "queued" for row in rows):
+            await conn.execute("SELECT pg_notify($1, '')", JOBS_CHANNEL)
+        await publish_events(conn, [state_event(row["id"], row["state"]) for row in rows])
+    return [dict(row) for row in rows]
 
 async def set_state(
     pool: asyncpg.pool.Pool,
@@ -42,14 +163,16 @@ async def set_state(
     new_state: str,
     result: Dict[str, Any] | None = None,
     error: str | None = None,
+    worker_id: str | None = None,
 ) -> None:
-    async with pool.acquire() as conn:
+    """Store the outcome of a job; with worker_id only while that worker still owns it"""
+    async with pool.acquire() as conn, conn.transaction():
         try:
             res_str = json.dumps(result) if result is not None else "{}"
         except Exception as _:
             res_str = "{}"
         
-        await conn.execute(
+        updated = await conn.fetchval(
             """
             UPDATE workflow_runs
             SET state = $2::VARCHAR,
@@ -57,15 +180,21 @@ async def set_state(
                 finished_at = CASE WHEN $2::VARCHAR IN ('succeeded','failed','canceled') THEN now() END,
                 error = $3,
                 result = COALESCE($4, result)
-            WHERE id = $1 AND state != 'canceled'
+            WHERE id = $1 AND state != 'canceled' AND ($5::text IS NULL OR worker_id = $5)
+            RETURNING id
             """,
             job_id,
             new_state,
             error,
             res_str,
+            worker_id,
         )
+        if updated is not None:
+            await publish_events(conn, [state_event(job_id, new_state)])
 
-async def run_awsl(job: Dict[str, Any]) -> tuple[str, Dict[str, Any]]:
+async def run_awsl(job: Dict[str, Any],
+                   checkpoints: AsyncConnectionPool,
+                   on_node: Callable[[str], Awaitable[None]] | None = None) -> tuple[str, Dict[str, Any]]:
     tpl = get_template(job["graph_name"])
     if not tpl:
         raise ValueError("Template not found")
@@ -73,40 +202,22 @@ async def run_awsl(job: Dict[str, Any]) -> tuple[str, Dict[str, Any]]:
     resume = job.get("resume_payload")
     if resume:
         params = None
-    # Convert absolute path to relative module path
-    workflow_path = tpl["path"]
-    # Convert path to module name for import
-    # workflow_path is something like /path/to/workflow_definitions/paper_rename_workflow/paper_rename_workflow.awsl
-    # We need to extract the module path: workflow_definitions.paper_rename_workflow.paper_rename_workflow
-    
-    # First, get the path relative to the project root
-    try:
-        # Try to find workflow_definitions in the path
-        path_parts = Path(workflow_path).parts
-        wf_idx = path_parts.index("workflow_definitions")
-        # Get parts from workflow_definitions onwards
-        module_parts = path_parts[wf_idx:]
-        # Remove .awsl extension from the last part
-        if module_parts[-1].endswith(".awsl"):
-            module_parts = module_parts[:-1] + (module_parts[-1].replace(".awsl", ""),)
-        functions_module = ".".join(module_parts)
-    except (ValueError, IndexError):
-        # Fallback: use relative path from current directory
-        rel_path = os.path.relpath(workflow_path, start=os.getcwd())
-        functions_module = rel_path.replace(".awsl", "").replace(os.sep, ".")
-    
-    mod = __import__(functions_module, fromlist=["*"])
-    fn_map = {k: getattr(mod, k) for k in dir(mod) if not k.startswith("_")}
-    with PostgresSaver.from_conn_string(os.getenv("DATABASE_URL")) as saver:
-        saver.setup()
-        result = await asyncio.to_thread(
-            run_workflow,
-            tpl["path"],
-            fn_map=fn_map,
-            params=params,
-            thread_id=job["id"],
-            resume=resume,
-            checkpointer=saver,
-        )
+    # Resolved once per template version and reused, so the compiled graph cache hits as well
+    fn_map = get_template_functions(job["graph_name"])
+    # A saver per job over the shared pool: AsyncPostgresSaver serializes its operations with an
+    # instance lock, so sharing one instance would serialize checkpoint writes of all jobs
+    saver = AsyncPostgresSaver(checkpoints)
+    result = await arun_workflow(
+        tpl["path"],
+        fn_map=fn_map,
+        params=params,
+        thread_id=job["id"],
+        resume=resume,
+        checkpointer=saver,
+        # A re-claimed job (worker crash, reaped heartbeat) continues from its last checkpoint; its
+        # resume payload was cleared by start_job, so an answer is never replayed into a later interrupt
+        resume_existing=True,
+        on_node=on_node,
+    )
     state = "needs_input" if "__interrupt__" in result else "succeeded"
     return state, result
@@ -1,31 +1,339 @@
 import asyncio
+import logging
 import os
+import signal as signals
+import time
 import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict
+
 import asyncpg
+from psycopg_pool import AsyncConnectionPool
 
-from worker.db import claim_job, run_awsl, set_state
+from awsl.run_awsl_workflow import overrunning_steps
+from backend.notifications import CANCEL_CHANNEL, JOBS_CHANNEL, listen
+from backend.workflow_loader import template_registry
+from worker.db import (
+    checkpointer_pool,
+    claim_jobs,
+    heartbeat_jobs,
+    publish_node,
+    reap_stale_jobs,
+    release_jobs,
+    run_awsl,
+    set_state,
+    start_job,
+)
 
 CONCURRENCY = int(os.getenv("WORKERS", 4))
+# With LISTEN/NOTIFY polling is only a fallback for missed notifications
+POLL_INTERVAL = float(os.getenv("WORKER_POLL_INTERVAL", 10))
+LISTEN = os.getenv("WORKER_LISTEN", "1").lower() not in ("0", "false", "no")
+# The LISTEN connection is checked every LISTEN_CHECK_INTERVAL and reconnected with backoff when lost
+LISTEN_CHECK_INTERVAL = float(os.getenv("WORKER_LISTEN_CHECK_INTERVAL", 30))
+# Jobs claimed per round trip and the most claimed jobs buffered for the workers
+CLAIM_BATCH_SIZE = int(os.getenv("CLAIM_BATCH_SIZE", CONCURRENCY))
+CLAIM_BUFFER_SIZE = int(os.getenv("CLAIM_BUFFER_SIZE", CONCURRENCY))
+# Jobs claimed ahead of idle workers; a buffered job can't be taken by an idle worker of another process
+CLAIM_PREFETCH = int(os.getenv("CLAIM_PREFETCH", 0))
+# Claimed jobs are heartbeated every HEARTBEAT_INTERVAL; a claimed or running job without a heartbeat for
+# STALE_AFTER seconds is considered orphaned and requeued by the reaper of any live worker
+HEARTBEAT_INTERVAL = float(os.getenv("WORKER_HEARTBEAT_INTERVAL", 15))
+STALE_AFTER = float(os.getenv("WORKER_STALE_AFTER", 90))
+REAP_INTERVAL = float(os.getenv("WORKER_REAP_INTERVAL", 60))
+# Claim latency and buffer depth are logged at info level every METRICS_INTERVAL
+METRICS_INTERVAL = float(os.getenv("WORKER_METRICS_INTERVAL", 60))
+
+logger = logging.getLogger(__name__)
+
+
+class JobSignal:
+    """Wakes idle workers when a job is queued."""
+
+    def __init__(self) -> None:
+        self._event = asyncio.Event()
+
+    def notify(self, *_args) -> None:
+        self._event.set()
+
+    async def wait(self, timeout: float) -> None:
+        try:
+            await asyncio.wait_for(self._event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        self._event.clear()
+
+
+@dataclass
+class ClaimMetrics:
+    claims: int = 0
+    jobs_claimed: int = 0
+    total_claim_seconds: float = 0.0
+    last_claim_seconds: float = 0.0
+    queue_depth: int = 0
+    max_queue_depth: int = 0
+
+    def record(self, seconds: float, claimed: int, queue_depth: int) -> None:
+        self.claims += 1
+        self.jobs_claimed += claimed
+        self.total_claim_seconds += seconds
+        self.last_claim_seconds = seconds
+        self.queue_depth = queue_depth
+        self.max_queue_depth = max(self.max_queue_depth, queue_depth)
+
+    @property
+    def avg_claim_seconds(self) -> float:
+        return self.total_claim_seconds / self.claims if self.claims else 0.0
+
+
+class JobClaimer:
+    """Claims queued jobs in batches for the idle workers into a bounded buffer they consume."""
+
+    def __init__(self,
+                 pool: asyncpg.pool.Pool,
+                 claimer_id: str,
+                 signal: JobSignal,
+                 batch_size: int = CLAIM_BATCH_SIZE,
+                 buffer_size: int = CLAIM_BUFFER_SIZE,
+                 prefetch: int = CLAIM_PREFETCH) -> None:
+        self.pool = pool
+        self.claimer_id = claimer_id
+        self.signal = signal
+        self.batch_size = batch_size
+        self.prefetch = prefetch
+        self.jobs: asyncio.Queue[Dict[str, Any]] = asyncio.Queue(maxsize=buffer_size)
+        # Ids of claimed jobs still waiting in the buffer, kept alive by the heartbeat
+        self.pending: set[str] = set()
+        self.metrics = ClaimMetrics()
+        # Workers waiting in next_job for a job
+        self.idle = 0
+        self._demand = asyncio.Event()
+
+    def wanted(self) -> int:
+        """Jobs to claim now: one per idle worker plus the prefetch, less what is already buffered"""
+        buffered = self.jobs.qsize()
+        return min(self.batch_size, self.jobs.maxsize - buffered, self.idle + self.prefetch - buffered)
+
+    async def run(self) -> None:
+        while True:
+            limit = self.wanted()
+            if limit <= 0:
+                await self._demand.wait()
+                self._demand.clear()
+                continue
+            start = time.perf_counter()
+            claimed = await claim_jobs(self.pool, self.claimer_id, limit)
+            for job in claimed:
+                self.jobs.put_nowait(job)
+                self.pending.add(job["id"])
+            self.metrics.record(time.perf_counter() - start, len(claimed), self.jobs.qsize())
+            if claimed:
+                logger.debug("Claimed %d jobs in %.1fms, queue depth %d",
+                             len(claimed), self.metrics.last_claim_seconds * 1000, self.jobs.qsize())
+            if len(claimed) < limit:
+                await self.signal.wait(POLL_INTERVAL)
+
+    async def next_job(self) -> Dict[str, Any]:
+        self.idle += 1
+        self._demand.set()
+        try:
+            job = await self.jobs.get()
+        finally:
+            self.idle -= 1
+        self.pending.discard(job["id"])
+        self.metrics.queue_depth = self.jobs.qsize()
+        self._demand.set()
+        return job
+
+    async def release_unstarted(self) -> None:
+        job_ids = []
+        while not self.jobs.empty():
+            job_ids.append(self.jobs.get_nowait()["id"])
+        self.pending.clear()
+        await release_jobs(self.pool, self.claimer_id, job_ids)
+        if job_ids:
+            logger.info("Returned %d unstarted jobs to the queue", len(job_ids))
+
+
+class RunningJobs:
+    """In-flight runs of this worker process, so a canceled run can be aborted mid-invocation."""
+
+    # Cancellations of jobs that are claimed but not started yet, or that belong to other workers
+    MAX_PENDING_CANCELS = 1024
+
+    def __init__(self) -> None:
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._canceled: OrderedDict[str, None] = OrderedDict()
+
+    def start(self, job_id: str, run: Callable[[], Any]) -> asyncio.Task | None:
+        if job_id in self._canceled:
+            del self._canceled[job_id]
+            return None
+        task = asyncio.create_task(run())
+        self._tasks[job_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job_id, None))
+        return task
+
+    def cancel(self, job_id: str) -> bool:
+        self._canceled[job_id] = None
+        while len(self._canceled) > self.MAX_PENDING_CANCELS:
+            self._canceled.popitem(last=False)
+        task = self._tasks.get(job_id)
+        if task is None:
+            return False
+        task.cancel()
+        return True
+
+    def was_canceled(self, job_id: str) -> bool:
+        return job_id in self._canceled
 
+    def forget(self, job_id: str) -> None:
+        self._canceled.pop(job_id, None)
 
-async def worker(pool: asyncpg.pool.Pool, wid: str) -> None:
+    def ids(self) -> list[str]:
+        return list(self._tasks)
+
+    def abandon(self, job_ids: list[str], pending: set[str]) -> None:
+        """Stop jobs this worker no longer owns, whether running or still buffered"""
+        for job_id in job_ids:
+            if job_id in self._tasks or job_id in pending:
+                logger.warning("Run %s was canceled or reassigned, aborting it", job_id)
+                self.cancel(job_id)
+
+    def on_cancel(self, _conn, _pid, _channel, job_id: str) -> None:
+        if self.cancel(job_id):
+            logger.info("Aborting canceled run %s", job_id)
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+
+async def listen_for_jobs(dsn: str | None,
+                          signal: JobSignal,
+                          running: RunningJobs | None = None) -> None:
+    """Hold a dedicated LISTEN connection that forwards job and cancel notifications.
+
+    Until a dropped connection is re-established polling picks up queued jobs and the heartbeat
+    aborts runs canceled in the meantime.
+    """
+    listeners = {JOBS_CHANNEL: signal.notify}
+    if running is not None:
+        listeners[CANCEL_CHANNEL] = running.on_cancel
+    # Jobs queued while the connection was down would otherwise wait for the next poll
+    await listen(dsn, listeners, on_connect=signal.notify, check_interval=LISTEN_CHECK_INTERVAL)
+
+
+def node_reporter(pool: asyncpg.pool.Pool, job_id: str) -> Callable[[str], Any]:
+    """Publish completed nodes of a run; progress events are best effort and never fail the run"""
+    async def report(node: str) -> None:
+        try:
+            await publish_node(pool, job_id, node)
+        except Exception as exc:  # pragma: no cover - depends on the database
+            logger.warning("Publishing progress of run %s failed: %s", job_id, exc)
+    return report
+
+
+async def worker(pool: asyncpg.pool.Pool,
+                 claimer: JobClaimer,
+                 checkpoints: AsyncConnectionPool,
+                 running: RunningJobs) -> None:
     while True:
-        job = await claim_job(pool, wid)
-        if job is None:
-            await asyncio.sleep(10)
+        job = await claimer.next_job()
+        if not await start_job(pool, job["id"], claimer.claimer_id):
+            running.forget(job["id"])
+            logger.info("Skipping run %s canceled or reassigned before it started", job["id"])
+            continue
+        run = running.start(job["id"], lambda: run_awsl(job, checkpoints, on_node=node_reporter(pool, job["id"])))
+        if run is None:
+            logger.info("Skipping run %s canceled before it started", job["id"])
             continue
         try:
-            new_state, result = await run_awsl(job)
-            await set_state(pool, job["id"], new_state, result=result)
+            new_state, result = await run
+            await set_state(pool, job["id"], new_state, result=result, worker_id=claimer.claimer_id)
+        except asyncio.CancelledError:
+            if not running.was_canceled(job["id"]):
+                raise
+            # The row is already 'canceled'; the slot is free for the next job
+            logger.info("Canceled run %s", job["id"])
         except Exception as exc:  # pragma: no cover - errors in worker
-            await set_state(pool, job["id"], "failed", error=str(exc))
+            await set_state(pool, job["id"], "failed", error=str(exc), worker_id=claimer.claimer_id)
+        finally:
+            running.forget(job["id"])
+
+
+async def heartbeat(pool: asyncpg.pool.Pool, claimer: JobClaimer, running: RunningJobs) -> None:
+    """Keep the worker's claimed jobs fresh and abort the ones it lost to a cancel or the reaper"""
+    while True:
+        await asyncio.sleep(HEARTBEAT_INTERVAL)
+        job_ids = running.ids() + list(claimer.pending)
+        try:
+            lost = await heartbeat_jobs(pool, claimer.claimer_id, job_ids)
+        except Exception as exc:  # pragma: no cover - depends on the database
+            logger.warning("Heartbeat failed: %s", exc)
+            continue
+        running.abandon(lost, claimer.pending)
+
+
+async def reaper(pool: asyncpg.pool.Pool, signal: JobSignal) -> None:
+    """Requeue runs orphaned by crashed workers, failing those that used up max_attempts"""
+    while True:
+        try:
+            reaped = await reap_stale_jobs(pool, STALE_AFTER)
+        except Exception as exc:  # pragma: no cover - depends on the database
+            logger.warning("Reaping stale runs failed: %s", exc)
+            reaped = []
+        for job in reaped:
+            logger.warning("Run %s stopped heartbeating on attempt %d, now %s", job["id"], job["attempt"], job["state"])
+        if any(job["state"] == "queued" for job in reaped):
+            signal.notify()
+        await asyncio.sleep(REAP_INTERVAL)
+
+
+async def report_claims(claimer: JobClaimer) -> None:
+    """Log the claim metrics so operators can see claim latency and how full the buffer runs, and
+    warn while threads of timed-out steps are still running"""
+    while True:
+        await asyncio.sleep(METRICS_INTERVAL)
+        metrics = claimer.metrics
+        logger.info("Claims: %d round trips, %d jobs, avg %.1fms, last %.1fms; buffer depth %d (max %d), "
+                    "%d idle workers",
+                    metrics.claims, metrics.jobs_claimed, metrics.avg_claim_seconds * 1000,
+                    metrics.last_claim_seconds * 1000, metrics.queue_depth, metrics.max_queue_depth, claimer.idle)
+        if overrunning := overrunning_steps():
+            logger.warning("%d timed-out step threads still running", overrunning)
 
 
 async def main() -> None:
-    pool = await asyncpg.create_pool(dsn=os.getenv("DATABASE_URL"))
-    tasks = [asyncio.create_task(worker(pool, f"w{uuid.uuid4()}")) for _ in range(CONCURRENCY)]
-    await asyncio.gather(*tasks)
+    dsn = os.getenv("DATABASE_URL")
+    # Parsed before jobs arrive so the first lookup doesn't block the event loop
+    template_registry.refresh()
+    pool = await asyncpg.create_pool(dsn=dsn)
+    signal = JobSignal()
+    running = RunningJobs()
+    claimer = JobClaimer(pool, f"w{uuid.uuid4()}", signal)
+
+    main_task = asyncio.current_task()
+    asyncio.get_running_loop().add_signal_handler(signals.SIGTERM, main_task.cancel)
+
+    async with checkpointer_pool(dsn) as checkpoints:
+        tasks = [asyncio.create_task(claimer.run()),
+                 asyncio.create_task(heartbeat(pool, claimer, running)),
+                 asyncio.create_task(reaper(pool, signal)),
+                 asyncio.create_task(report_claims(claimer))]
+        if LISTEN:
+            tasks.append(asyncio.create_task(listen_for_jobs(dsn, signal, running)))
+        tasks += [asyncio.create_task(worker(pool, claimer, checkpoints, running)) for _ in range(CONCURRENCY)]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await claimer.release_unstarted()
+            await pool.close()
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"), format="%(asctime)s %(levelname)s %(name)s: %(message)s")
     asyncio.run(main())
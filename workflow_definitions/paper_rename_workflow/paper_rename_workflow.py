@@ -20,10 +20,8 @@ def get_files(drafts_folder_path: str, config: dict) -> dict:
     return {"file_paths": [os.path.join(drafts_folder_path, f) 
                            for f in os.listdir(drafts_folder_path) if f.endswith(".pdf")]}
 
-def read_pdf_file(file_paths: list[str], initial_file_paths_to_process: list[str], config: dict) -> dict:
+def read_pdf_file(file_path: str, config: dict) -> dict:
     pages_to_read = config.get("pages_to_read")
-    file_paths_to_process = file_paths if file_paths else initial_file_paths_to_process
-    file_path = file_paths_to_process.pop(0)
     # Render the first 2 pages of PDF as images using pdf2image
     try:
         # Convert first 2 pages to images at 200 DPI for good quality without being too large
@@ -33,7 +31,7 @@ def read_pdf_file(file_paths: list[str], initial_file_paths_to_process: list[str
             first_page=1, 
             last_page=pages_to_read
         )
-        return {"pages": page_images, "file_path": file_path, "remaining_file_paths": file_paths_to_process}
+        return {"pages": page_images, "file_path": file_path}
     except Exception as e:
         logger.error(f"Error rendering PDF pages as images: {str(e)}")
         raise e
@@ -100,9 +98,5 @@ def rename_file(file_path: str,
     shutil.move(file_path, new_file_path)
     return {"new_file_path": new_file_path}
 
-def check_all_files_processed(remaining_file_paths_to_process: list[str], processed_file: str, config: dict) -> dict:
-    return {"is_done": len(remaining_file_paths_to_process) == 0,
-            "processed_files": [processed_file]}
-
 def return_processed_files(processed_files: list[str], config: dict) -> dict:
     return {"processed_files": processed_files}